@@ -1,3 +1,5 @@
+using System.Diagnostics;
+using System.Globalization;
 using System.Net.Http.Json;
 using System.Text.Json;
 using System.Text.Json.Serialization;
@@ -15,6 +17,12 @@ public class AllianceHealthcareClient : IDisposable
     private readonly HttpClient _httpClient;
     private readonly ILogger<AllianceHealthcareClient> _logger;
     private readonly string _baseUrl;
+    
+    // A 429 from the scrapper is retried once if it asks us to wait at most this long
+    private static readonly TimeSpan MaxRetryAfter = TimeSpan.FromSeconds(3);
+    
+    // Kept back from our own timeout when telling the scrapper its deadline
+    private static readonly TimeSpan DeadlineMargin = TimeSpan.FromSeconds(2);
 
     public AllianceHealthcareClient(
         HttpClient httpClient,
@@ -46,11 +54,24 @@ public class AllianceHealthcareClient : IDisposable
             Barems = new List<BaremInfo>()
         };
 
+        var elapsed = Stopwatch.StartNew();
         try
         {
             _logger.LogInformation("📡 Calling scrapper service for item ID: {Id}", externalApiId);
             
-            var response = await _httpClient.GetAsync($"/get-barem/{externalApiId}");
+            var response = await GetBaremAsync(externalApiId, elapsed);
+            
+            // Scrapper is shedding load - honour a short Retry-After once
+            if (response.StatusCode == System.Net.HttpStatusCode.TooManyRequests)
+            {
+                var retryAfter = GetRetryAfter(response);
+                if (retryAfter <= MaxRetryAfter)
+                {
+                    _logger.LogInformation("⏳ Scrapper busy, retrying item {Id} in {Seconds}s", externalApiId, retryAfter.TotalSeconds);
+                    await Task.Delay(retryAfter);
+                    response = await GetBaremAsync(externalApiId, elapsed);
+                }
+            }
             
             if (response.IsSuccessStatusCode)
             {
@@ -97,11 +118,25 @@ public class AllianceHealthcareClient : IDisposable
                         result.Success, result.Barems?.Count ?? 0);
                 }
             }
+            else if (response.StatusCode == System.Net.HttpStatusCode.TooManyRequests)
+            {
+                result.RetryAfterSeconds = (int)Math.Ceiling(GetRetryAfter(response).TotalSeconds);
+                result.Error = $"Scrapper service busy, retry after {result.RetryAfterSeconds}s";
+                _logger.LogWarning("⚠️ Scrapper service busy (429), retry after {Seconds}s", result.RetryAfterSeconds);
+            }
             else if (response.StatusCode == System.Net.HttpStatusCode.ServiceUnavailable)
             {
-                result.Error = "Scrapper service not ready (browser not initialized)";
+                result.RetryAfterSeconds = response.Headers.RetryAfter != null
+                    ? (int)Math.Ceiling(GetRetryAfter(response).TotalSeconds)
+                    : null;
+                result.Error = "Scrapper service not ready (browser not initialized or upstream degraded)";
                 _logger.LogWarning("⚠️ Scrapper service not ready");
             }
+            else if (response.StatusCode == System.Net.HttpStatusCode.GatewayTimeout)
+            {
+                result.Error = "Scrapper service could not answer within the deadline";
+                _logger.LogWarning("⚠️ Scrapper shed item {Id} (deadline)", externalApiId);
+            }
             else
             {
                 result.Error = $"Scrapper service error: {response.StatusCode}";
@@ -127,6 +162,28 @@ public class AllianceHealthcareClient : IDisposable
         return result;
     }
 
+    private Task<HttpResponseMessage> GetBaremAsync(int externalApiId, Stopwatch elapsed)
+    {
+        var request = new HttpRequestMessage(HttpMethod.Get, $"/get-barem/{externalApiId}");
+        // Tell the scrapper how long we will still wait, so it drops work we would abandon
+        var budget = _httpClient.Timeout - elapsed.Elapsed - DeadlineMargin;
+        if (budget > TimeSpan.Zero)
+        {
+            request.Headers.Add("X-Request-Timeout", budget.TotalSeconds.ToString("0.###", CultureInfo.InvariantCulture));
+        }
+        return _httpClient.SendAsync(request);
+    }
+
+    private static TimeSpan GetRetryAfter(HttpResponseMessage response)
+    {
+        var retryAfter = response.Headers.RetryAfter;
+        if (retryAfter?.Delta is TimeSpan delta)
+            return delta;
+        if (retryAfter?.Date is DateTimeOffset date)
+            return date > DateTimeOffset.UtcNow ? date - DateTimeOffset.UtcNow : TimeSpan.Zero;
+        return TimeSpan.FromSeconds(1);
+    }
+
     /// <summary>
     /// Check if scrapper service is healthy.
     /// </summary>
@@ -165,6 +222,7 @@ public class BaremFetchResult
     public string? Barcode { get; set; }
     public List<BaremInfo>? Barems { get; set; } = new();
     public string? Error { get; set; }
+    public int? RetryAfterSeconds { get; set; }
 }
 
 public class BaremInfo
@@ -0,0 +1,194 @@
+"""
+Barem Cache
+In-process TTL + LRU cache for BaremResponse objects with single-flight
+loading and stale-while-revalidate.
+"""
+import time
+import asyncio
+import contextvars
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Set
+
+import deadline
+from ratelimit import BACKGROUND, lane
+
+
+Loader = Callable[[], Awaitable[Any]]
+
+
+class _Entry:
+    __slots__ = ("value", "stored_at")
+
+    def __init__(self, value: Any, stored_at: float):
+        self.value = value
+        self.stored_at = stored_at
+
+
+class BaremCache:
+    """
+    Keyed by item_id.
+
+    - Entries younger than `soft_ttl` are served as-is (hit).
+    - Entries between `soft_ttl` and `hard_ttl` are served immediately while
+      one background refresh runs (stale hit).
+    - Older entries are dropped and loaded again (miss).
+    - Concurrent misses for the same key share a single loader call, which
+      is cancelled if every caller waiting on it goes away (background
+      refreshes always run to completion). The shared call runs without any
+      caller's request deadline; each caller's deadline only bounds its own
+      wait.
+    - At most `max_entries` are kept; the least recently used go first.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 5000,
+        soft_ttl: float = 300.0,
+        hard_ttl: float = 3600.0,
+        is_cacheable: Optional[Callable[[Any], bool]] = None,
+    ):
+        self.max_entries = max(1, max_entries)
+        self.soft_ttl = soft_ttl
+        self.hard_ttl = max(hard_ttl, soft_ttl)
+        self.is_cacheable = is_cacheable or (lambda value: value is not None)
+        self._entries: "OrderedDict[Any, _Entry]" = OrderedDict()
+        self._inflight: Dict[Any, asyncio.Task] = {}
+        self._waiting: Dict[Any, int] = {}  # Callers awaiting each in-flight load
+        self._refreshing: Set[asyncio.Task] = set()
+
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.refreshes = 0
+        self.evictions = 0
+        self.load_errors = 0
+        self.abandoned = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _lookup(self, key) -> Optional[_Entry]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if time.monotonic() - entry.stored_at >= self.hard_ttl:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def contains(self, key) -> bool:
+        """True if a servable (fresh or stale) entry exists for key."""
+        return self._lookup(key) is not None
+
+    def peek(self, key):
+        """Return a servable value without counting a lookup or refreshing it."""
+        entry = self._lookup(key)
+        return entry.value if entry is not None else None
+
+    def put(self, key, value, age: float = 0.0):
+        """Store value; `age` backdates entries restored from elsewhere (e.g. disk)."""
+        if not self.is_cacheable(value):
+            return
+        self._entries[key] = _Entry(value, time.monotonic() - max(0.0, age))
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, key):
+        self._entries.pop(key, None)
+
+    async def _run_loader(self, key, loader: Loader):
+        try:
+            value = await loader()
+        except Exception:
+            self.load_errors += 1
+            raise
+        finally:
+            self._inflight.pop(key, None)
+        self.put(key, value)
+        return value
+
+    def _start_load(self, key, loader: Loader, context: contextvars.Context) -> asyncio.Task:
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._run_loader(key, loader), context=context)
+            self._inflight[key] = task
+        return task
+
+    @staticmethod
+    async def _in_background(loader: Loader):
+        with lane(BACKGROUND):
+            return await loader()
+
+    def _refresh_in_background(self, key, loader: Loader):
+        if key in self._inflight:
+            return
+        self.refreshes += 1
+        # The refresh outlives the request that noticed the stale entry: drop
+        # that request's deadline and queue behind interactive traffic
+        task = self._start_load(key, lambda: self._in_background(loader), deadline.detached())
+        self._refreshing.add(task)
+        task.add_done_callback(self._refreshing.discard)
+        # Background failures keep the stale entry; just consume the exception
+        task.add_done_callback(lambda t: t.cancelled() or t.exception())
+
+    async def get(self, key, loader: Loader):
+        """Return the cached value for key, loading it through `loader` if needed."""
+        entry = self._lookup(key)
+        if entry is not None:
+            if time.monotonic() - entry.stored_at >= self.soft_ttl:
+                self.stale_hits += 1
+                self._refresh_in_background(key, loader)
+            else:
+                self.hits += 1
+            return entry.value
+
+        if key in self._inflight:
+            self.coalesced += 1
+        else:
+            self.misses += 1
+        # Shield so one caller going away doesn't cancel the shared load
+        task = self._start_load(key, loader, deadline.detached())
+        self._waiting[key] = self._waiting.get(key, 0) + 1
+        try:
+            return await asyncio.wait_for(asyncio.shield(task), deadline.remaining())
+        except asyncio.TimeoutError:
+            if task.done():
+                raise  # The loader's own error
+            self._abandon(key, task)
+            raise deadline.DeadlineExceeded("Request deadline passed while waiting for the shared load") from None
+        except asyncio.CancelledError:
+            self._abandon(key, task)
+            raise
+        finally:
+            self._waiting[key] -= 1
+            if not self._waiting[key]:
+                del self._waiting[key]
+
+    def _abandon(self, key, task: asyncio.Task):
+        """A caller stopped waiting; once the last one has left, nobody wants the result."""
+        if self._waiting[key] == 1 and task not in self._refreshing and not task.done():
+            task.cancel()
+            self.abandoned += 1
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.stale_hits + self.misses + self.coalesced
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "soft_ttl_seconds": self.soft_ttl,
+            "hard_ttl_seconds": self.hard_ttl,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "refreshes": self.refreshes,
+            "evictions": self.evictions,
+            "load_errors": self.load_errors,
+            "abandoned": self.abandoned,
+            "inflight": len(self._inflight),
+            "hit_ratio": round((self.hits + self.stale_hits + self.coalesced) / lookups, 4) if lookups else 0.0,
+        }
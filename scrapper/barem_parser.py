@@ -0,0 +1,232 @@
+"""
+Barem Parser
+Extracts BaremInfo rows from ItemDetailv3 HTML (the popup_tblKampanyalar table).
+
+`parse_barem_html_fast` uses compiled lxml XPath expressions and is the
+default. `parse_barem_html_soup` is the original BeautifulSoup walk, kept
+as the reference implementation for bench/bench_parser.py and as a
+fallback for documents lxml.html refuses.
+"""
+import logging
+import hashlib
+import asyncio
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+
+import lxml.html
+from lxml import etree
+from bs4 import BeautifulSoup
+
+from models import BaremInfo
+
+
+logger = logging.getLogger(__name__)
+
+# ============================================================================
+# Shared row handling
+# ============================================================================
+def _barem_from_texts(texts: List[str]) -> Optional[BaremInfo]:
+    """
+    Convert the stripped cell texts of one row into a BaremInfo.
+
+    Columns are: [0] radio button, [1] Vade, [2] Min Adet, [3] MF,
+    [4] Kurum, [5] Ticari, [6] Fiyat. Raises on malformed numbers.
+    """
+    vade_text = texts[1] if len(texts) > 1 else "0"
+    min_adet_text = texts[2] if len(texts) > 2 else "1"
+    mf_text = texts[3] if len(texts) > 3 else "0"
+    kurum_text = texts[4] if len(texts) > 4 else ""
+    ticari_text = texts[5] if len(texts) > 5 else ""
+    fiyat_text = texts[6] if len(texts) > 6 else "0"
+
+    vade = int(vade_text) if vade_text.isdigit() else 0
+    min_adet = int(min_adet_text) if min_adet_text.isdigit() else 1
+
+    # Iskonto cells might be empty or carry a % symbol
+    kurum_iskonto = 0.0
+    if kurum_text and kurum_text not in ['&nbsp;', '\xa0', '']:
+        kurum_iskonto = float(kurum_text.replace('%', '').replace(',', '.').strip() or '0')
+
+    ticari_iskonto = 0.0
+    if ticari_text and ticari_text not in ['&nbsp;', '\xa0', '']:
+        ticari_iskonto = float(ticari_text.replace('%', '').replace(',', '.').strip() or '0')
+
+    fiyat = 0.0
+    if fiyat_text:
+        fiyat = float(fiyat_text.replace(',', '.').replace(' ', '').strip() or '0')
+
+    if vade > 0 or fiyat > 0:
+        return BaremInfo(
+            Vade=vade,
+            MinimumAdet=min_adet,
+            MalFazlasi=mf_text,
+            IskontoKurum=kurum_iskonto,
+            IskontoTicari=ticari_iskonto,
+            BirimFiyat=fiyat,
+            Warehouse="Alliance",
+            Discount=max(kurum_iskonto, ticari_iskonto)
+        )
+    return None
+
+
+def barem_key(barem: BaremInfo) -> tuple:
+    """Identity of a barem row; rows sharing it are duplicates."""
+    return (barem.Vade, barem.MinimumAdet, barem.MalFazlasi, barem.BirimFiyat)
+
+
+def dedupe_barems(barems: List[BaremInfo]) -> List[BaremInfo]:
+    """Remove duplicate barems based on key fields, keeping first occurrence."""
+    unique_barems = []
+    seen_keys = set()
+    for barem in barems:
+        key = barem_key(barem)
+        if key not in seen_keys:
+            seen_keys.add(key)
+            unique_barems.append(barem)
+    return unique_barems
+
+
+def _rows_to_barems(rows_of_texts) -> List[BaremInfo]:
+    barems = []
+    for texts in rows_of_texts:
+        if len(texts) < 6:  # Full barem row has 7 columns
+            continue
+        try:
+            barem = _barem_from_texts(texts)
+        except Exception as e:
+            logger.warning("⚠️ Error parsing barem row: %s", e)
+            continue
+        if barem is not None:
+            barems.append(barem)
+    return dedupe_barems(barems)
+
+
+# ============================================================================
+# BeautifulSoup parser (reference)
+# ============================================================================
+def parse_barem_html_soup(html: str) -> List[BaremInfo]:
+    """Parse HTML response to extract barem data using BeautifulSoup."""
+    rows_of_texts = []
+    try:
+        soup = BeautifulSoup(html, 'lxml')
+
+        # Find the barem table (id='popup_tblKampanyalar')
+        table = soup.find('table', id='popup_tblKampanyalar')
+        if not table:
+            # Try any table with kampanya in id
+            table = soup.find('table', id=lambda x: x and 'kampanya' in x.lower())
+        if not table:
+            # Fallback to first table
+            tables = soup.find_all('table')
+            if tables:
+                table = tables[0]
+
+        if table:
+            tbody = table.find('tbody')
+            rows = tbody.find_all('tr') if tbody else table.find_all('tr')
+            for row in rows:
+                rows_of_texts.append([cell.get_text(strip=True) for cell in row.find_all('td')])
+    except Exception as e:
+        logger.warning("⚠️ HTML parsing error: %s", e)
+
+    return _rows_to_barems(rows_of_texts)
+
+
+# ============================================================================
+# lxml XPath parser
+# ============================================================================
+_XP_KAMPANYA_TABLE = etree.XPath('//table[@id="popup_tblKampanyalar"]')
+_XP_TABLES_WITH_ID = etree.XPath('//table[@id]')
+_XP_FIRST_TABLE = etree.XPath('(//table)[1]')
+_XP_FIRST_TBODY = etree.XPath('(.//tbody)[1]')
+_XP_ROWS = etree.XPath('.//tr')
+_XP_CELLS = etree.XPath('.//td')
+# BeautifulSoup's get_text() skips script/style/template strings; match it
+_XP_CELL_TEXT = etree.XPath(
+    './/text()[not(ancestor::script) and not(ancestor::style) and not(ancestor::template)]'
+)
+
+
+def _find_table(doc):
+    tables = _XP_KAMPANYA_TABLE(doc)
+    if tables:
+        return tables[0]
+    for table in _XP_TABLES_WITH_ID(doc):
+        if 'kampanya' in table.get('id', '').lower():
+            return table
+    tables = _XP_FIRST_TABLE(doc)
+    return tables[0] if tables else None
+
+
+def _cell_text(cell) -> str:
+    return ''.join(s for s in (str(t).strip() for t in _XP_CELL_TEXT(cell)) if s)
+
+
+def parse_barem_html_fast(html: str) -> List[BaremInfo]:
+    """XPath equivalent of parse_barem_html_soup; same table choice, same rows."""
+    if not html or not html.strip():
+        return []
+    try:
+        doc = lxml.html.document_fromstring(html)
+    except (etree.ParserError, ValueError):
+        # e.g. a string with an XML encoding declaration - let bs4 deal with it
+        return parse_barem_html_soup(html)
+
+    table = _find_table(doc)
+    if table is None:
+        return []
+
+    tbodies = _XP_FIRST_TBODY(table)
+    rows = _XP_ROWS(tbodies[0] if tbodies else table)
+    return _rows_to_barems([_cell_text(cell) for cell in _XP_CELLS(row)] for row in rows)
+
+
+# ============================================================================
+# Memoizing, off-loop parser
+# ============================================================================
+class BaremParser:
+    """
+    Runs parse_barem_html_fast in a worker thread and skips re-parsing
+    documents whose content hash was seen recently.
+    """
+
+    def __init__(self, workers: int = 2, memo_size: int = 2048):
+        self._executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="barem-parser")
+        self._memo: "OrderedDict[bytes, List[BaremInfo]]" = OrderedDict()
+        self._memo_lock = threading.Lock()
+        self.memo_size = memo_size
+        self.parsed = 0
+        self.memo_hits = 0
+
+    @staticmethod
+    def content_hash(html: str) -> bytes:
+        return hashlib.blake2b(html.encode('utf-8'), digest_size=16).digest()
+
+    def parse(self, html: str) -> List[BaremInfo]:
+        digest = self.content_hash(html)
+        with self._memo_lock:
+            cached = self._memo.get(digest)
+            if cached is not None:
+                self._memo.move_to_end(digest)
+                self.memo_hits += 1
+                return list(cached)
+
+        barems = parse_barem_html_fast(html)
+        with self._memo_lock:
+            self.parsed += 1
+            self._memo[digest] = barems
+            while len(self._memo) > self.memo_size:
+                self._memo.popitem(last=False)
+        return list(barems)
+
+    async def parse_async(self, html: str) -> List[BaremInfo]:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self.parse, html)
+
+    def stats(self) -> dict:
+        return {"parsed": self.parsed, "memo_hits": self.memo_hits, "memo_entries": len(self._memo)}
+
+    def close(self):
+        self._executor.shutdown(wait=False)
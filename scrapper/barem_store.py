@@ -0,0 +1,287 @@
+"""
+Barem Store
+SQLite-backed persistent store of parsed BaremResponse payloads, so a
+restarted scrapper can answer from disk while the browser session warms up.
+Barem set changes between versions are kept in a cursor-addressable feed.
+"""
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import asyncio
+import threading
+from typing import Optional, List, Tuple
+
+from change_feed import diff_barems
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS barem_latest (
+    item_id      INTEGER PRIMARY KEY,
+    version      INTEGER NOT NULL,
+    content_hash TEXT    NOT NULL,
+    fetched_at   TEXT    NOT NULL,
+    fetched_ts   REAL    NOT NULL,
+    payload      TEXT    NOT NULL
+);
+CREATE TABLE IF NOT EXISTS barem_versions (
+    item_id      INTEGER NOT NULL,
+    version      INTEGER NOT NULL,
+    content_hash TEXT    NOT NULL,
+    fetched_at   TEXT    NOT NULL,
+    fetched_ts   REAL    NOT NULL,
+    payload      TEXT    NOT NULL,
+    PRIMARY KEY (item_id, version)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS barem_changes (
+    seq          INTEGER PRIMARY KEY AUTOINCREMENT,
+    item_id      INTEGER NOT NULL,
+    version      INTEGER NOT NULL,
+    changed_at   TEXT    NOT NULL,
+    changed_ts   REAL    NOT NULL,
+    diff         TEXT    NOT NULL
+);
+"""
+
+
+def content_hash(payload: dict) -> str:
+    """Hash of the parts of a response that matter, ignoring fetch timestamps."""
+    relevant = {
+        "name": payload.get("name"),
+        "barcode": payload.get("barcode"),
+        "barems": payload.get("barems") or [],
+    }
+    encoded = json.dumps(relevant, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+class StoredBarem:
+    """One row of barem_latest/barem_versions."""
+
+    __slots__ = ("item_id", "version", "content_hash", "fetched_at", "fetched_ts", "payload")
+
+    def __init__(self, item_id, version, content_hash, fetched_at, fetched_ts, payload):
+        self.item_id = item_id
+        self.version = version
+        self.content_hash = content_hash
+        self.fetched_at = fetched_at
+        self.fetched_ts = fetched_ts
+        self.payload = json.loads(payload) if isinstance(payload, str) else payload
+
+    @property
+    def age_seconds(self) -> float:
+        return max(0.0, time.time() - self.fetched_ts)
+
+    def to_dict(self) -> dict:
+        return {
+            "item_id": self.item_id,
+            "version": self.version,
+            "content_hash": self.content_hash,
+            "fetched_at": self.fetched_at,
+            "payload": self.payload,
+        }
+
+
+class BaremStore:
+    """
+    Versioned history per item plus a `barem_latest` table for point lookups.
+
+    A new version is only written when the content hash changes; refetching
+    an unchanged item just bumps the fetch timestamp on the latest row.
+    All methods are synchronous; the *_async wrappers run them in a thread
+    so the event loop never blocks on disk.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA auto_vacuum=INCREMENTAL")  # Only takes effect on a new file
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # Writes
+    # ------------------------------------------------------------------
+    def save(self, payload: dict) -> Optional[dict]:
+        """
+        Persist one response payload. When the barem set differs from the
+        previous version, a change record is written and returned.
+        """
+        item_id = int(payload["item_id"])
+        digest = content_hash(payload)
+        fetched_at = payload.get("fetched_at") or ""
+        fetched_ts = time.time()
+        encoded = json.dumps(payload, ensure_ascii=False, separators=(",", ":"))
+
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT version, content_hash, payload FROM barem_latest WHERE item_id = ?", (item_id,)
+            ).fetchone()
+            if row and row[1] == digest:
+                self._conn.execute(
+                    "UPDATE barem_latest SET fetched_at = ?, fetched_ts = ?, payload = ? WHERE item_id = ?",
+                    (fetched_at, fetched_ts, encoded, item_id),
+                )
+                return None
+
+            version = (row[0] + 1) if row else 1
+            # First sightings are not changes; only diffs against a previous version are
+            diff = diff_barems(json.loads(row[2]).get("barems"), payload.get("barems")) if row else None
+            change = None
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.execute(
+                    "INSERT INTO barem_versions (item_id, version, content_hash, fetched_at, fetched_ts, payload) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (item_id, version, digest, fetched_at, fetched_ts, encoded),
+                )
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO barem_latest (item_id, version, content_hash, fetched_at, fetched_ts, payload) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (item_id, version, digest, fetched_at, fetched_ts, encoded),
+                )
+                if diff is not None:
+                    cursor = self._conn.execute(
+                        "INSERT INTO barem_changes (item_id, version, changed_at, changed_ts, diff) VALUES (?, ?, ?, ?, ?)",
+                        (item_id, version, fetched_at, fetched_ts, json.dumps(diff, ensure_ascii=False, separators=(",", ":"))),
+                    )
+                    change = {"seq": cursor.lastrowid, "item_id": item_id, "version": version,
+                              "changed_at": fetched_at, **diff}
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            return change
+
+    def compact(self, keep_versions: int = 20, keep_changes_seconds: Optional[float] = None) -> int:
+        """
+        Drop all but the newest `keep_versions` versions per item, and change
+        records older than `keep_changes_seconds`. Returns rows removed.
+        """
+        with self._lock:
+            cursor = self._conn.execute(
+                """
+                DELETE FROM barem_versions
+                WHERE EXISTS (
+                    SELECT 1 FROM barem_latest l
+                    WHERE l.item_id = barem_versions.item_id
+                      AND barem_versions.version <= l.version - ?
+                )
+                """,
+                (max(1, keep_versions),),
+            )
+            removed = cursor.rowcount
+            if keep_changes_seconds is not None:
+                removed += self._conn.execute(
+                    "DELETE FROM barem_changes WHERE changed_ts < ?", (time.time() - keep_changes_seconds,)
+                ).rowcount
+            self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            if removed:
+                self._conn.execute("PRAGMA incremental_vacuum")
+            return removed
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+    def get_latest(self, item_id: int) -> Optional[StoredBarem]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT item_id, version, content_hash, fetched_at, fetched_ts, payload "
+                "FROM barem_latest WHERE item_id = ?",
+                (item_id,),
+            ).fetchone()
+        return StoredBarem(*row) if row else None
+
+    def history(self, item_id: int, limit: int = 20) -> List[StoredBarem]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT item_id, version, content_hash, fetched_at, fetched_ts, payload "
+                "FROM barem_versions WHERE item_id = ? ORDER BY version DESC LIMIT ?",
+                (item_id, limit),
+            ).fetchall()
+        return [StoredBarem(*row) for row in rows]
+
+    def changes_since(self, since: int = 0, limit: int = 500) -> Tuple[List[dict], int]:
+        """Change records with seq > `since`, oldest first, and the cursor to resume from."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT seq, item_id, version, changed_at, diff FROM barem_changes "
+                "WHERE seq > ? ORDER BY seq LIMIT ?",
+                (since, limit),
+            ).fetchall()
+            if not rows:
+                # Caught up (or a cursor from a wiped store): resume from the head
+                head = self._conn.execute("SELECT COALESCE(MAX(seq), 0) FROM barem_changes").fetchone()[0]
+        changes = [
+            {"seq": seq, "item_id": item_id, "version": version, "changed_at": changed_at, **json.loads(diff)}
+            for seq, item_id, version, changed_at, diff in rows
+        ]
+        return changes, (changes[-1]["seq"] if changes else head)
+
+    def export_page(self, after_item_id: int = 0, modified_since: Optional[float] = None,
+                    limit: int = 500) -> List[Tuple[StoredBarem, float]]:
+        """
+        Up to `limit` latest payloads with item_id > `after_item_id`, in
+        item_id order, each with the time its current version was first
+        stored. `modified_since` skips items whose content has not changed
+        since then (plain refetches don't count).
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT l.item_id, l.version, l.content_hash, l.fetched_at, l.fetched_ts, l.payload, v.fetched_ts "
+                "FROM barem_latest l JOIN barem_versions v ON v.item_id = l.item_id AND v.version = l.version "
+                "WHERE l.item_id > ? AND v.fetched_ts >= ? ORDER BY l.item_id LIMIT ?",
+                (after_item_id, modified_since or 0.0, limit),
+            ).fetchall()
+        return [(StoredBarem(*row[:6]), row[6]) for row in rows]
+
+    def last_modified(self) -> Optional[float]:
+        """When the most recent content change was stored, None for an empty store."""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT MAX(v.fetched_ts) FROM barem_latest l "
+                "JOIN barem_versions v ON v.item_id = l.item_id AND v.version = l.version"
+            ).fetchone()[0]
+
+    def stats(self) -> dict:
+        with self._lock:
+            items = self._conn.execute("SELECT COUNT(*) FROM barem_latest").fetchone()[0]
+            versions = self._conn.execute("SELECT COUNT(*) FROM barem_versions").fetchone()[0]
+            changes = self._conn.execute("SELECT COUNT(*) FROM barem_changes").fetchone()[0]
+        size = os.path.getsize(self.path) if os.path.exists(self.path) else 0
+        return {"path": self.path, "items": items, "versions": versions, "changes": changes, "size_bytes": size}
+
+    # ------------------------------------------------------------------
+    # Async wrappers
+    # ------------------------------------------------------------------
+    async def save_async(self, payload: dict) -> Optional[dict]:
+        return await asyncio.to_thread(self.save, payload)
+
+    async def get_latest_async(self, item_id: int) -> Optional[StoredBarem]:
+        return await asyncio.to_thread(self.get_latest, item_id)
+
+    async def history_async(self, item_id: int, limit: int = 20) -> List[StoredBarem]:
+        return await asyncio.to_thread(self.history, item_id, limit)
+
+    async def compact_async(self, keep_versions: int = 20, keep_changes_seconds: Optional[float] = None) -> int:
+        return await asyncio.to_thread(self.compact, keep_versions, keep_changes_seconds)
+
+    async def changes_since_async(self, since: int = 0, limit: int = 500) -> Tuple[List[dict], int]:
+        return await asyncio.to_thread(self.changes_since, since, limit)
+
+    async def export_page_async(self, after_item_id: int = 0, modified_since: Optional[float] = None,
+                                limit: int = 500) -> List[Tuple[StoredBarem, float]]:
+        return await asyncio.to_thread(self.export_page, after_item_id, modified_since, limit)
+
+    async def last_modified_async(self) -> Optional[float]:
+        return await asyncio.to_thread(self.last_modified)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
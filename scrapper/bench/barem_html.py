@@ -0,0 +1,135 @@
+"""
+ItemDetailv3 HTML Generator
+Builds popup HTML shaped like the portal's /Sales/ItemDetailv3 response
+(product header + popup_tblKampanyalar campaign table). Used to produce
+the parser benchmark corpus and, later, by the local portal stand-in.
+
+Usage:
+    python bench/barem_html.py            # (re)write bench/fixtures/*.html
+"""
+import os
+import random
+from typing import List, Optional
+
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+VADELER = [0, 30, 45, 60, 75, 90, 120, 150]
+MF_CHOICES = ["0", "0", "0", "5+1", "10+1", "10+2", "20+3", "50+10", "100+25"]
+
+
+def _price(value: float) -> str:
+    """Turkish number formatting used by the portal (1.234,56 -> here 1234,56)."""
+    return f"{value:.2f}".replace('.', ',')
+
+
+def generate_rows(rng: random.Random, base_price: float, count: int) -> List[dict]:
+    rows = []
+    for _ in range(count):
+        vade = rng.choice(VADELER)
+        kurum = rng.choice([None, 0, 2.5, 5, 7, 10])
+        ticari = rng.choice([None, 0, 3, 5, 8, 12.5])
+        discount = max(kurum or 0, ticari or 0)
+        rows.append({
+            "vade": vade,
+            "min_adet": rng.choice([1, 1, 1, 5, 10, 20, 50]),
+            "mf": rng.choice(MF_CHOICES),
+            "kurum": kurum,
+            "ticari": ticari,
+            "fiyat": round(base_price * (1 + vade / 1000) * (1 - discount / 100), 2),
+        })
+    return rows
+
+
+def render_row(row: dict, index: int, rng: Optional[random.Random] = None) -> str:
+    def pct(value):
+        if value is None:
+            return "&nbsp;"
+        return f"%{_price(value)}" if value else ""
+
+    fiyat = _price(row["fiyat"])
+    if rng is not None and rng.random() < 0.2:
+        # Some rows wrap values in extra markup
+        fiyat = f'<span class="fiyat"><b>{fiyat}</b></span>'
+    return (
+        "<tr>"
+        f'<td><input type="radio" name="rdKampanya" value="{index}" /></td>'
+        f"<td>{row['vade']}</td>"
+        f"<td>{row['min_adet']}</td>"
+        f"<td>{row['mf']}</td>"
+        f"<td>{pct(row['kurum'])}</td>"
+        f"<td>{pct(row['ticari'])}</td>"
+        f"<td> {fiyat} </td>"
+        "</tr>"
+    )
+
+
+def render_item_detail(
+    item_id: int,
+    name: str,
+    barcode: str,
+    rows: List[dict],
+    table_id: str = "popup_tblKampanyalar",
+    with_tbody: bool = True,
+    rng: Optional[random.Random] = None,
+    duplicate_rows: int = 0,
+) -> str:
+    """Render one ItemDetailv3 popup document."""
+    body_rows = [render_row(row, i, rng) for i, row in enumerate(rows)]
+    body_rows += body_rows[:duplicate_rows]  # The portal repeats some campaigns
+    body_rows.append('<tr class="spacer"><td colspan="7">&nbsp;</td></tr>')
+    rows_html = "\n".join(body_rows)
+    if with_tbody:
+        rows_html = f"<tbody>\n{rows_html}\n</tbody>"
+    return f"""<div class="modal-header">
+  <h4 class="modal-title" data-item-id="{item_id}">{name}</h4>
+  <button type="button" class="close" data-dismiss="modal">&times;</button>
+</div>
+<div class="modal-body">
+  <table class="table table-sm urun-bilgi">
+    <tr><th>Barkod</th><td>{barcode}</td></tr>
+    <tr><th>Stok</th><td><span class="badge badge-success">Var</span></td></tr>
+  </table>
+  <!-- kampanya listesi -->
+  <table id="{table_id}" class="table table-bordered table-hover">
+    <thead>
+      <tr><th></th><th>Vade</th><th>Min. Adet</th><th>MF</th><th>Kurum İsk.</th><th>Ticari İsk.</th><th>Birim Fiyat</th></tr>
+    </thead>
+    {rows_html}
+  </table>
+  <script>$(function () {{ initKampanyaSecimi({item_id}); }});</script>
+</div>
+"""
+
+
+def build_corpus(count: int = 24, seed: int = 1234) -> List[tuple]:
+    """Deterministic (filename, html) pairs covering the parser's branches."""
+    rng = random.Random(seed)
+    corpus = []
+    for i in range(count):
+        item_id = 1000 + i * 37
+        rows = generate_rows(rng, base_price=rng.uniform(15, 900), count=rng.randint(1, 40))
+        variant = i % 6
+        kwargs = {"rng": rng, "duplicate_rows": rng.randint(0, 4)}
+        if variant == 3:
+            kwargs["with_tbody"] = False
+        elif variant == 4:
+            kwargs["table_id"] = "tblKampanyaListesi"  # Fallback id match
+        html = render_item_detail(item_id, f"ÜRÜN {item_id} 20 MG 30 TABLET", f"8699{item_id:09d}", rows, **kwargs)
+        if variant == 5 and i % 12 == 5:
+            html = '<div class="modal-body"><p>Bu ürün için kampanya bulunamadı.</p></div>'
+        corpus.append((f"item_{item_id}.html", html))
+    return corpus
+
+
+def write_fixtures(directory: str = FIXTURES_DIR):
+    os.makedirs(directory, exist_ok=True)
+    corpus = build_corpus()
+    for filename, html in corpus:
+        with open(os.path.join(directory, filename), "w", encoding="utf-8") as f:
+            f.write(html)
+    print(f"📝 Wrote {len(corpus)} fixtures to {directory}")
+
+
+if __name__ == "__main__":
+    write_fixtures()
@@ -0,0 +1,157 @@
+"""
+Scrapper Load Benchmark
+Drives GET /get-barem/{id} on a running scrapper with a fixed number of
+concurrent clients and reports throughput, the status mix and latency
+percentiles. Pair it with bench/mock_portal.py to measure the scrapper
+without touching the real portal.
+
+IDs come from ilac_arsivi.csv (or --ids 1-500). --hot-ratio sends that
+fraction of requests to a small hot set so the cache hit path is
+exercised alongside cold fetches.
+
+Usage:
+    python bench/mock_portal.py --port 9000 &
+    ALLIANCE_BASE_URL=http://127.0.0.1:9000 ... uvicorn main:app --port 8000 &
+    python bench/bench_load.py [--url http://127.0.0.1:8000] [--concurrency 16]
+                               [--duration 30] [--requests N] [--hot-ratio 0.5]
+"""
+import os
+import sys
+import time
+import random
+import asyncio
+import argparse
+from collections import Counter
+from typing import List
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from crawler import load_api_ids  # noqa: E402
+
+
+def parse_ids(spec: str) -> List[int]:
+    """"1-500" or "24,35,71" -> list of ids."""
+    ids = []
+    for part in spec.split(","):
+        start, _, end = part.strip().partition("-")
+        if start:
+            ids.extend(range(int(start), int(end or start) + 1))
+    return ids
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return float("nan")
+    rank = max(1, -(-len(sorted_values) * pct // 100))
+    return sorted_values[int(rank) - 1]
+
+
+class LoadRun:
+    def __init__(self, url: str, ids: List[int], concurrency: int, duration: float,
+                 max_requests: int, hot_ratio: float, hot_size: int, timeout: float, seed: int):
+        self.url = url.rstrip("/")
+        self.ids = ids
+        self.hot = ids[:hot_size]
+        self.concurrency = concurrency
+        self.duration = duration
+        self.max_requests = max_requests
+        self.hot_ratio = hot_ratio
+        self.timeout = timeout
+        self.rng = random.Random(seed)
+        self.issued = 0
+        self.latencies: List[float] = []
+        self.statuses: Counter = Counter()
+        self.outcomes: Counter = Counter()
+
+    def next_id(self) -> int:
+        if self.hot and self.rng.random() < self.hot_ratio:
+            return self.rng.choice(self.hot)
+        return self.rng.choice(self.ids)
+
+    def _more(self, deadline: float) -> bool:
+        if self.max_requests:
+            return self.issued < self.max_requests
+        return time.perf_counter() < deadline
+
+    async def _client(self, client: httpx.AsyncClient, deadline: float):
+        while self._more(deadline):
+            self.issued += 1
+            item_id = self.next_id()
+            started = time.perf_counter()
+            try:
+                response = await client.get(f"{self.url}/get-barem/{item_id}")
+                self.statuses[response.status_code] += 1
+                if response.status_code == 200:
+                    body = response.json()
+                    self.outcomes["success" if body.get("success") else "unsuccessful"] += 1
+            except httpx.HTTPError as e:
+                self.statuses[type(e).__name__] += 1
+            self.latencies.append(time.perf_counter() - started)
+
+    async def run(self) -> float:
+        limits = httpx.Limits(max_connections=self.concurrency, max_keepalive_connections=self.concurrency)
+        async with httpx.AsyncClient(timeout=self.timeout, limits=limits) as client:
+            started = time.perf_counter()
+            deadline = started + self.duration
+            await asyncio.gather(*(self._client(client, deadline) for _ in range(self.concurrency)))
+            return time.perf_counter() - started
+
+    def report(self, elapsed: float):
+        latencies = sorted(self.latencies)
+        done = len(latencies)
+        print(f"📊 {done} requests in {elapsed:.1f}s -> {done / elapsed:.1f} req/s "
+              f"at concurrency {self.concurrency}")
+        print("   status  " + ", ".join(f"{k}: {v}" for k, v in sorted(self.statuses.items(), key=str)))
+        if self.outcomes:
+            print("   body    " + ", ".join(f"{k}: {v}" for k, v in sorted(self.outcomes.items())))
+        print("⏱️ Latency (ms)")
+        for label, pct in (("p50", 50), ("p95", 95), ("p99", 99), ("max", 100)):
+            print(f"  {label:<4} {percentile(latencies, pct) * 1000:>10.1f}")
+
+
+async def print_upstream(url: str):
+    """Scrapper-side view of the run, if the endpoints are there."""
+    async with httpx.AsyncClient(timeout=5) as client:
+        for path in ("/cache/stats", "/upstream"):
+            try:
+                response = await client.get(f"{url.rstrip('/')}{path}")
+                if response.status_code == 200:
+                    print(f"🔎 {path}: {response.json()}")
+            except httpx.HTTPError:
+                pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://127.0.0.1:8000", help="scrapper base URL")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds to run (ignored with --requests)")
+    parser.add_argument("--requests", type=int, default=0, help="stop after this many requests")
+    parser.add_argument("--ids", default="", help='id ranges, e.g. "1-500,900"; default: API_IDs from the archive')
+    parser.add_argument("--csv", default=os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "ilac_arsivi.csv"))
+    parser.add_argument("--hot-ratio", type=float, default=0.0, help="fraction of requests sent to the hot set")
+    parser.add_argument("--hot-size", type=int, default=20)
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--seed", type=int, default=1234)
+    args = parser.parse_args()
+
+    ids = parse_ids(args.ids) if args.ids else load_api_ids(args.csv)
+    if not ids:
+        print("⚠️ No item ids to request")
+        return 1
+
+    run = LoadRun(args.url, ids, max(1, args.concurrency), args.duration, args.requests,
+                  args.hot_ratio, args.hot_size, args.timeout, args.seed)
+    print(f"🚀 {args.url}: {len(ids)} ids, concurrency {run.concurrency}, "
+          + (f"{args.requests} requests" if args.requests else f"{args.duration:g}s"))
+    elapsed = asyncio.run(run.run())
+    run.report(elapsed)
+    asyncio.run(print_upstream(args.url))
+    return 0 if run.statuses.get(200) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,93 @@
+"""
+Barem Parser Benchmark
+Runs the BeautifulSoup reference parser and the lxml XPath parser over the
+ItemDetailv3 fixture corpus, checks that both produce identical BaremInfo
+output and reports documents/sec and rows/sec for each.
+
+Drop real captured ItemDetailv3 responses into bench/fixtures/ (*.html)
+to benchmark against them as well.
+
+Usage:
+    python bench/bench_parser.py [--iterations 20] [--fixtures DIR]
+"""
+import os
+import sys
+import glob
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from barem_parser import parse_barem_html_soup, parse_barem_html_fast, BaremParser  # noqa: E402
+from bench.barem_html import FIXTURES_DIR  # noqa: E402
+
+
+def load_corpus(directory: str) -> list:
+    corpus = []
+    for path in sorted(glob.glob(os.path.join(directory, "*.html"))):
+        with open(path, encoding="utf-8") as f:
+            corpus.append((os.path.basename(path), f.read()))
+    return corpus
+
+
+def dump(barems) -> list:
+    return [jsonable(b) for b in barems]
+
+
+def jsonable(barem) -> dict:
+    return barem.model_dump() if hasattr(barem, "model_dump") else barem.dict()
+
+
+def compare(corpus: list) -> int:
+    mismatches = 0
+    for name, html in corpus:
+        expected = dump(parse_barem_html_soup(html))
+        actual = dump(parse_barem_html_fast(html))
+        if expected != actual:
+            mismatches += 1
+            print(f"❌ {name}: soup={len(expected)} rows, fast={len(actual)} rows")
+    return mismatches
+
+
+def run(label: str, parse, corpus: list, iterations: int):
+    rows = 0
+    started = time.perf_counter()
+    for _ in range(iterations):
+        for _, html in corpus:
+            rows += len(parse(html))
+    elapsed = time.perf_counter() - started
+    docs = len(corpus) * iterations
+    print(f"  {label:<14} {docs / elapsed:>10.1f} docs/s {rows / elapsed:>12.1f} rows/s  ({elapsed * 1000:.1f} ms)")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--fixtures", default=FIXTURES_DIR)
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.fixtures)
+    if not corpus:
+        print(f"⚠️ No fixtures in {args.fixtures} - run `python bench/barem_html.py` first")
+        return 1
+
+    total_bytes = sum(len(html) for _, html in corpus)
+    print(f"📂 {len(corpus)} fixtures, {total_bytes / 1024:.1f} KiB, {args.iterations} iterations")
+
+    mismatches = compare(corpus)
+    print(f"🔍 Output check: {'identical' if not mismatches else f'{mismatches} mismatching fixtures'}")
+
+    print("⏱️ Throughput")
+    soup_time = run("soup", parse_barem_html_soup, corpus, args.iterations)
+    fast_time = run("lxml xpath", parse_barem_html_fast, corpus, args.iterations)
+    memo = BaremParser(workers=1)
+    run("xpath+memo", memo.parse, corpus, args.iterations)
+    memo.close()
+    print(f"🚀 lxml xpath speedup over soup: {soup_time / fast_time:.1f}x")
+
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
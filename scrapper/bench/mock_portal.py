@@ -0,0 +1,260 @@
+"""
+Mock Alliance Portal
+Local stand-in for esiparisv2.alliance-healthcare.com.tr: login page,
+UniqueLogin conflict page, /Home/MainPage and POST /Sales/ItemDetailv3
+returning popup_tblKampanyalar HTML from bench/barem_html.py.
+
+Latency, error rate, session lifetime and the UniqueLogin conflict can be
+set on the command line or changed at runtime via POST /mock/config.
+
+Usage:
+    python bench/mock_portal.py [--port 9000] [--latency-ms 150] [--jitter-ms 100]
+                                [--error-rate 0.02] [--session-ttl 1800] [--unique-login]
+
+    # point the scrapper at it
+    ALLIANCE_BASE_URL=http://127.0.0.1:9000 ALLIANCE_PHARMACY_CODE=1 \\
+    ALLIANCE_USERNAME=bench ALLIANCE_PASSWORD=bench uvicorn main:app --port 8000
+
+Control endpoints:
+    GET  /mock/config            current settings
+    POST /mock/config            JSON body with any of latency_ms, jitter_ms,
+                                 error_rate, session_ttl, unique_login
+    POST /mock/expire-sessions   invalidate every session now
+    GET  /mock/stats             request counters
+"""
+import os
+import sys
+import csv
+import time
+import uuid
+import random
+import asyncio
+import argparse
+from typing import Dict, Optional
+from urllib.parse import parse_qs
+
+from fastapi import FastAPI, Request
+from fastapi.responses import HTMLResponse, RedirectResponse, Response
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench.barem_html import generate_rows, render_item_detail  # noqa: E402
+
+
+SESSION_COOKIE = "ASP.NET_SessionId"
+CATALOG_CSV = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "ilac_arsivi.csv")
+
+LOGIN_PAGE = """<!DOCTYPE html>
+<html lang="tr"><head><meta charset="utf-8"><title>Alliance Healthcare e-Sipariş</title></head>
+<body>
+  <ul class="nav nav-tabs">
+    <li><a href="#eczane" data-toggle="tab">Eczane Girişi</a></li>
+  </ul>
+  <form id="pharmacyLoginForm" method="post" action="/Account/Login">
+    <input type="text" name="EczaneKodu" id="EczaneKodu" placeholder="Eczane Kodu" />
+    <input type="text" name="KullaniciAdi" id="KullaniciAdi" placeholder="Kullanıcı Adı" />
+    <input type="password" name="Sifre" id="Sifre" placeholder="Şifre" />
+    {error}
+    <button type="submit" class="btn btn-login">Giriş</button>
+  </form>
+</body></html>
+"""
+
+UNIQUE_LOGIN_PAGE = """<!DOCTYPE html>
+<html lang="tr"><head><meta charset="utf-8"><title>Aktif Oturum</title></head>
+<body>
+  <p>Bu kullanıcı ile açık başka bir oturum bulunmaktadır.</p>
+  <form method="post" action="/Account/UniqueLogin">
+    <button type="submit" class="btn btn-danger">Aktif Oturumları Kapat</button>
+  </form>
+</body></html>
+"""
+
+MAIN_PAGE = """<!DOCTYPE html>
+<html lang="tr"><head><meta charset="utf-8"><title>Ana Sayfa</title>
+<link rel="stylesheet" href="/static/site.css"><script src="/static/site.js"></script></head>
+<body><h1>Hoş geldiniz</h1><img src="/static/logo.png" alt="logo"></body></html>
+"""
+
+
+class PortalConfig:
+    def __init__(self, latency_ms: float = 150.0, jitter_ms: float = 100.0, error_rate: float = 0.0,
+                 session_ttl: float = 1800.0, unique_login: bool = False, users: Optional[Dict[str, str]] = None):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.session_ttl = session_ttl
+        self.unique_login = unique_login
+        self.users = users  # None accepts any credentials
+
+    def to_dict(self) -> dict:
+        return {
+            "latency_ms": self.latency_ms,
+            "jitter_ms": self.jitter_ms,
+            "error_rate": self.error_rate,
+            "session_ttl": self.session_ttl,
+            "unique_login": self.unique_login,
+        }
+
+    def update(self, values: dict):
+        for key in ("latency_ms", "jitter_ms", "error_rate", "session_ttl"):
+            if key in values:
+                setattr(self, key, float(values[key]))
+        if "unique_login" in values:
+            self.unique_login = bool(values["unique_login"])
+
+
+def load_catalog(path: str = CATALOG_CSV) -> Dict[int, tuple]:
+    """API_ID -> (name, barcode) from the product archive, if it is there."""
+    catalog = {}
+    try:
+        with open(path, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                try:
+                    catalog[int(row["API_ID"])] = (row["Urun_Ismi"], row["Urun_Barkodu"])
+                except (KeyError, ValueError):
+                    continue
+    except OSError:
+        pass
+    return catalog
+
+
+def create_app(config: Optional[PortalConfig] = None) -> FastAPI:
+    config = config or PortalConfig()
+    catalog = load_catalog()
+    sessions: Dict[str, float] = {}  # token -> created (monotonic)
+    pending: Dict[str, str] = {}     # token waiting on UniqueLogin -> user
+    stats = {"logins": 0, "unique_login_prompts": 0, "item_detail": 0, "errors": 0, "expired": 0, "main_page": 0}
+
+    app = FastAPI(title="Mock Alliance Portal")
+
+    def valid_session(request: Request) -> bool:
+        token = request.cookies.get(SESSION_COOKIE)
+        created = sessions.get(token) if token else None
+        if created is None:
+            return False
+        if config.session_ttl and time.monotonic() - created > config.session_ttl:
+            sessions.pop(token, None)
+            stats["expired"] += 1
+            return False
+        return True
+
+    def start_session(response: Response) -> Response:
+        token = uuid.uuid4().hex
+        sessions[token] = time.monotonic()
+        response.set_cookie(SESSION_COOKIE, token, httponly=True, path="/")
+        return response
+
+    async def upstream_delay():
+        delay = config.latency_ms + random.uniform(0, config.jitter_ms)
+        if delay > 0:
+            await asyncio.sleep(delay / 1000)
+
+    @app.get("/", response_class=HTMLResponse)
+    async def login_page():
+        return LOGIN_PAGE.format(error="")
+
+    @app.post("/Account/Login")
+    async def login(request: Request):
+        # Parsed by hand so the mock does not need python-multipart
+        form = {k: v[0] for k, v in parse_qs((await request.body()).decode()).items()}
+        code, user, password = (form.get(k, "") for k in ("EczaneKodu", "KullaniciAdi", "Sifre"))
+        await upstream_delay()
+        if not (code and user and password) or (
+            config.users is not None and config.users.get(user) != password
+        ):
+            return HTMLResponse(LOGIN_PAGE.format(
+                error='<div class="validation-summary-errors">Kullanıcı bilgileri hatalı</div>'
+            ))
+        stats["logins"] += 1
+        if config.unique_login and sessions:
+            stats["unique_login_prompts"] += 1
+            token = uuid.uuid4().hex
+            pending[token] = user
+            response = RedirectResponse("/Account/UniqueLogin", status_code=302)
+            response.set_cookie("pending_login", token, httponly=True, path="/")
+            return response
+        return start_session(RedirectResponse("/Home/MainPage", status_code=302))
+
+    @app.get("/Account/UniqueLogin", response_class=HTMLResponse)
+    async def unique_login_page():
+        return UNIQUE_LOGIN_PAGE
+
+    @app.post("/Account/UniqueLogin")
+    async def close_other_sessions(request: Request):
+        if pending.pop(request.cookies.get("pending_login", ""), None) is None:
+            return RedirectResponse("/", status_code=302)
+        sessions.clear()
+        return start_session(RedirectResponse("/Home/MainPage", status_code=302))
+
+    @app.get("/Home/MainPage")
+    async def main_page(request: Request):
+        if not valid_session(request):
+            return RedirectResponse("/", status_code=302)
+        stats["main_page"] += 1
+        return HTMLResponse(MAIN_PAGE)
+
+    @app.get("/static/{name}")
+    async def static_asset(name: str):
+        # Stand-ins for the assets the scrapper's request filter should block
+        return Response(b"\0" * 20_000, media_type="application/octet-stream")
+
+    @app.post("/Sales/ItemDetailv3")
+    async def item_detail(request: Request):
+        if not valid_session(request):
+            return RedirectResponse("/", status_code=302)
+        try:
+            item_id = int((await request.json()).get("itemId"))
+        except (ValueError, TypeError, AttributeError):
+            return Response("Bad Request", status_code=400)
+        stats["item_detail"] += 1
+        await upstream_delay()
+        if config.error_rate and random.random() < config.error_rate:
+            stats["errors"] += 1
+            return Response("Internal Server Error", status_code=500)
+        rng = random.Random(item_id)
+        name, barcode = catalog.get(item_id, (f"ÜRÜN {item_id}", f"8699{item_id:09d}"))
+        rows = generate_rows(rng, base_price=rng.uniform(15, 900), count=rng.randint(1, 12))
+        return HTMLResponse(render_item_detail(item_id, name, barcode, rows, rng=rng, duplicate_rows=rng.randint(0, 2)))
+
+    @app.get("/mock/config")
+    async def get_config():
+        return config.to_dict()
+
+    @app.post("/mock/config")
+    async def set_config(request: Request):
+        config.update(await request.json())
+        return config.to_dict()
+
+    @app.post("/mock/expire-sessions")
+    async def expire_sessions():
+        expired = len(sessions)
+        sessions.clear()
+        stats["expired"] += expired
+        return {"expired": expired}
+
+    @app.get("/mock/stats")
+    async def get_stats():
+        return {**stats, "active_sessions": len(sessions)}
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--latency-ms", type=float, default=150.0, help="base ItemDetailv3/login latency")
+    parser.add_argument("--jitter-ms", type=float, default=100.0, help="uniform extra latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of ItemDetailv3 calls answered 500")
+    parser.add_argument("--session-ttl", type=float, default=1800.0, help="seconds before a session expires (0 = never)")
+    parser.add_argument("--unique-login", action="store_true", help="show the UniqueLogin page when a session exists")
+    args = parser.parse_args()
+
+    import uvicorn
+    config = PortalConfig(args.latency_ms, args.jitter_ms, args.error_rate, args.session_ttl, args.unique_login)
+    uvicorn.run(create_app(config), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+Browser Recycler
+Watches Chromium memory and per-context request counts, and asks the
+session manager to rotate in a fresh context (or a whole new browser)
+before a long-running process bloats.
+"""
+import time
+import asyncio
+import logging
+from typing import Optional
+
+import metrics
+
+
+logger = logging.getLogger(__name__)
+
+
+class BrowserRecycler:
+    """
+    Every `interval` seconds:
+      - Chromium RSS above `max_rss_bytes`  -> new browser (RSS belongs to the
+                                              browser process tree, so only a
+                                              relaunch gives it back; only this
+                                              worker's browsers are counted)
+      - context served `max_requests`
+        or is older than `max_age`          -> new context in the same browser
+
+    A threshold of 0 disables that check. The rotation itself (drain, copy
+    storage_state, swap, close) lives in SessionManager.rotate().
+    """
+
+    def __init__(self, manager, max_rss_bytes: float = 0, max_requests: int = 0,
+                 max_age: float = 0, interval: float = 30.0):
+        self.manager = manager
+        self.max_rss_bytes = max_rss_bytes
+        self.max_requests = max_requests
+        self.max_age = max_age
+        self.interval = interval
+        self.context_started = time.monotonic()
+        self.requests_at_start = 0
+        self.rotations = {"context": 0, "browser": 0}
+        self.last_rotation: Optional[dict] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def reset(self):
+        """Called whenever a new context goes live."""
+        self.context_started = time.monotonic()
+        self.requests_at_start = self.manager.context_requests
+
+    @property
+    def context_requests(self) -> int:
+        return self.manager.context_requests - self.requests_at_start
+
+    @property
+    def context_age(self) -> float:
+        return time.monotonic() - self.context_started
+
+    def due(self) -> Optional[tuple]:
+        """(kind, reason) of the rotation needed now, or None."""
+        if self.max_rss_bytes:
+            rss = metrics.browser_memory_bytes()
+            if rss == rss and rss >= self.max_rss_bytes:  # NaN when /proc is unavailable
+                return "browser", f"rss {rss / 1048576:.0f} MiB"
+        if self.max_requests and self.context_requests >= self.max_requests:
+            return "context", f"{self.context_requests} requests"
+        if self.max_age and self.context_age >= self.max_age:
+            return "context", f"age {self.context_age:.0f}s"
+        return None
+
+    async def check(self) -> bool:
+        if self.manager.browser is None or self.manager.context is None:
+            return False
+        due = self.due()
+        if due is None:
+            return False
+        await self.rotate(*due)
+        return True
+
+    async def rotate(self, kind: str, reason: str):
+        started = time.perf_counter()
+        await self.manager.rotate(kind, reason)
+        self.rotations[kind] += 1
+        metrics.BROWSER_ROTATIONS.inc(kind)
+        self.last_rotation = {
+            "kind": kind,
+            "reason": reason,
+            "at": time.time(),
+            "seconds": round(time.perf_counter() - started, 3),
+        }
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.check()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error("❌ Browser rotation failed: %s", e)
+
+    def start(self):
+        if self._task is None and (self.max_rss_bytes or self.max_requests or self.max_age):
+            self._task = asyncio.create_task(self._run())
+            logger.info("♻️ Browser recycling on (rss<=%s MiB, requests<=%s, age<=%ss)",
+                        int(self.max_rss_bytes / 1048576) or "-", self.max_requests or "-", int(self.max_age) or "-")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "context_requests": self.context_requests,
+            "context_age_seconds": round(self.context_age, 1),
+            "browser_memory_bytes": metrics.browser_memory_bytes(),
+            "max_rss_bytes": self.max_rss_bytes,
+            "max_requests": self.max_requests,
+            "max_age_seconds": self.max_age,
+            "rotations": dict(self.rotations),
+            "last_rotation": self.last_rotation,
+        }
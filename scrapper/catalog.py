@@ -0,0 +1,396 @@
+"""
+Product Catalog
+Column-oriented, read-only index over the product archive CSV
+(Sira_ID, API_ID, Urun_Ismi, Urun_Barkodu, Muadil_Barkodlari[, Gorsel_Path])
+with O(1) barcode -> row and API_ID -> row lookups.
+
+The columns and both hash tables are written to a flat binary snapshot that
+is memory-mapped on load, so a restart maps the file instead of parsing the
+CSV and ~14.5k JSON lists again. The snapshot remembers the size and mtime
+of the CSV it was built from and is rebuilt when they change.
+
+Usage:
+    python catalog.py build [--csv ilac_arsivi.csv] [--snapshot catalog.snapshot]
+    python catalog.py lookup <barcode|api_id> [--csv ...] [--snapshot ...]
+"""
+import os
+import sys
+import csv
+import json
+import mmap
+import time
+import zlib
+import struct
+import logging
+from array import array
+from typing import Iterator, List, NamedTuple, Optional
+
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"PDCATLG\0"
+FORMAT_VERSION = 1
+# magic, format version, section count, row count, source size, source mtime_ns
+HEADER = struct.Struct("<8sIIIqq")
+SECTION = struct.Struct("<QQ")  # offset, length
+
+SECTIONS = (
+    "sira_ids", "api_ids",
+    "name_offsets", "names",
+    "barcode_offsets", "barcodes",
+    "muadil_rows", "muadil_offsets", "muadil",
+    "image_rows", "image_offsets", "images",
+    "api_table", "barcode_table",
+)
+# memoryview cast format per section; missing = raw bytes
+SECTION_FORMATS = {
+    "sira_ids": "i", "api_ids": "i",
+    "name_offsets": "I", "barcode_offsets": "I",
+    "muadil_rows": "I", "muadil_offsets": "I",
+    "image_rows": "I", "image_offsets": "I",
+    "api_table": "i", "barcode_table": "i",
+}
+
+
+class CatalogRow(NamedTuple):
+    sira_id: int
+    api_id: int
+    name: str
+    barcode: str
+    muadil: List[str]
+    images: List[str]
+
+
+def _json_list(value: str) -> List[str]:
+    """Decode a JSON list column, dropping blanks and repeats (order kept)."""
+    try:
+        items = json.loads(value) if value else []
+    except ValueError:
+        return []
+    if not isinstance(items, list):
+        return []
+    return list(dict.fromkeys(str(item).strip() for item in items if str(item).strip()))
+
+
+def read_catalog_csv(path: str) -> Iterator[CatalogRow]:
+    """Rows of the product archive; Gorsel_Path is optional, bad IDs are skipped."""
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            try:
+                sira_id, api_id = int(row["Sira_ID"]), int(row["API_ID"])
+            except (KeyError, TypeError, ValueError):
+                continue
+            yield CatalogRow(
+                sira_id,
+                api_id,
+                (row.get("Urun_Ismi") or "").strip(),
+                (row.get("Urun_Barkodu") or "").strip(),
+                _json_list(row.get("Muadil_Barkodlari", "")),
+                _json_list(row.get("Gorsel_Path", "")),
+            )
+
+
+# ============================================================================
+# Hashing (stable across processes, unlike hash())
+# ============================================================================
+def table_size(count: int) -> int:
+    size = 8
+    while size < count * 2:
+        size *= 2
+    return size
+
+
+def int_slot(value: int, mask: int) -> int:
+    return ((value * 2654435761) & 0xFFFFFFFF) & mask
+
+
+def bytes_slot(value: bytes, mask: int) -> int:
+    return zlib.crc32(value) & mask
+
+
+# ============================================================================
+# Snapshot layout: header, section directory, 8-byte aligned sections
+# ============================================================================
+def pack_sections(magic: bytes, version: int, names, sections: dict, count: int,
+                  source_size: int = 0, source_mtime_ns: int = 0) -> bytes:
+    out = bytearray(HEADER.pack(magic, version, len(names), count, source_size, source_mtime_ns))
+    directory_at = len(out)
+    out += bytes(SECTION.size * len(names))
+    for position, name in enumerate(names):
+        out += bytes(-len(out) % 8)  # 8-byte alignment for the casts
+        SECTION.pack_into(out, directory_at + position * SECTION.size, len(out), len(sections[name]))
+        out += sections[name]
+    return bytes(out)
+
+
+def unpack_sections(buffer, magic: bytes, version: int, names, formats: dict):
+    """(count, source size, source mtime_ns, {name: memoryview}) of a snapshot buffer."""
+    view = memoryview(buffer)
+    if len(view) < HEADER.size:
+        raise ValueError("Truncated snapshot")
+    found_magic, found_version, section_count, count, source_size, source_mtime_ns = HEADER.unpack_from(view)
+    if found_magic != magic or found_version != version or section_count != len(names):
+        raise ValueError(f"Not a {magic.rstrip(bytes(1)).decode()} snapshot (or an older format)")
+    sections = {}
+    for position, name in enumerate(names):
+        offset, length = SECTION.unpack_from(view, HEADER.size + position * SECTION.size)
+        section = view[offset:offset + length]
+        fmt = formats.get(name)
+        sections[name] = section.cast(fmt) if fmt else section
+    return count, source_size, source_mtime_ns, sections
+
+
+def write_snapshot(path: str, data: bytes):
+    """Write via a temp file and rename, so readers never map a half-written file."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    # Per-process temp name: several workers may rebuild the same snapshot at once
+    tmp_path = f"{path}.{os.getpid()}"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def map_file(path: str) -> mmap.mmap:
+    with open(path, "rb") as f:
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+# ============================================================================
+# Build
+# ============================================================================
+def string_column(values: List[str]):
+    offsets = array("I", [0])
+    blob = bytearray()
+    for value in values:
+        blob += value.encode("utf-8")
+        offsets.append(len(blob))
+    return offsets, bytes(blob)
+
+
+def _list_column(lists: List[List[str]]):
+    rows = array("I", [0])
+    flat: List[str] = []
+    for items in lists:
+        flat.extend(items)
+        rows.append(len(flat))
+    offsets, blob = string_column(flat)
+    return rows, offsets, blob
+
+
+def build_snapshot(rows: List[CatalogRow], source_size: int = 0, source_mtime_ns: int = 0) -> bytes:
+    """Serialize catalog rows into the snapshot layout."""
+    count = len(rows)
+    encoded_barcodes = [row.barcode.encode("utf-8") for row in rows]
+
+    api_table = array("i", [0]) * table_size(count)
+    mask = len(api_table) - 1
+    for index, row in enumerate(rows):
+        slot = int_slot(row.api_id, mask)
+        while api_table[slot]:
+            if rows[api_table[slot] - 1].api_id == row.api_id:
+                break  # Duplicate API_ID: the first row wins
+            slot = (slot + 1) & mask
+        else:
+            api_table[slot] = index + 1
+
+    barcode_table = array("i", [0]) * table_size(count)
+    mask = len(barcode_table) - 1
+    for index, barcode in enumerate(encoded_barcodes):
+        if not barcode:
+            continue
+        slot = bytes_slot(barcode, mask)
+        while barcode_table[slot]:
+            if encoded_barcodes[barcode_table[slot] - 1] == barcode:
+                break
+            slot = (slot + 1) & mask
+        else:
+            barcode_table[slot] = index + 1
+
+    name_offsets, names = string_column([row.name for row in rows])
+    barcode_offsets, barcodes = string_column([row.barcode for row in rows])
+    muadil_rows, muadil_offsets, muadil = _list_column([row.muadil for row in rows])
+    image_rows, image_offsets, images = _list_column([row.images for row in rows])
+    sections = {
+        "sira_ids": array("i", (row.sira_id for row in rows)).tobytes(),
+        "api_ids": array("i", (row.api_id for row in rows)).tobytes(),
+        "name_offsets": name_offsets.tobytes(), "names": names,
+        "barcode_offsets": barcode_offsets.tobytes(), "barcodes": barcodes,
+        "muadil_rows": muadil_rows.tobytes(), "muadil_offsets": muadil_offsets.tobytes(), "muadil": muadil,
+        "image_rows": image_rows.tobytes(), "image_offsets": image_offsets.tobytes(), "images": images,
+        "api_table": api_table.tobytes(), "barcode_table": barcode_table.tobytes(),
+    }
+
+    return pack_sections(MAGIC, FORMAT_VERSION, SECTIONS, sections, count, source_size, source_mtime_ns)
+
+
+# ============================================================================
+# Catalog
+# ============================================================================
+class Catalog:
+    """Read-only view over a snapshot buffer (bytes or an mmap)."""
+
+    def __init__(self, buffer, source: str = ""):
+        self._buffer = buffer
+        self.source = source
+        self.count, self.source_size, self.source_mtime_ns, sections = unpack_sections(
+            buffer, MAGIC, FORMAT_VERSION, SECTIONS, SECTION_FORMATS)
+        for name, section in sections.items():
+            setattr(self, "_" + name, section)
+        self._api_mask = len(self._api_table) - 1
+        self._barcode_mask = len(self._barcode_table) - 1
+
+    def __len__(self) -> int:
+        return self.count
+
+    # ------------------------------------------------------------------
+    # Lookups
+    # ------------------------------------------------------------------
+    def find_api_id(self, api_id: int) -> Optional[int]:
+        """Row index for an API_ID (the portal's ItemDetailv3 itemId)."""
+        slot = int_slot(api_id, self._api_mask)
+        while True:
+            entry = self._api_table[slot]
+            if not entry:
+                return None
+            if self._api_ids[entry - 1] == api_id:
+                return entry - 1
+            slot = (slot + 1) & self._api_mask
+
+    def find_barcode(self, barcode: str) -> Optional[int]:
+        """Row index for a product barcode."""
+        encoded = barcode.strip().encode("utf-8")
+        if not encoded:
+            return None
+        slot = bytes_slot(encoded, self._barcode_mask)
+        while True:
+            entry = self._barcode_table[slot]
+            if not entry:
+                return None
+            row = entry - 1
+            if self._barcodes[self._barcode_offsets[row]:self._barcode_offsets[row + 1]] == encoded:
+                return row
+            slot = (slot + 1) & self._barcode_mask
+
+    # ------------------------------------------------------------------
+    # Columns
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _string(blob, offsets, index: int) -> str:
+        return bytes(blob[offsets[index]:offsets[index + 1]]).decode("utf-8")
+
+    def _list(self, rows, offsets, blob, index: int) -> List[str]:
+        return [self._string(blob, offsets, item) for item in range(rows[index], rows[index + 1])]
+
+    def sira_id(self, row: int) -> int:
+        return self._sira_ids[row]
+
+    def api_id(self, row: int) -> int:
+        return self._api_ids[row]
+
+    def name(self, row: int) -> str:
+        return self._string(self._names, self._name_offsets, row)
+
+    def barcode(self, row: int) -> str:
+        return self._string(self._barcodes, self._barcode_offsets, row)
+
+    def muadil(self, row: int) -> List[str]:
+        return self._list(self._muadil_rows, self._muadil_offsets, self._muadil, row)
+
+    def images(self, row: int) -> List[str]:
+        return self._list(self._image_rows, self._image_offsets, self._images, row)
+
+    def row(self, row: int) -> CatalogRow:
+        return CatalogRow(self.sira_id(row), self.api_id(row), self.name(row), self.barcode(row),
+                          self.muadil(row), self.images(row))
+
+    def to_dict(self, row: int) -> dict:
+        return {
+            "sira_id": self.sira_id(row),
+            "api_id": self.api_id(row),
+            "name": self.name(row),
+            "barcode": self.barcode(row),
+            "muadil_barcodes": self.muadil(row),
+            "image_paths": self.images(row),
+        }
+
+    def stats(self) -> dict:
+        return {
+            "source": self.source,
+            "products": self.count,
+            "snapshot_bytes": len(self._buffer),
+            "muadil_links": len(self._muadil_offsets) - 1,
+            "images": len(self._image_offsets) - 1,
+        }
+
+
+def source_fingerprint(csv_path: str):
+    stat = os.stat(csv_path)
+    return stat.st_size, stat.st_mtime_ns
+
+
+def build_catalog(csv_path: str, snapshot_path: Optional[str] = None) -> Catalog:
+    """Parse the CSV, write the snapshot (atomically) if a path is given, and load it."""
+    size, mtime_ns = source_fingerprint(csv_path)
+    data = build_snapshot(list(read_catalog_csv(csv_path)), size, mtime_ns)
+    if snapshot_path:
+        try:
+            write_snapshot(snapshot_path, data)
+            return map_snapshot(snapshot_path, csv_path)
+        except OSError as e:
+            logger.warning("⚠️ Cannot write catalog snapshot %s: %s", snapshot_path, e)
+    return Catalog(data, csv_path)
+
+
+def map_snapshot(snapshot_path: str, source: str = "") -> Catalog:
+    return Catalog(map_file(snapshot_path), source)
+
+
+def load_catalog(csv_path: str, snapshot_path: Optional[str] = None) -> Catalog:
+    """Map the snapshot if it matches the CSV, otherwise rebuild it from the CSV."""
+    if snapshot_path and os.path.exists(snapshot_path):
+        try:
+            catalog = map_snapshot(snapshot_path, csv_path)
+            if (catalog.source_size, catalog.source_mtime_ns) == source_fingerprint(csv_path):
+                return catalog
+            logger.info("📚 %s changed, rebuilding the catalog snapshot", csv_path)
+        except (OSError, ValueError) as e:
+            logger.warning("⚠️ Unusable catalog snapshot %s: %s", snapshot_path, e)
+    return build_catalog(csv_path, snapshot_path)
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=("build", "lookup"))
+    parser.add_argument("key", nargs="?")
+    parser.add_argument("--csv", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "ilac_arsivi.csv"))
+    parser.add_argument("--snapshot", default="catalog.snapshot")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        started = time.perf_counter()
+        catalog = build_catalog(args.csv, args.snapshot)
+        built = time.perf_counter() - started
+        started = time.perf_counter()
+        map_snapshot(args.snapshot, args.csv)
+        mapped = time.perf_counter() - started
+        print(f"📚 {len(catalog)} products, snapshot {catalog.stats()['snapshot_bytes'] / 1024:.0f} KiB")
+        print(f"⏱️ CSV parse + build {built * 1000:.1f} ms, snapshot map {mapped * 1000:.2f} ms")
+        return 0
+
+    if not args.key:
+        parser.error("lookup needs a barcode or API_ID")
+    catalog = load_catalog(args.csv, args.snapshot)
+    row = catalog.find_barcode(args.key)
+    if row is None and args.key.isdigit():
+        row = catalog.find_api_id(int(args.key))
+    if row is None:
+        print(f"❌ {args.key} not found")
+        return 1
+    print(json.dumps(catalog.to_dict(row), ensure_ascii=False, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,233 @@
+"""
+Catalog Delta
+Compares two versions of the product archive CSV and writes what changed
+as NDJSON, so a catalog refresh can apply a few hundred rows instead of
+reseeding all ~14.5k:
+
+    {"format": "catalog-delta", "version": 1, "key": "API_ID", "columns": [...], ...}
+    {"op": "insert", "key": 171234, "row": {"Sira_ID": 14583, "API_ID": 171234, ...}}
+    {"op": "update", "key": 35, "changes": {"Urun_Ismi": "ACYL 15 GR KREM"}}
+    {"op": "delete", "key": 24}
+    {"op": "summary", "inserts": 1, "updates": 1, "deletes": 1, "unchanged": 14581, "renumbered": 99, ...}
+
+Both files are streamed: each is cut into key-sorted runs of --run-size
+rows spilled to temp files, the runs are k-way merged and the two sorted
+streams are merge-joined, so memory stays at one run however large the
+archive grows. Lists are compared normalized - muadil barcodes deduplicated
+and sorted (their order carries no meaning), image paths deduplicated in
+their original order (the first one is the primary image). The first row
+wins when a key repeats within a file.
+
+Sira_ID is only the row number of a name-sorted export, so one insert near
+the top shifts it for every row below. Keyed by API_ID, it is therefore left
+out of updates (rows whose only change it is count as "renumbered");
+--row-numbers puts it back.
+
+Usage:
+    python catalog_delta.py old.csv new.csv [-o delta.ndjson[.gz]] [--key api_id|sira_id]
+                            [--run-size 50000] [--row-numbers]
+"""
+import os
+import sys
+import gzip
+import json
+import heapq
+import tempfile
+from contextlib import ExitStack
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from catalog import CatalogRow, read_catalog_csv
+
+
+DELTA_FORMAT = "catalog-delta"
+DELTA_VERSION = 1
+
+# CatalogRow field -> archive CSV column
+COLUMNS = (
+    ("sira_id", "Sira_ID"),
+    ("api_id", "API_ID"),
+    ("name", "Urun_Ismi"),
+    ("barcode", "Urun_Barkodu"),
+    ("muadil", "Muadil_Barkodlari"),
+    ("images", "Gorsel_Path"),
+)
+KEYS = {"api_id": "API_ID", "sira_id": "Sira_ID"}
+DEFAULT_RUN_SIZE = 50_000
+
+Record = Tuple[int, list]  # (key, column values in COLUMNS order)
+
+
+def normalize(row: CatalogRow) -> list:
+    """Column values as compared and written: muadil sorted, image order kept."""
+    return [row.sira_id, row.api_id, row.name, row.barcode, sorted(row.muadil), row.images]
+
+
+# ============================================================================
+# External sort
+# ============================================================================
+def _spill(records: List[Record], directory: str) -> str:
+    records.sort(key=lambda record: record[0])
+    fd, path = tempfile.mkstemp(suffix=".run", dir=directory)
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        for record in records:
+            f.write(json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n")
+    return path
+
+
+def _read_run(path: str) -> Iterator[Record]:
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            key, values = json.loads(line)
+            yield key, values
+
+
+def sorted_records(csv_path: str, key: str, directory: str, run_size: int = DEFAULT_RUN_SIZE,
+                   stats: Optional[Dict[str, int]] = None) -> Iterator[Record]:
+    """
+    Rows of `csv_path` in key order, holding at most `run_size` rows in
+    memory. Later rows with an already seen key are dropped (and counted).
+    """
+    position = [field for field, _ in COLUMNS].index(key)
+    runs: List[str] = []
+    records: List[Record] = []
+    rows = 0
+    for row in read_catalog_csv(csv_path):
+        values = normalize(row)
+        # (key, file order) keeps the first of equal keys first after merging
+        records.append(((values[position], rows), values))
+        rows += 1
+        if len(records) >= run_size:
+            runs.append(_spill(records, directory))
+            records = []
+    if stats is not None:
+        stats["rows"] = rows
+        stats["duplicate_keys"] = 0
+
+    if runs:
+        if records:
+            runs.append(_spill(records, directory))
+        merged: Iterable = heapq.merge(*(_read_run(path) for path in runs), key=lambda record: record[0])
+    else:
+        records.sort(key=lambda record: record[0])
+        merged = records
+
+    previous = None
+    for (record_key, _), values in merged:
+        if record_key == previous:
+            if stats is not None:
+                stats["duplicate_keys"] += 1
+            continue
+        previous = record_key
+        yield record_key, values
+
+
+# ============================================================================
+# Diff
+# ============================================================================
+def diff(old: Iterator[Record], new: Iterator[Record], ignored: Iterable[str] = ()) -> Iterator[dict]:
+    """
+    Merge-join two key-sorted record streams into delta ops (without the
+    header). Changes to `ignored` columns are counted as renumbered rows
+    instead of being written as updates.
+    """
+    names = [column for _, column in COLUMNS]
+    ignored = frozenset(ignored)
+    counts = dict.fromkeys(("inserts", "updates", "deletes", "unchanged", "renumbered"), 0)
+    changed_columns = dict.fromkeys(names, 0)
+    sentinel = (None, None)
+    old_record = next(old, sentinel)
+    new_record = next(new, sentinel)
+    while old_record is not sentinel or new_record is not sentinel:
+        if new_record is sentinel or (old_record is not sentinel and old_record[0] < new_record[0]):
+            counts["deletes"] += 1
+            yield {"op": "delete", "key": old_record[0]}
+            old_record = next(old, sentinel)
+        elif old_record is sentinel or new_record[0] < old_record[0]:
+            counts["inserts"] += 1
+            yield {"op": "insert", "key": new_record[0], "row": dict(zip(names, new_record[1]))}
+            new_record = next(new, sentinel)
+        else:
+            changes = {name: after for name, before, after in zip(names, old_record[1], new_record[1])
+                       if before != after}
+            if ignored.intersection(changes):
+                counts["renumbered"] += 1
+                changes = {name: after for name, after in changes.items() if name not in ignored}
+            if changes:
+                counts["updates"] += 1
+                for name in changes:
+                    changed_columns[name] += 1
+                yield {"op": "update", "key": new_record[0], "changes": changes}
+            else:
+                counts["unchanged"] += 1
+            old_record = next(old, sentinel)
+            new_record = next(new, sentinel)
+    yield {"op": "summary", **counts,
+           "changed_columns": {name: count for name, count in changed_columns.items() if count}}
+
+
+def write_delta(old_path: str, new_path: str, out, key: str = "api_id",
+                run_size: int = DEFAULT_RUN_SIZE, row_numbers: bool = False) -> dict:
+    """
+    Write the delta from `old_path` to `new_path` to the text stream `out`;
+    returns the summary. Sira_ID changes are only written when it is the key
+    or `row_numbers` is set.
+    """
+    if key not in KEYS:
+        raise ValueError(f"Unknown key {key!r}, expected one of {sorted(KEYS)}")
+    ignored = [] if key == "sira_id" or row_numbers else [KEYS["sira_id"]]
+    old_stats: Dict[str, int] = {}
+    new_stats: Dict[str, int] = {}
+    with tempfile.TemporaryDirectory(prefix="catalog-delta-") as directory:
+        header = {
+            "format": DELTA_FORMAT,
+            "version": DELTA_VERSION,
+            "key": KEYS[key],
+            "columns": [column for _, column in COLUMNS],
+            "ignored_columns": ignored,
+            "old": os.path.basename(old_path),
+            "new": os.path.basename(new_path),
+        }
+        out.write(json.dumps(header, ensure_ascii=False, separators=(",", ":")) + "\n")
+        ops = diff(sorted_records(old_path, key, directory, run_size, old_stats),
+                   sorted_records(new_path, key, directory, run_size, new_stats), ignored)
+        for op in ops:
+            if op["op"] == "summary":
+                op.update(old_rows=old_stats["rows"], new_rows=new_stats["rows"],
+                          duplicate_keys=old_stats["duplicate_keys"] + new_stats["duplicate_keys"])
+            out.write(json.dumps(op, ensure_ascii=False, separators=(",", ":")) + "\n")
+    return op
+
+
+def main():
+    import time
+    import argparse
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("old", help="previous catalog CSV")
+    parser.add_argument("new", help="current catalog CSV")
+    parser.add_argument("-o", "--output", default="-", help="delta file (.gz to compress); default stdout")
+    parser.add_argument("--key", choices=sorted(KEYS), default="api_id")
+    parser.add_argument("--run-size", type=int, default=DEFAULT_RUN_SIZE, help="rows held in memory per sorted run")
+    parser.add_argument("--row-numbers", action="store_true", help="also write Sira_ID changes when keyed by API_ID")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    with ExitStack() as stack:
+        if args.output == "-":
+            out = sys.stdout
+        elif args.output.endswith(".gz"):
+            out = stack.enter_context(gzip.open(args.output, "wt", encoding="utf-8"))
+        else:
+            out = stack.enter_context(open(args.output, "w", encoding="utf-8"))
+        summary = write_delta(args.old, args.new, out, args.key, max(1, args.run_size), args.row_numbers)
+    print(f"🧮 {summary['old_rows']} -> {summary['new_rows']} rows: +{summary['inserts']} "
+          f"~{summary['updates']} -{summary['deletes']} ({summary['unchanged']} unchanged, "
+          f"{summary['renumbered']} renumbered) "
+          f"in {(time.perf_counter() - started) * 1000:.0f} ms", file=sys.stderr)
+    if summary["duplicate_keys"]:
+        print(f"⚠️ {summary['duplicate_keys']} rows dropped for repeating a {KEYS[args.key]}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
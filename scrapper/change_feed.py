@@ -0,0 +1,84 @@
+"""
+Change Feed
+Diffs a newly parsed barem set against the previous one for the same item
+and fans the resulting change records out to live subscribers (SSE).
+"""
+import asyncio
+import logging
+from typing import List, Optional, Set
+
+from models import BaremInfo
+from barem_parser import barem_key
+
+
+logger = logging.getLogger(__name__)
+
+
+def _keyed(barems: List[dict]) -> dict:
+    keyed = {}
+    for barem in barems or []:
+        keyed.setdefault(barem_key(BaremInfo(**barem)), barem)
+    return keyed
+
+
+def diff_barems(old: List[dict], new: List[dict]) -> Optional[dict]:
+    """
+    Compare two barem lists (payload dicts) by barem_key.
+
+    Returns {"added": [...], "removed": [...], "changed": [{"before", "after"}]}
+    or None when nothing differs. "changed" holds rows whose key is the same
+    but other columns (discounts, warehouse) moved.
+    """
+    old_keyed, new_keyed = _keyed(old), _keyed(new)
+    added = [b for k, b in new_keyed.items() if k not in old_keyed]
+    removed = [b for k, b in old_keyed.items() if k not in new_keyed]
+    changed = [
+        {"before": old_keyed[k], "after": b}
+        for k, b in new_keyed.items()
+        if k in old_keyed and old_keyed[k] != b
+    ]
+    if not (added or removed or changed):
+        return None
+    return {"added": added, "removed": removed, "changed": changed}
+
+
+class ChangeFeed:
+    """
+    In-process fan-out of change records to subscribers.
+
+    Each subscriber gets a bounded queue; one that falls `max_queue` records
+    behind is dropped (its queue receives None) and is expected to reconnect
+    and replay from the store using its last cursor.
+    """
+
+    def __init__(self, max_queue: int = 1000):
+        self.max_queue = max_queue
+        self._subscribers: Set[asyncio.Queue] = set()
+        self.published = 0
+        self.dropped_subscribers = 0
+
+    def subscribe(self) -> asyncio.Queue:
+        queue: asyncio.Queue = asyncio.Queue(self.max_queue + 1)
+        self._subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        self._subscribers.discard(queue)
+
+    def publish(self, change: dict):
+        self.published += 1
+        for queue in list(self._subscribers):
+            if queue.qsize() >= self.max_queue:
+                self._subscribers.discard(queue)
+                self.dropped_subscribers += 1
+                queue.put_nowait(None)  # Slot reserved by the +1 above
+                logger.warning("⚠️ Dropped a slow change-feed subscriber")
+                continue
+            queue.put_nowait(change)
+
+    def stats(self) -> dict:
+        return {
+            "subscribers": len(self._subscribers),
+            "published": self.published,
+            "dropped_subscribers": self.dropped_subscribers,
+        }
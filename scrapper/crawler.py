@@ -0,0 +1,284 @@
+"""
+Catalog Crawler
+Background walk over every API_ID in ilac_arsivi.csv that refreshes the
+barem store at a fixed rate, yielding to interactive requests.
+"""
+import os
+import csv
+import json
+import time
+import asyncio
+import logging
+from datetime import datetime
+from typing import Awaitable, Callable, List, Optional, Set
+
+from ratelimit import TokenBucket, Backpressure
+
+
+logger = logging.getLogger(__name__)
+
+
+def load_api_ids(csv_path: str) -> List[int]:
+    """Unique API_IDs from the product archive, in file order."""
+    ids = {}
+    with open(csv_path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            try:
+                ids[int(row["API_ID"])] = None
+            except (KeyError, TypeError, ValueError):
+                continue
+    return list(ids)
+
+
+class InteractiveGate:
+    """
+    Counts interactive requests in flight. Background work calls
+    `wait_idle()` and only proceeds once no interactive request has been
+    running for `grace` seconds.
+    """
+
+    def __init__(self, grace: float = 1.0):
+        self.grace = grace
+        self.active = 0
+        self._last_active = 0.0
+        self._idle = asyncio.Event()
+        self._idle.set()
+
+    async def __aenter__(self):
+        self.active += 1
+        self._idle.clear()
+        return self
+
+    async def __aexit__(self, *exc):
+        self.active -= 1
+        self._last_active = time.monotonic()
+        if self.active == 0:
+            self._idle.set()
+
+    async def wait_idle(self):
+        while True:
+            await self._idle.wait()
+            quiet_for = time.monotonic() - self._last_active
+            if quiet_for >= self.grace:
+                if self.active == 0:
+                    return
+                continue
+            await asyncio.sleep(self.grace - quiet_for)
+
+
+class BaremCrawler:
+    """
+    Walks `item_ids` in order with `concurrency` workers paced by a token
+    bucket. Items stored more recently than `min_age` seconds are skipped.
+
+    Progress (the first index not yet finished, the pass number and the
+    paused flag) is checkpointed to a JSON file, so a restart resumes where
+    it stopped; at most `concurrency` items are fetched twice.
+    """
+
+    def __init__(
+        self,
+        item_ids: List[int],
+        fetch: Callable[[int], Awaitable[bool]],
+        stored_age: Callable[[int], Awaitable[Optional[float]]],
+        ready: Callable[[], bool],
+        checkpoint_path: str,
+        rate: float = 0.5,
+        concurrency: int = 2,
+        min_age: float = 86400.0,
+        pass_interval: float = 86400.0,
+        gate: Optional[InteractiveGate] = None,
+    ):
+        self.item_ids = item_ids
+        self.fetch = fetch
+        self.stored_age = stored_age
+        self.ready = ready
+        self.checkpoint_path = checkpoint_path
+        self.bucket = TokenBucket(rate, capacity=1)
+        self.concurrency = max(1, concurrency)
+        self.min_age = min_age
+        self.pass_interval = pass_interval
+        self.gate = gate or InteractiveGate()
+
+        self.position = 0
+        self.pass_number = 1
+        self.paused = False
+        self._running = asyncio.Event()
+        self._next = 0
+        self._done: Set[int] = set()
+        self._task: Optional[asyncio.Task] = None
+        self._last_checkpoint = 0.0
+
+        self.fetched = 0
+        self.skipped = 0
+        self.errors = 0
+        self.started_at: Optional[float] = None
+        self.last_item_id: Optional[int] = None
+        self.last_pass_finished_at: Optional[str] = None
+
+    # ------------------------------------------------------------------
+    # Checkpoint
+    # ------------------------------------------------------------------
+    def _load_checkpoint(self, default_paused: bool):
+        self.paused = default_paused
+        try:
+            with open(self.checkpoint_path, encoding="utf-8") as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return
+        self.position = min(max(0, int(state.get("position", 0))), len(self.item_ids))
+        self.pass_number = int(state.get("pass", 1))
+        self.paused = bool(state.get("paused", default_paused))
+        self.last_pass_finished_at = state.get("last_pass_finished_at")
+        logger.info("🕷️ Crawler checkpoint: pass %d at %d/%d", self.pass_number, self.position, len(self.item_ids))
+
+    def _save_checkpoint(self):
+        state = {
+            "position": self.position,
+            "pass": self.pass_number,
+            "paused": self.paused,
+            "total": len(self.item_ids),
+            "last_pass_finished_at": self.last_pass_finished_at,
+            "updated_at": datetime.now().isoformat(),
+        }
+        try:
+            os.makedirs(os.path.dirname(self.checkpoint_path) or ".", exist_ok=True)
+            tmp_path = self.checkpoint_path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(state, f)
+            os.replace(tmp_path, self.checkpoint_path)
+            self._last_checkpoint = time.monotonic()
+        except OSError as e:
+            logger.warning("⚠️ Failed to write crawler checkpoint: %s", e)
+
+    def _complete(self, index: int):
+        """Mark an index finished and advance the contiguous watermark."""
+        self._done.add(index)
+        while self.position in self._done:
+            self._done.discard(self.position)
+            self.position += 1
+        if time.monotonic() - self._last_checkpoint >= 5.0:
+            self._save_checkpoint()
+
+    # ------------------------------------------------------------------
+    # Work loop
+    # ------------------------------------------------------------------
+    async def _crawl_one(self, item_id: int):
+        age = await self.stored_age(item_id)
+        if age is not None and age < self.min_age:
+            self.skipped += 1
+            return
+        await self.bucket.acquire()
+        await self.gate.wait_idle()
+        self.last_item_id = item_id
+        if await self.fetch(item_id):
+            self.fetched += 1
+        else:
+            self.errors += 1
+
+    async def _worker(self):
+        while self._next < len(self.item_ids):
+            await self._running.wait()
+            while not self.ready():
+                await asyncio.sleep(5)
+            if self._next >= len(self.item_ids):
+                return
+            index = self._next
+            self._next += 1
+            while True:
+                try:
+                    await self._crawl_one(self.item_ids[index])
+                    break
+                except Backpressure as e:
+                    # Portal limiter/breaker said no - wait it out, keep the item
+                    await asyncio.sleep(e.retry_after)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    self.errors += 1
+                    logger.warning("⚠️ Crawler failed on item %d: %s", self.item_ids[index], e)
+                    break
+            self._complete(index)
+
+    async def _run(self):
+        while True:
+            self._next = self.position
+            self._done.clear()
+            if self.position < len(self.item_ids):
+                logger.info("🕷️ Crawl pass %d from %d/%d", self.pass_number, self.position, len(self.item_ids))
+                await asyncio.gather(*(self._worker() for _ in range(self.concurrency)))
+                self.last_pass_finished_at = datetime.now().isoformat()
+                logger.info("🕷️ Crawl pass %d finished (fetched=%d, skipped=%d, errors=%d)",
+                            self.pass_number, self.fetched, self.skipped, self.errors)
+                self._save_checkpoint()
+            # position == total marks the pass done (also across restarts)
+            await asyncio.sleep(self.pass_interval)
+            self.pass_number += 1
+            self.position = 0
+            self._save_checkpoint()
+
+    # ------------------------------------------------------------------
+    # Control
+    # ------------------------------------------------------------------
+    def start(self, paused: bool = True):
+        """Start the loop; a checkpointed paused/running flag wins over `paused`."""
+        if self._task is not None:
+            return
+        self._load_checkpoint(paused)
+        if not self.paused:
+            self._running.set()
+        self.started_at = time.monotonic()
+        self._task = asyncio.create_task(self._run())
+
+    def pause(self):
+        self.paused = True
+        self._running.clear()
+        self._save_checkpoint()
+        logger.info("⏸️ Crawler paused at %d/%d", self.position, len(self.item_ids))
+
+    def resume(self):
+        self.paused = False
+        self._running.set()
+        self._save_checkpoint()
+        logger.info("▶️ Crawler resumed at %d/%d", self.position, len(self.item_ids))
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            self._save_checkpoint()
+
+    def status(self) -> dict:
+        total = len(self.item_ids)
+        elapsed = time.monotonic() - self.started_at if self.started_at else 0.0
+        if self._task is None:
+            state = "stopped"
+        elif self.paused:
+            state = "paused"
+        elif not self.ready():
+            state = "waiting_for_session"
+        elif self.position >= total:
+            state = "idle"
+        else:
+            state = "running"
+        remaining = max(0, total - self.position)
+        return {
+            "state": state,
+            "pass": self.pass_number,
+            "position": self.position,
+            "total": total,
+            "progress": round(self.position / total, 4) if total else 1.0,
+            "fetched": self.fetched,
+            "skipped": self.skipped,
+            "errors": self.errors,
+            "last_item_id": self.last_item_id,
+            "last_pass_finished_at": self.last_pass_finished_at,
+            "interactive_inflight": self.gate.active,
+            "rate_per_second": self.bucket.rate,
+            "eta_seconds": round(remaining / self.bucket.rate) if state == "running" else None,
+            "uptime_seconds": round(elapsed, 1),
+        }
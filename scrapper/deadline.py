@@ -0,0 +1,84 @@
+"""
+Request Deadlines
+A per-request deadline carried in a contextvar from the HTTP handler down
+to the upstream fetch, so work that can no longer finish in time is shed
+before it reaches the portal and upstream calls never outlive their caller.
+"""
+import math
+import time
+import contextvars
+from contextlib import contextmanager
+from typing import Optional
+
+from ratelimit import Backpressure
+
+
+# Relative budget in seconds, e.g. "X-Request-Timeout: 25"
+DEADLINE_HEADER = "x-request-timeout"
+
+
+class DeadlineExceeded(Backpressure):
+    """The request's deadline passed, or would pass before the portal could answer."""
+
+    status_code = 504
+
+    def __init__(self, message: str):
+        super().__init__(message, retry_after=1.0)
+
+
+_deadline: contextvars.ContextVar = contextvars.ContextVar("scrapper_deadline", default=None)
+
+
+def remaining() -> Optional[float]:
+    """Seconds left for the current request, None when it has no deadline."""
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+@contextmanager
+def scope(seconds: Optional[float]):
+    """Run the enclosed code under a deadline `seconds` from now (an outer, earlier one wins)."""
+    if seconds is None:
+        yield
+        return
+    deadline = time.monotonic() + max(0.0, seconds)
+    outer = _deadline.get()
+    token = _deadline.set(deadline if outer is None else min(outer, deadline))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def detached() -> contextvars.Context:
+    """A copy of the current context without the deadline, for work shared beyond this request."""
+    context = contextvars.copy_context()
+    context.run(_deadline.set, None)
+    return context
+
+
+def check(needed: float = 0.0, stage: str = ""):
+    """Raise DeadlineExceeded unless at least `needed` seconds are left."""
+    left = remaining()
+    if left is not None and left < needed:
+        where = f" at {stage}" if stage else ""
+        if left <= 0:
+            raise DeadlineExceeded(f"Request deadline passed{where}")
+        raise DeadlineExceeded(f"{left:.1f}s left{where}, about {needed:.1f}s needed")
+
+
+def bounded(timeout: float) -> float:
+    """`timeout` capped by the time left on the current deadline."""
+    left = remaining()
+    return timeout if left is None else max(0.0, min(timeout, left))
+
+
+def parse_header(value: Optional[str], default: Optional[float], maximum: float) -> Optional[float]:
+    """Budget from the deadline header, falling back to `default`; capped at `maximum`."""
+    try:
+        seconds = float(value) if value else default
+    except ValueError:
+        seconds = default
+    if seconds is None or not math.isfinite(seconds) or seconds <= 0:
+        return default
+    return min(seconds, maximum)
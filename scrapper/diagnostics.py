@@ -0,0 +1,184 @@
+"""
+Diagnostics
+Queue-based logging setup and a bounded in-memory ring of debug captures
+(sampled raw upstream responses and slow-request traces).
+"""
+import sys
+import time
+import random
+import logging
+import logging.handlers
+from queue import SimpleQueue
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Optional, Dict, List
+
+
+# ============================================================================
+# Logging
+# ============================================================================
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def setup_logging(level: str = "INFO") -> logging.handlers.QueueListener:
+    """
+    Route all records through a QueueHandler so the event loop only
+    enqueues; a listener thread does the formatting and stream writes.
+    """
+    global _listener
+    if _listener is not None:
+        return _listener
+
+    queue: SimpleQueue = SimpleQueue()
+    stream = logging.StreamHandler(sys.stdout)
+    stream.setFormatter(logging.Formatter("%(asctime)s %(levelname)-7s %(name)s: %(message)s"))
+
+    root = logging.getLogger()
+    root.handlers = [logging.handlers.QueueHandler(queue)]
+    root.setLevel(level.upper())
+
+    _listener = logging.handlers.QueueListener(queue, stream, respect_handler_level=False)
+    _listener.start()
+    return _listener
+
+
+def stop_logging():
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+# ============================================================================
+# Request traces
+# ============================================================================
+class Trace:
+    """Wall-clock timings of the named stages of one request."""
+
+    __slots__ = ("kind", "item_id", "started", "stages", "status", "error", "_last_mark")
+
+    def __init__(self, kind: str, item_id: Optional[int] = None):
+        self.kind = kind
+        self.item_id = item_id
+        self.started = time.perf_counter()
+        self.stages: Dict[str, float] = {}
+        self.status: Optional[int] = None
+        self.error: Optional[str] = None
+        self._last_mark = self.started
+
+    def mark(self, name: str):
+        """Attribute the time since the previous mark (or the start) to `name`."""
+        now = time.perf_counter()
+        self.stages[name] = self.stages.get(name, 0.0) + (now - self._last_mark)
+        self._last_mark = now
+
+    @contextmanager
+    def stage(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._last_mark = time.perf_counter()
+            self.stages[name] = self.stages.get(name, 0.0) + (self._last_mark - started)
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def to_dict(self) -> dict:
+        return {
+            "kind": self.kind,
+            "item_id": self.item_id,
+            "elapsed_ms": round(self.elapsed * 1000, 1),
+            "stages_ms": {name: round(seconds * 1000, 1) for name, seconds in self.stages.items()},
+            "status": self.status,
+            "error": self.error,
+        }
+
+
+# ============================================================================
+# Capture ring
+# ============================================================================
+class CaptureRing:
+    """
+    Keeps the last `size` captures in memory.
+
+    mode:
+      - "off":     nothing is kept
+      - "sampled": raw responses kept with probability `sample_rate`,
+                   slow traces (>= slow_ms) always kept
+      - "all":     every raw response and every trace is kept
+    """
+
+    MODES = ("off", "sampled", "all")
+
+    def __init__(self, mode: str = "sampled", sample_rate: float = 0.01, size: int = 50,
+                 slow_ms: float = 2000.0, max_body_bytes: int = 200_000):
+        self.mode = mode if mode in self.MODES else "sampled"
+        self.sample_rate = max(0.0, min(1.0, sample_rate))
+        self.slow_ms = slow_ms
+        self.max_body_bytes = max_body_bytes
+        self._ring: deque = deque(maxlen=max(1, size))
+        self._seq = 0
+        self.dropped = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode != "off"
+
+    def sample(self) -> bool:
+        """Cheap per-request decision whether to keep the raw response."""
+        if self.mode == "all":
+            return True
+        if self.mode == "off" or self.sample_rate <= 0.0:
+            return False
+        return random.random() < self.sample_rate
+
+    def _append(self, entry: dict):
+        self._seq += 1
+        entry["seq"] = self._seq
+        entry["captured_at"] = datetime.now().isoformat()
+        if len(self._ring) == self._ring.maxlen:
+            self.dropped += 1
+        self._ring.append(entry)
+
+    def record_response(self, kind: str, item_id: Optional[int], body: str, status: Optional[int] = None):
+        if not self.enabled:
+            return
+        truncated = len(body) > self.max_body_bytes
+        self._append({
+            "type": "response",
+            "kind": kind,
+            "item_id": item_id,
+            "status": status,
+            "bytes": len(body),
+            "truncated": truncated,
+            "body": body[:self.max_body_bytes] if truncated else body,
+        })
+
+    def finish(self, trace: Trace):
+        """Keep the trace if it was slow (or everything is being captured)."""
+        if not self.enabled:
+            return
+        if self.mode == "all" or trace.elapsed * 1000 >= self.slow_ms:
+            entry = trace.to_dict()
+            entry["type"] = "trace"
+            self._append(entry)
+
+    def snapshot(self, capture_type: Optional[str] = None, limit: int = 50) -> List[dict]:
+        entries = [e for e in reversed(self._ring) if capture_type is None or e["type"] == capture_type]
+        return entries[:max(0, limit)]
+
+    def clear(self):
+        self._ring.clear()
+
+    def stats(self) -> dict:
+        return {
+            "mode": self.mode,
+            "sample_rate": self.sample_rate,
+            "slow_ms": self.slow_ms,
+            "size": self._ring.maxlen,
+            "entries": len(self._ring),
+            "dropped": self.dropped,
+        }
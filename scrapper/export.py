@@ -0,0 +1,128 @@
+"""
+Barem Export
+Flattens stored barem payloads into one row per barem and streams them as
+NDJSON or CSV, optionally gzip-compressed, page by page so memory stays
+flat however large the store is.
+"""
+import io
+import csv
+import json
+import zlib
+from datetime import datetime, timezone
+from email.utils import formatdate, parsedate_to_datetime
+from typing import AsyncIterator, Awaitable, Callable, Iterator, List, Optional, Tuple
+
+
+EXPORT_COLUMNS = (
+    "item_id", "name", "barcode", "warehouse", "vade", "minimum_adet", "mal_fazlasi",
+    "iskonto_kurum", "iskonto_ticari", "birim_fiyat", "discount",
+    "version", "fetched_at", "modified_at",
+)
+
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv; charset=utf-8"}
+
+# (stored, modified_ts) pages from BaremStore.export_page_async
+PageFetcher = Callable[[int, Optional[float], int], Awaitable[List[Tuple[object, float]]]]
+
+
+def flatten(stored, modified_ts: float) -> Iterator[dict]:
+    """
+    One row per barem. An item without barems still yields one row with
+    empty barem columns, so incremental consumers see that its barems are gone.
+    """
+    payload = stored.payload
+    base = {
+        "item_id": stored.item_id,
+        "name": payload.get("name"),
+        "barcode": payload.get("barcode"),
+    }
+    meta = {
+        "version": stored.version,
+        "fetched_at": stored.fetched_at,
+        "modified_at": datetime.fromtimestamp(modified_ts).isoformat(timespec="seconds"),
+    }
+    barems = payload.get("barems") or []
+    if not barems:
+        yield {**base, **dict.fromkeys(EXPORT_COLUMNS[3:11]), **meta}
+        return
+    for barem in barems:
+        yield {
+            **base,
+            "warehouse": barem.get("Warehouse"),
+            "vade": barem.get("Vade"),
+            "minimum_adet": barem.get("MinimumAdet"),
+            "mal_fazlasi": barem.get("MalFazlasi"),
+            "iskonto_kurum": barem.get("IskontoKurum"),
+            "iskonto_ticari": barem.get("IskontoTicari"),
+            "birim_fiyat": barem.get("BirimFiyat"),
+            "discount": barem.get("Discount"),
+            **meta,
+        }
+
+
+def encode_ndjson(rows: List[dict]) -> str:
+    return "".join(json.dumps(row, ensure_ascii=False, separators=(",", ":")) + "\n" for row in rows)
+
+
+def encode_csv(rows: List[dict], header: bool = False) -> str:
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_COLUMNS, lineterminator="\n")
+    if header:
+        writer.writeheader()
+    writer.writerows(rows)
+    return buffer.getvalue()
+
+
+def parse_cursor(value: Optional[str]) -> Optional[float]:
+    """`since` cursor: epoch seconds as returned in X-Export-Cursor."""
+    try:
+        return float(value) if value else None
+    except ValueError:
+        return None
+
+
+def parse_http_date(value: Optional[str]) -> Optional[float]:
+    """If-Modified-Since value as epoch seconds; None if missing or malformed."""
+    if not value:
+        return None
+    try:
+        parsed = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+def http_date(ts: float) -> str:
+    return formatdate(ts, usegmt=True)
+
+
+async def stream_export(fetch_page: PageFetcher, fmt: str = "ndjson", modified_since: Optional[float] = None,
+                        compress: bool = False, page_size: int = 500) -> AsyncIterator[bytes]:
+    """
+    Walk the store in item_id order, `page_size` items per query, and yield
+    encoded (and, with `compress`, gzip-framed) chunks as each page is done.
+    """
+    gzip = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None
+    after = 0
+    first = True
+    while True:
+        page = await fetch_page(after, modified_since, page_size)
+        rows = [row for stored, modified_ts in page for row in flatten(stored, modified_ts)]
+        if fmt == "csv":
+            text = encode_csv(rows, header=first)
+        else:
+            text = encode_ndjson(rows)
+        first = False
+        if text:
+            data = text.encode("utf-8")
+            if gzip is not None:
+                data = gzip.compress(data)
+            if data:
+                yield data
+        if len(page) < page_size:
+            break
+        after = page[-1][0].item_id
+    if gzip is not None:
+        yield gzip.flush()
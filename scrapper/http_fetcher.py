@@ -0,0 +1,92 @@
+"""
+HTTP Fast Path
+Fetches ItemDetailv3 directly with httpx, reusing the cookies of the
+Playwright session instead of tunnelling every request through Chromium.
+"""
+import logging
+from typing import Optional, List
+from urllib.parse import urlsplit
+
+import httpx
+
+
+logger = logging.getLogger(__name__)
+
+class SessionExpired(Exception):
+    """The portal rejected our cookies; the browser has to log in again."""
+
+
+# Markers that only appear on the portal's login form
+LOGIN_PAGE_MARKERS = ('name="Sifre"', 'id="pharmacyLoginForm"', "UniqueLogin")
+
+
+class HttpBaremFetcher:
+    """Keep-alive httpx client carrying the browser context's cookies."""
+
+    def __init__(self, base_url: str, user_agent: str, max_connections: int = 10, timeout: float = 30.0):
+        self.base_url = base_url.rstrip('/')
+        self.client = httpx.AsyncClient(
+            base_url=self.base_url,
+            headers={
+                'User-Agent': user_agent,
+                'Accept': '*/*',
+                'Accept-Language': 'tr-TR,tr;q=0.9,en-US;q=0.8,en;q=0.7',
+                'X-Requested-With': 'XMLHttpRequest',
+                'Origin': self.base_url,
+                'Referer': f"{self.base_url}/Home/MainPage",
+            },
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections,
+                keepalive_expiry=60.0,
+            ),
+            timeout=httpx.Timeout(timeout),
+            follow_redirects=False,
+        )
+        self.cookie_count = 0
+
+    def load_cookies(self, cookies: List[dict]):
+        """Replace the client's cookie jar with cookies exported from Playwright."""
+        jar = httpx.Cookies()
+        host = urlsplit(self.base_url).hostname or ""
+        for cookie in cookies:
+            domain = cookie.get("domain", "")
+            if domain.lstrip('.') and not host.endswith(domain.lstrip('.')):
+                continue  # Third-party cookie, never sent to the portal
+            jar.set(cookie["name"], cookie["value"], domain=domain, path=cookie.get("path", "/"))
+        self.client.cookies = jar
+        self.cookie_count = len(jar)
+        logger.info("🍪 Loaded %d cookies into HTTP client", self.cookie_count)
+
+    @staticmethod
+    def _is_login_redirect(response: httpx.Response) -> bool:
+        if not response.is_redirect:
+            return False
+        location = response.headers.get("location", "")
+        path = urlsplit(location).path.rstrip('/')
+        return path == "" or "Login" in location
+
+    async def fetch_item_detail(self, item_id: int, timeout: Optional[float] = None) -> dict:
+        """
+        POST /Sales/ItemDetailv3 and return the same result shape as the
+        in-page fetch: {success, html, status} or {success, status, error}.
+
+        Raises SessionExpired when the portal wants us to log in again.
+        """
+        response = await self.client.post(
+            "/Sales/ItemDetailv3",
+            json={"itemId": item_id},
+            headers={"Content-Type": "application/json; charset=utf-8"},
+            timeout=timeout if timeout is not None else httpx.USE_CLIENT_DEFAULT,
+        )
+        if response.status_code == 401 or self._is_login_redirect(response):
+            raise SessionExpired(f"HTTP {response.status_code} for item {item_id}")
+        if response.is_success:
+            html = response.text
+            if any(marker in html for marker in LOGIN_PAGE_MARKERS):
+                raise SessionExpired(f"Login page returned for item {item_id}")
+            return {"success": True, "html": html, "status": response.status_code}
+        return {"success": False, "status": response.status_code, "error": f"HTTP {response.status_code}"}
+
+    async def close(self):
+        await self.client.aclose()
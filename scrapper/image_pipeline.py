@@ -0,0 +1,358 @@
+"""
+Product Image Pipeline
+Turns the full-size originals under images/ (referenced by Gorsel_Path in
+ilac_arsivi_with_images.csv) into small derivatives for product cards:
+a thumbnail and a display-size WebP per image.
+
+Sources are identified by content hash, so an image repeated across product
+folders is converted once, and derivatives are named after that hash plus
+their settings - changing a size or quality regenerates exactly what it
+affects. The manifest maps every API_ID to its images, each with source
+hash and size and every derivative's path, byte size and dimensions. Files
+whose size and mtime match the previous manifest are not even re-hashed,
+so later runs only touch new or changed images.
+
+Needs Pillow, which the service image leaves out:
+    pip install -r requirements-tools.txt
+
+Usage:
+    python image_pipeline.py [--csv ../ilac_arsivi_with_images.csv] [--images-root ..]
+                             [--out ../images_derived] [--workers N] [--limit N]
+                             [--thumb-size 160] [--webp-size 1024]
+"""
+import os
+import sys
+import json
+import time
+import hashlib
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from catalog import read_catalog_csv, write_snapshot
+
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_VERSION = 1
+HASH_CHUNK = 1 << 20
+
+
+class Derivative(NamedTuple):
+    name: str
+    max_side: int
+    quality: int
+
+    @property
+    def tag(self) -> str:
+        return f"{self.name}{self.max_side}q{self.quality}"
+
+
+# thumb: product cards render images in a ~220x147 box
+DERIVATIVES = (
+    Derivative("thumb", 160, 70),
+    Derivative("webp", 1024, 80),
+)
+
+
+# ============================================================================
+# Workers (run in the process pool)
+# ============================================================================
+def hash_file(path: str) -> Tuple[str, Optional[str]]:
+    digest = hashlib.sha256()
+    try:
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(HASH_CHUNK), b""):
+                digest.update(chunk)
+    except OSError:
+        return path, None
+    return path, digest.hexdigest()
+
+
+def derivative_path(sha256: str, derivative: Derivative) -> str:
+    """Content- and settings-addressed location, relative to the output root."""
+    return f"{sha256[:2]}/{sha256}-{derivative.tag}.webp"
+
+
+def render(source_path: str, sha256: str, out_dir: str, derivatives=DERIVATIVES) -> Tuple[str, dict]:
+    """
+    Write every derivative of one source image; (sha256, manifest entry or
+    {"error": ...}). Only decode failures are final for these bytes; I/O
+    errors (a flaky read, a full or read-only --out) also carry "retry".
+    """
+    from PIL import Image, ImageOps, UnidentifiedImageError
+
+    try:
+        with Image.open(source_path) as opened:
+            opened.seek(0)  # first frame of animated GIFs
+            image = ImageOps.exif_transpose(opened)
+            image.load()
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA" if "A" in image.getbands() or "transparency" in image.info else "RGB")
+    except (UnidentifiedImageError, Image.DecompressionBombError, ValueError) as e:
+        return sha256, {"error": f"{type(e).__name__}: {e}"}
+    except OSError as e:
+        return sha256, {"error": f"{type(e).__name__}: {e}", "retry": True}
+    try:
+        entry = {"width": image.width, "height": image.height, "derivatives": {}}
+        for derivative in derivatives:
+            relative = derivative_path(sha256, derivative)
+            target = os.path.join(out_dir, relative)
+            if os.path.exists(target):
+                # Rendered under these settings before (e.g. only another size changed)
+                with Image.open(target) as existing:
+                    size = existing.size
+            else:
+                resized = image.copy()
+                resized.thumbnail((derivative.max_side, derivative.max_side), Image.LANCZOS)
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                tmp_path = f"{target}.{os.getpid()}"
+                resized.save(tmp_path, "WEBP", quality=derivative.quality, method=4)
+                os.replace(tmp_path, target)
+                size = resized.size
+            entry["derivatives"][derivative.name] = {
+                "path": relative,
+                "bytes": os.path.getsize(target),
+                "width": size[0],
+                "height": size[1],
+            }
+        return sha256, entry
+    except OSError as e:
+        return sha256, {"error": f"{type(e).__name__}: {e}", "retry": True}
+
+
+# ============================================================================
+# Pipeline
+# ============================================================================
+def load_manifest(path: str) -> dict:
+    try:
+        with open(path, encoding="utf-8") as f:
+            manifest = json.load(f)
+        if manifest.get("version") == MANIFEST_VERSION:
+            return manifest
+    except (OSError, ValueError):
+        pass
+    return {}
+
+
+class ImagePipeline:
+    def __init__(self, csv_path: str, images_root: str, out_dir: str, manifest_path: str,
+                 workers: int = 0, limit: int = 0, derivatives=DERIVATIVES):
+        self.csv_path = csv_path
+        self.images_root = images_root
+        self.out_dir = out_dir
+        self.manifest_path = manifest_path
+        self.workers = workers or os.cpu_count() or 1
+        self.limit = limit
+        self.derivatives = tuple(derivatives)
+        self.counts: Dict[str, int] = dict.fromkeys(
+            ("products", "references", "files", "missing", "hashed", "unique", "duplicates",
+             "rendered", "reused", "failed", "deferred"), 0)
+        self.timings: Dict[str, float] = {}
+
+    def _products(self) -> Dict[int, List[str]]:
+        products: Dict[int, List[str]] = {}
+        for row in read_catalog_csv(self.csv_path):
+            if row.images and row.api_id not in products:
+                products[row.api_id] = row.images
+                if self.limit and len(products) >= self.limit:
+                    break
+        return products
+
+    def _fingerprints(self, pool, paths: List[str], previous: dict) -> Dict[str, dict]:
+        """path -> {size, mtime_ns, sha256}; unchanged files keep their old hash."""
+        sources: Dict[str, dict] = {}
+        to_hash = []
+        for path in paths:
+            try:
+                stat = os.stat(os.path.join(self.images_root, path))
+            except OSError:
+                self.counts["missing"] += 1
+                continue
+            known = previous.get(path)
+            sources[path] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+            if known and (known["size"], known["mtime_ns"]) == (stat.st_size, stat.st_mtime_ns):
+                sources[path]["sha256"] = known["sha256"]
+            else:
+                to_hash.append(path)
+        full_paths = [os.path.join(self.images_root, path) for path in to_hash]
+        for path, (_, sha256) in zip(to_hash, pool.map(hash_file, full_paths, chunksize=32)):
+            if sha256 is None:
+                self.counts["missing"] += 1
+                del sources[path]
+            else:
+                sources[path]["sha256"] = sha256
+        self.counts["hashed"] = len(to_hash)
+        return sources
+
+    def _up_to_date(self, entry: Optional[dict]) -> bool:
+        if not entry:
+            return False
+        if "error" in entry:
+            return True  # Same bytes, same decode failure: not retried until the file changes
+        rendered = entry.get("derivatives", {})
+        for derivative in self.derivatives:
+            known = rendered.get(derivative.name)
+            if not known or not known["path"].endswith(f"-{derivative.tag}.webp"):
+                return False
+            if not os.path.exists(os.path.join(self.out_dir, known["path"])):
+                return False
+        return True
+
+    def run(self) -> dict:
+        previous = load_manifest(self.manifest_path)
+        started = time.perf_counter()
+        products = self._products()
+        paths = list(dict.fromkeys(path for images in products.values() for path in images))
+        self.counts["products"] = len(products)
+        self.counts["references"] = sum(len(images) for images in products.values())
+        self.counts["files"] = len(paths)
+
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            sources = self._fingerprints(pool, paths, previous.get("sources", {}))
+            self.timings["hash"] = time.perf_counter() - started
+
+            # One representative file per distinct content
+            by_hash: Dict[str, str] = {}
+            for path, source in sources.items():
+                by_hash.setdefault(source["sha256"], path)
+            self.counts["unique"] = len(by_hash)
+            self.counts["duplicates"] = len(sources) - len(by_hash)
+
+            images: Dict[str, dict] = {}
+            pending = []
+            for sha256, path in by_hash.items():
+                entry = previous.get("images", {}).get(sha256)
+                if self._up_to_date(entry):
+                    images[sha256] = entry
+                else:
+                    pending.append((sha256, path))
+            self.counts["reused"] = len(images)
+
+            render_started = time.perf_counter()
+            sources_in = [os.path.join(self.images_root, path) for _, path in pending]
+            hashes = [sha256 for sha256, _ in pending]
+            outputs = [self.out_dir] * len(pending)
+            settings = [self.derivatives] * len(pending)
+            for sha256, entry in pool.map(render, sources_in, hashes, outputs, settings, chunksize=8):
+                if entry.get("retry"):
+                    # Left out of the manifest, so the next run tries again
+                    self.counts["deferred"] += 1
+                    logger.warning("⚠️ %s: %s (will retry)", by_hash[sha256], entry["error"])
+                    continue
+                images[sha256] = entry
+                if "error" in entry:
+                    self.counts["failed"] += 1
+                    logger.warning("⚠️ %s: %s", by_hash[sha256], entry["error"])
+                else:
+                    self.counts["rendered"] += 1
+            self.timings["render"] = time.perf_counter() - render_started
+
+        manifest_products = {}
+        for api_id, product_images in products.items():
+            listed = []
+            for path in product_images:
+                source = sources.get(path)
+                entry = images.get(source["sha256"]) if source else None
+                if entry is None or "error" in entry:
+                    continue
+                listed.append({
+                    "source": path,
+                    "sha256": source["sha256"],
+                    "bytes": source["size"],
+                    "width": entry["width"],
+                    "height": entry["height"],
+                    **entry["derivatives"],
+                })
+            if listed:
+                manifest_products[str(api_id)] = listed
+
+        manifest = {
+            "version": MANIFEST_VERSION,
+            "generated_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "derivatives": {d.name: {"max_side": d.max_side, "quality": d.quality, "format": "webp"}
+                            for d in self.derivatives},
+            "products": manifest_products,
+            "sources": sources,
+            "images": images,
+        }
+        write_snapshot(self.manifest_path, json.dumps(manifest, separators=(",", ":")).encode("utf-8"))
+        self.timings["total"] = time.perf_counter() - started
+        return manifest
+
+    def report(self, manifest: dict) -> dict:
+        """Throughput and bytes saved, over the distinct images in the manifest."""
+        images = {sha256: entry for sha256, entry in manifest["images"].items() if "error" not in entry}
+        sizes = {}
+        for source in manifest["sources"].values():
+            sizes.setdefault(source["sha256"], source["size"])
+        original = sum(sizes[sha256] for sha256 in images)
+        derived = {d.name: sum(entry["derivatives"][d.name]["bytes"] for entry in images.values())
+                   for d in self.derivatives}
+        referenced = sum(image["bytes"] for listed in manifest["products"].values() for image in listed)
+        referenced_thumbs = sum(image["thumb"]["bytes"] for listed in manifest["products"].values() for image in listed)
+        render_seconds = self.timings.get("render", 0.0)
+        return {
+            **self.counts,
+            "unreadable": len(manifest["images"]) - len(images),
+            "workers": self.workers,
+            "seconds": round(self.timings.get("total", 0.0), 2),
+            "images_per_second": round(self.counts["rendered"] / render_seconds, 1) if render_seconds else None,
+            "original_bytes": original,
+            "derived_bytes": derived,
+            "card_bytes_original": referenced,
+            "card_bytes_thumb": referenced_thumbs,
+        }
+
+
+def main():
+    import argparse
+
+    here = os.path.dirname(os.path.abspath(__file__))
+    root = os.path.dirname(here)
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--csv", default=os.path.join(root, "ilac_arsivi_with_images.csv"))
+    parser.add_argument("--images-root", default=None, help="directory Gorsel_Path is relative to (default: the CSV's)")
+    parser.add_argument("--out", default=os.path.join(root, "images_derived"))
+    parser.add_argument("--manifest", default=None, help="default: <out>/manifest.json")
+    parser.add_argument("--workers", type=int, default=0, help="process pool size (default: CPU count)")
+    parser.add_argument("--limit", type=int, default=0, help="only the first N products with images")
+    parser.add_argument("--thumb-size", type=int, default=DERIVATIVES[0].max_side)
+    parser.add_argument("--thumb-quality", type=int, default=DERIVATIVES[0].quality)
+    parser.add_argument("--webp-size", type=int, default=DERIVATIVES[1].max_side)
+    parser.add_argument("--webp-quality", type=int, default=DERIVATIVES[1].quality)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    pipeline = ImagePipeline(
+        args.csv,
+        args.images_root or os.path.dirname(os.path.abspath(args.csv)),
+        args.out,
+        args.manifest or os.path.join(args.out, "manifest.json"),
+        args.workers,
+        args.limit,
+        (Derivative("thumb", args.thumb_size, args.thumb_quality),
+         Derivative("webp", args.webp_size, args.webp_quality)),
+    )
+    print(f"🖼️ {args.csv} -> {args.out} ({pipeline.workers} workers)")
+    stats = pipeline.report(pipeline.run())
+    mib = 1024 * 1024
+    print(f"📦 {stats['products']} products, {stats['files']} files ({stats['missing']} missing), "
+          f"{stats['unique']} unique, {stats['duplicates']} duplicates")
+    print(f"⚙️ hashed {stats['hashed']}, rendered {stats['rendered']}, reused {stats['reused']}, "
+          f"failed {stats['failed']} ({stats['unreadable']} unreadable in total), "
+          f"deferred {stats['deferred']} in {stats['seconds']}s"
+          + (f" ({stats['images_per_second']} images/s)" if stats["images_per_second"] else ""))
+    original = stats["original_bytes"]
+    for name, size in stats["derived_bytes"].items():
+        saved = 100 * (1 - size / original) if original else 0
+        print(f"💾 {name:<5} {size / mib:8.1f} MiB vs {original / mib:.1f} MiB originals ({saved:.1f}% saved)")
+    if stats["card_bytes_thumb"]:
+        print(f"🃏 product cards: {stats['card_bytes_original'] / mib:.1f} MiB -> "
+              f"{stats['card_bytes_thumb'] / mib:.1f} MiB "
+              f"({stats['card_bytes_original'] / stats['card_bytes_thumb']:.0f}x smaller)")
+    return 1 if stats["deferred"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
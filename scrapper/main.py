@@ -4,55 +4,246 @@ FastAPI application with Playwright for automated login and barem fetching.
 """
 import os
 import json
+import time
+import uuid
 import asyncio
+import logging
 from datetime import datetime
-from typing import Optional, List
+from typing import Optional, List, Dict, AsyncIterator
 from contextlib import asynccontextmanager
+from urllib.parse import urlsplit
 
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
+import httpx
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse, PlainTextResponse, JSONResponse, Response
 from playwright.async_api import async_playwright, Browser, BrowserContext, Page
-from bs4 import BeautifulSoup
+
+from diagnostics import setup_logging, stop_logging, CaptureRing, Trace
+import metrics
+from models import BaremResponse, BaremBatchRequest, HealthResponse
+from page_pool import PagePool
+from barem_parser import BaremParser
+from http_fetcher import HttpBaremFetcher, SessionExpired
+from barem_cache import BaremCache
+from barem_store import BaremStore
+from change_feed import ChangeFeed
+import export
+from warehouses import AllianceAdapter, WarehouseFanOut, parse_warehouse_config
+from session_keeper import SessionKeeper
+from session_coordinator import SessionCoordinator
+from browser_recycler import BrowserRecycler
+from request_filter import RequestFilter
+from crawler import BaremCrawler, InteractiveGate, load_api_ids
+from catalog import Catalog, load_catalog, source_fingerprint
+from muadil import MuadilIndex, load_index as load_muadil_index
+from search import SearchIndex
+from ratelimit import AdaptiveLimiter, Admission, CircuitBreaker, Backpressure, lane, BACKGROUND
+import deadline
+from deadline import DeadlineExceeded
 
 
 # ============================================================================
 # Configuration
 # ============================================================================
-ALLIANCE_BASE_URL = "https://esiparisv2.alliance-healthcare.com.tr"
+# Overridable so the scrapper can run against bench/mock_portal.py
+ALLIANCE_BASE_URL = os.getenv("ALLIANCE_BASE_URL", "https://esiparisv2.alliance-healthcare.com.tr").rstrip("/")
 PHARMACY_CODE = os.getenv("ALLIANCE_PHARMACY_CODE", "")
 USERNAME = os.getenv("ALLIANCE_USERNAME", "")
 PASSWORD = os.getenv("ALLIANCE_PASSWORD", "")
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+
+# "http" fetches ItemDetailv3 with httpx using the browser's cookies,
+# "browser" tunnels every fetch through page.evaluate
+FETCH_MODE = os.getenv("SCRAPPER_FETCH_MODE", "http").lower()
+HTTP_MAX_CONNECTIONS = int(os.getenv("SCRAPPER_HTTP_MAX_CONNECTIONS", "10"))
+
+# Logging and debug capture ring (see diagnostics.py for the modes)
+LOG_LEVEL = os.getenv("SCRAPPER_LOG_LEVEL", "INFO")
+DEBUG_CAPTURE_MODE = os.getenv("SCRAPPER_DEBUG_CAPTURE_MODE", "sampled").lower()
+DEBUG_CAPTURE_SAMPLE_RATE = float(os.getenv("SCRAPPER_DEBUG_CAPTURE_SAMPLE_RATE", "0.01"))
+DEBUG_CAPTURE_SIZE = int(os.getenv("SCRAPPER_DEBUG_CAPTURE_SIZE", "50"))
+SLOW_REQUEST_MS = float(os.getenv("SCRAPPER_SLOW_REQUEST_MS", "2000"))
+
+# Worker threads that parse ItemDetailv3 HTML off the event loop
+PARSER_WORKERS = int(os.getenv("SCRAPPER_PARSER_WORKERS", "2"))
+
+# Barem cache: served fresh until the soft TTL, served stale with a
+# background refresh until the hard TTL, then fetched again
+BAREM_CACHE_MAX_ENTRIES = int(os.getenv("SCRAPPER_CACHE_MAX_ENTRIES", "5000"))
+BAREM_CACHE_SOFT_TTL = float(os.getenv("SCRAPPER_CACHE_SOFT_TTL_SECONDS", "300"))
+BAREM_CACHE_HARD_TTL = float(os.getenv("SCRAPPER_CACHE_HARD_TTL_SECONDS", "3600"))
+
+# Persistent barem store (SQLite) used to answer while the session warms up
+STORE_PATH = os.getenv("SCRAPPER_STORE_PATH", "/app/data/barems.sqlite3")
+STORE_KEEP_VERSIONS = int(os.getenv("SCRAPPER_STORE_KEEP_VERSIONS", "20"))
+STORE_COMPACT_INTERVAL = float(os.getenv("SCRAPPER_STORE_COMPACT_INTERVAL_SECONDS", "3600"))
+# Barem change feed: how long change records are kept, page size and SSE heartbeat
+CHANGES_RETENTION = float(os.getenv("SCRAPPER_CHANGES_RETENTION_SECONDS", str(7 * 86400)))
+CHANGES_PAGE_SIZE = int(os.getenv("SCRAPPER_CHANGES_PAGE_SIZE", "500"))
+CHANGES_HEARTBEAT = float(os.getenv("SCRAPPER_CHANGES_HEARTBEAT_SECONDS", "15"))
+# How often an SSE stream polls the shared store for changes saved by other workers
+CHANGES_POLL_INTERVAL = float(os.getenv("SCRAPPER_CHANGES_POLL_SECONDS", "1"))
+# Items read from the store per query while streaming /export
+EXPORT_PAGE_SIZE = int(os.getenv("SCRAPPER_EXPORT_PAGE_SIZE", "500"))
+
+# Upstream protection: adaptive ItemDetailv3 rate (requests/second, AIMD on
+# latency and errors), interactive queue depth before 429, circuit breaker
+UPSTREAM_RATE = float(os.getenv("SCRAPPER_UPSTREAM_RATE", "5"))
+UPSTREAM_MIN_RATE = float(os.getenv("SCRAPPER_UPSTREAM_MIN_RATE", "0.5"))
+UPSTREAM_MAX_RATE = float(os.getenv("SCRAPPER_UPSTREAM_MAX_RATE", "20"))
+UPSTREAM_TARGET_LATENCY = float(os.getenv("SCRAPPER_UPSTREAM_TARGET_LATENCY_SECONDS", "2"))
+UPSTREAM_MAX_QUEUE = int(os.getenv("SCRAPPER_UPSTREAM_MAX_QUEUE", "50"))
+BREAKER_FAILURES = int(os.getenv("SCRAPPER_BREAKER_FAILURES", "5"))
+BREAKER_WINDOW = int(os.getenv("SCRAPPER_BREAKER_WINDOW", "20"))
+BREAKER_RESET = float(os.getenv("SCRAPPER_BREAKER_RESET_SECONDS", "30"))
+
+# Request deadlines: /get-barem budget when the caller sends no
+# X-Request-Timeout header, the cap on that header, the hard timeout on a
+# single ItemDetailv3 call, and how often to check for a vanished client
+REQUEST_DEADLINE = float(os.getenv("SCRAPPER_REQUEST_DEADLINE_SECONDS", "30"))
+REQUEST_DEADLINE_MAX = float(os.getenv("SCRAPPER_REQUEST_DEADLINE_MAX_SECONDS", "120"))
+UPSTREAM_TIMEOUT = float(os.getenv("SCRAPPER_UPSTREAM_TIMEOUT_SECONDS", "20"))
+DISCONNECT_POLL_INTERVAL = float(os.getenv("SCRAPPER_DISCONNECT_POLL_SECONDS", "0.5"))
+
+# Warehouses queried by /get-barem, e.g. "alliance,stub:Selcuk:0.3" (stub
+# adapters return fake barems for testing), and each source's deadline
+WAREHOUSES = os.getenv("SCRAPPER_WAREHOUSES", "alliance")
+WAREHOUSE_DEADLINE = float(os.getenv("SCRAPPER_WAREHOUSE_DEADLINE_SECONDS", "25"))
+
+# Background catalog crawler: "off", "paused" (resumable over HTTP) or "on".
+# A checkpointed paused/running state overrides this after the first run.
+CRAWLER_MODE = os.getenv("SCRAPPER_CRAWLER", "paused").lower()
+CRAWLER_CSV_PATH = os.getenv("SCRAPPER_CRAWLER_CSV", os.path.join(os.path.dirname(os.path.abspath(__file__)), "ilac_arsivi.csv"))
+CRAWLER_CHECKPOINT_PATH = os.getenv("SCRAPPER_CRAWLER_CHECKPOINT", "/app/data/crawler_checkpoint.json")
+CRAWLER_RATE = float(os.getenv("SCRAPPER_CRAWLER_RATE", "0.5"))  # items per second
+CRAWLER_CONCURRENCY = int(os.getenv("SCRAPPER_CRAWLER_CONCURRENCY", "2"))
+CRAWLER_MIN_AGE = float(os.getenv("SCRAPPER_CRAWLER_MIN_AGE_SECONDS", "86400"))
+CRAWLER_PASS_INTERVAL = float(os.getenv("SCRAPPER_CRAWLER_PASS_INTERVAL_SECONDS", "86400"))
+# Product catalog (barcode / API_ID lookups) and its memory-mapped snapshot,
+# rebuilt whenever the CSV's size or mtime changes
+CATALOG_CSV_PATH = os.getenv("SCRAPPER_CATALOG_CSV", CRAWLER_CSV_PATH)
+CATALOG_SNAPSHOT_PATH = os.getenv("SCRAPPER_CATALOG_SNAPSHOT", "/app/data/catalog.snapshot")
+# Muadil (equivalent-drug) clusters built from the same CSV
+MUADIL_SNAPSHOT_PATH = os.getenv("SCRAPPER_MUADIL_SNAPSHOT", "/app/data/muadil.snapshot")
+# How often to check the CSV for changes (0 = only at startup); the search
+# index is synced in place, re-tokenizing just the changed products
+CATALOG_WATCH_INTERVAL = float(os.getenv("SCRAPPER_CATALOG_WATCH_INTERVAL_SECONDS", "60"))
+SEARCH_MAX_LIMIT = int(os.getenv("SCRAPPER_SEARCH_MAX_LIMIT", "50"))
+# Stored barems younger than this are served right away (with a background
+# refresh) instead of waiting on a live fetch
+STORE_SERVE_MAX_AGE = float(os.getenv("SCRAPPER_STORE_SERVE_MAX_AGE_SECONDS", "86400"))
+
+# Request interception: resource types and hosts aborted in the browser.
+# With SCRAPPER_BLOCK_THIRD_PARTY=on, allowed hosts (besides the portal) are
+# the only third parties let through; set SCRAPPER_REQUEST_FILTER=off to
+# disable interception entirely
+REQUEST_FILTER_ENABLED = os.getenv("SCRAPPER_REQUEST_FILTER", "on").lower() != "off"
+BLOCKED_RESOURCE_TYPES = os.getenv("SCRAPPER_BLOCKED_RESOURCE_TYPES", "image,media,font,stylesheet").split(",")
+BLOCK_THIRD_PARTY = os.getenv("SCRAPPER_BLOCK_THIRD_PARTY", "off").lower() == "on"
+ALLOWED_HOSTS = os.getenv("SCRAPPER_ALLOWED_HOSTS", "").split(",")
+BLOCKED_HOSTS = os.getenv("SCRAPPER_BLOCKED_HOSTS", "").split(",")
+
+# Browser storage_state (cookies + localStorage) saved after every login
+# and loaded on boot so a still-valid session skips the login form
+SESSION_STATE_PATH = os.getenv("SCRAPPER_SESSION_STATE_PATH", "/app/data/storage_state.json")
+
+# Several workers/replicas sharing the data volume: the process holding the
+# lock file logs in, the others reuse its storage_state (waiting up to
+# FOLLOWER_WAIT for a fresh one). "off" makes every process log in itself
+SESSION_COORDINATION = os.getenv("SCRAPPER_SESSION_COORDINATION", "on").lower() != "off"
+SESSION_LOCK_PATH = os.getenv("SCRAPPER_SESSION_LOCK_PATH", "/app/data/session.lock")
+SESSION_SYNC_INTERVAL = float(os.getenv("SCRAPPER_SESSION_SYNC_INTERVAL_SECONDS", "2"))
+SESSION_FOLLOWER_WAIT = float(os.getenv("SCRAPPER_SESSION_FOLLOWER_WAIT_SECONDS", "90"))
+
+# Session keepalive: probe interval, fraction of the predicted session
+# lifetime after which we log in again proactively, and the lifetime to
+# assume before any expiry has been observed (0 = unknown, probe only)
+SESSION_PROBE_INTERVAL = float(os.getenv("SCRAPPER_SESSION_PROBE_INTERVAL_SECONDS", "60"))
+SESSION_REFRESH_FRACTION = float(os.getenv("SCRAPPER_SESSION_REFRESH_FRACTION", "0.8"))
+SESSION_MAX_AGE = float(os.getenv("SCRAPPER_SESSION_MAX_AGE_SECONDS", "0"))
+# A proactive re-login logs the old session out (UniqueLogin), so new upstream
+# calls are held while the running ones finish, for at most this long
+SESSION_RENEWAL_DRAIN_TIMEOUT = float(os.getenv("SCRAPPER_SESSION_RENEWAL_DRAIN_SECONDS", "30"))
+
+# Browser/context recycling: relaunch Chromium above an RSS ceiling, rotate
+# the context after N browser requests or a maximum age (0 disables a check)
+BROWSER_MAX_RSS_MB = float(os.getenv("SCRAPPER_BROWSER_MAX_RSS_MB", "1500"))
+CONTEXT_MAX_REQUESTS = int(os.getenv("SCRAPPER_CONTEXT_MAX_REQUESTS", "5000"))
+CONTEXT_MAX_AGE = float(os.getenv("SCRAPPER_CONTEXT_MAX_AGE_SECONDS", "21600"))
+RECYCLE_CHECK_INTERVAL = float(os.getenv("SCRAPPER_RECYCLE_CHECK_INTERVAL_SECONDS", "30"))
+ROTATION_DRAIN_TIMEOUT = float(os.getenv("SCRAPPER_ROTATION_DRAIN_TIMEOUT_SECONDS", "120"))
+
+# Number of pages used for concurrent ItemDetailv3 fetches
+PAGE_POOL_SIZE = int(os.getenv("SCRAPPER_PAGE_POOL_SIZE", "4"))
+# Consecutive failures after which a pooled page is replaced
+PAGE_MAX_FAILURES = int(os.getenv("SCRAPPER_PAGE_MAX_FAILURES", "3"))
+# Upper bound on item IDs accepted by one /get-barem/batch call
+BATCH_MAX_ITEMS = int(os.getenv("SCRAPPER_BATCH_MAX_ITEMS", "200"))
+# Parallel upstream fetches per batch: the default, and a cap on what clients ask for
+BATCH_CONCURRENCY = int(os.getenv("SCRAPPER_BATCH_CONCURRENCY", "6"))
+
+# In-page fetch loop for batches; each finished item is pushed back to
+# Python through the __baremBatchEmit binding so it can be streamed out
+# while the rest of the batch is still in flight.
+BATCH_FETCH_JS = """
+async ({ batchId, itemIds, concurrency, url }) => {
+    let next = 0;
+    const worker = async () => {
+        while (next < itemIds.length) {
+            const itemId = itemIds[next++];
+            const started = performance.now();
+            let result;
+            try {
+                const response = await fetch(url, {
+                    method: "POST",
+                    credentials: "include",
+                    headers: {
+                        "Content-Type": "application/json; charset=utf-8",
+                        "X-Requested-With": "XMLHttpRequest",
+                        "Accept": "*/*"
+                    },
+                    body: JSON.stringify({ itemId: itemId })
+                });
+                if (response.ok) {
+                    result = { success: true, html: await response.text(), status: response.status };
+                } else {
+                    result = { success: false, status: response.status, error: "HTTP " + response.status };
+                }
+            } catch (e) {
+                result = { success: false, error: e.message };
+            }
+            result.elapsed = (performance.now() - started) / 1000;
+            await window.__baremBatchEmit(batchId, itemId, result);
+        }
+    };
+    const workers = [];
+    for (let i = 0; i < Math.min(concurrency, itemIds.length); i++) {
+        workers.push(worker());
+    }
+    await Promise.all(workers);
+    return itemIds.length;
+}
+"""
 
 
 # ============================================================================
-# Response Models
+# Diagnostics
 # ============================================================================
-class BaremInfo(BaseModel):
-    Vade: int
-    MinimumAdet: int = 1
-    MalFazlasi: Optional[str] = ""
-    IskontoKurum: float = 0.0
-    IskontoTicari: float = 0.0
-    BirimFiyat: float = 0.0
-    Warehouse: str = "Alliance"
-    Discount: float = 0.0
-
-
-class BaremResponse(BaseModel):
-    success: bool
-    item_id: int
-    name: Optional[str] = None
-    barcode: Optional[str] = None
-    barems: List[BaremInfo] = []
-    error: Optional[str] = None
-    fetched_at: str = ""
-
-
-class HealthResponse(BaseModel):
-    status: str
-    browser_ready: bool
-    logged_in: bool
-    last_login_at: Optional[str] = None
+setup_logging(LOG_LEVEL)
+logger = logging.getLogger("scrapper")
+captures = CaptureRing(
+    mode=DEBUG_CAPTURE_MODE,
+    sample_rate=DEBUG_CAPTURE_SAMPLE_RATE,
+    size=DEBUG_CAPTURE_SIZE,
+    slow_ms=SLOW_REQUEST_MS,
+)
+
+
+def finish_trace(trace: Trace, outcome: str):
+    """Record a finished trace in the stage histograms and the capture ring."""
+    metrics.observe_trace(trace, outcome)
+    captures.finish(trace)
 
 
 # ============================================================================
@@ -65,18 +256,162 @@ class SessionManager:
         self.playwright = None
         self.browser: Optional[Browser] = None
         self.context: Optional[BrowserContext] = None
-        self.page: Optional[Page] = None
+        self.page: Optional[Page] = None  # Dedicated to the login flow
+        self.pool = PagePool(PAGE_POOL_SIZE, PAGE_MAX_FAILURES)
         self.logged_in = False
         self.last_login_at: Optional[str] = None
-        self._lock = asyncio.Lock()
+        self._logged_in_monotonic: Optional[float] = None
+        self.session_restored = False
+        self.startup_error: Optional[str] = None
+        self._login_lock = asyncio.Lock()
+        self._login_generation = 0
+        self._login_trace: Optional[Trace] = None
+        self._upstream_calls = 0  # Admitted upstream calls not yet resolved
+        self._upstream_idle = asyncio.Event()
+        self._upstream_idle.set()
+        self._renewal_done = asyncio.Event()  # Cleared while a proactive renewal drains and logs in
+        self._renewal_done.set()
+        self._batch_queues: Dict[str, asyncio.Queue] = {}
+        self.context_requests = 0  # Browser-side requests, drives context rotation
+        self.limiter = AdaptiveLimiter(
+            rate=UPSTREAM_RATE,
+            min_rate=UPSTREAM_MIN_RATE,
+            max_rate=UPSTREAM_MAX_RATE,
+            target_latency=UPSTREAM_TARGET_LATENCY,
+            max_queue=UPSTREAM_MAX_QUEUE,
+        )
+        self.breaker = CircuitBreaker(
+            failure_threshold=BREAKER_FAILURES,
+            window=BREAKER_WINDOW,
+            reset_timeout=BREAKER_RESET,
+        )
+        self.recycler = BrowserRecycler(
+            self,
+            max_rss_bytes=BROWSER_MAX_RSS_MB * 1048576,
+            max_requests=CONTEXT_MAX_REQUESTS,
+            max_age=CONTEXT_MAX_AGE,
+            interval=RECYCLE_CHECK_INTERVAL,
+        )
+        self.parser = BaremParser(PARSER_WORKERS)
+        self.http: Optional[HttpBaremFetcher] = (
+            HttpBaremFetcher(ALLIANCE_BASE_URL, USER_AGENT, HTTP_MAX_CONNECTIONS)
+            if FETCH_MODE == "http" else None
+        )
+        self.keeper = SessionKeeper(
+            self, ALLIANCE_BASE_URL,
+            interval=SESSION_PROBE_INTERVAL,
+            refresh_fraction=SESSION_REFRESH_FRACTION,
+            default_max_age=SESSION_MAX_AGE,
+        )
+        self.request_filter: Optional[RequestFilter] = (
+            RequestFilter(
+                allowed_hosts=[urlsplit(ALLIANCE_BASE_URL).hostname, *ALLOWED_HOSTS],
+                blocked_hosts=BLOCKED_HOSTS,
+                blocked_types=BLOCKED_RESOURCE_TYPES,
+                block_third_party=BLOCK_THIRD_PARTY,
+            )
+            if REQUEST_FILTER_ENABLED else None
+        )
+        self.shared_version: Optional[int] = None  # mtime_ns of the storage_state in use
+        self.coordinator: Optional[SessionCoordinator] = (
+            SessionCoordinator(
+                self, SESSION_LOCK_PATH, SESSION_STATE_PATH,
+                interval=SESSION_SYNC_INTERVAL,
+                wait_timeout=SESSION_FOLLOWER_WAIT,
+            )
+            if SESSION_COORDINATION else None
+        )
     
-    async def initialize(self):
-        """Initialize browser with stealth configuration and login."""
-        print("🚀 Initializing Playwright browser with stealth mode...")
-        self.playwright = await async_playwright().start()
-        
-        # Launch with stealth-like args
-        self.browser = await self.playwright.chromium.launch(
+    @property
+    def is_leader(self) -> bool:
+        """True if this process owns the portal login (always, without coordination)."""
+        return self.coordinator is None or self.coordinator.is_leader
+    
+    @property
+    def login_running(self) -> bool:
+        return self._login_lock.locked()
+    
+    def claim_leadership(self) -> bool:
+        """Try to become the login owner; followers keep retrying in the background."""
+        return self.coordinator.try_acquire() if self.coordinator else True
+    
+    @property
+    def session_age(self) -> Optional[float]:
+        """Seconds since the current session was established, None if logged out."""
+        if not self.logged_in or self._logged_in_monotonic is None:
+            return None
+        return time.monotonic() - self._logged_in_monotonic
+    
+    def _session_rejected(self):
+        """The portal dropped our session; remember how long it lived."""
+        # A rejection while a login is running is usually that login closing
+        # the old session (UniqueLogin), not a natural expiry
+        if self.logged_in and not self._login_lock.locked():
+            self.keeper.record_expiry(self.session_age)
+        self.logged_in = False
+    
+    async def start(self):
+        """Background startup task: browser, session restore or login, keepalive."""
+        self.claim_leadership()
+        try:
+            await self.initialize()
+        except Exception as e:
+            self.startup_error = str(e)
+            logger.error("❌ Browser startup failed: %s", e)
+            return
+        if self.is_leader:
+            self.keeper.start()
+        self.recycler.start()
+        if self.coordinator:
+            self.coordinator.start()
+    
+    def _load_storage_state(self) -> Optional[str]:
+        """Path of the saved storage_state if there is a usable one."""
+        try:
+            stat = os.stat(SESSION_STATE_PATH)
+            if stat.st_size > 0:
+                self.shared_version = stat.st_mtime_ns
+                return SESSION_STATE_PATH
+        except OSError:
+            pass
+        return None
+    
+    async def _save_storage_state(self):
+        """Write the context's storage_state atomically (tmp file + rename)."""
+        try:
+            state = await self.context.storage_state()
+            def write():
+                os.makedirs(os.path.dirname(SESSION_STATE_PATH) or ".", exist_ok=True)
+                tmp_path = SESSION_STATE_PATH + ".tmp"
+                # Session cookies - keep the file private to the service user
+                fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+                with open(fd, "w", encoding="utf-8") as f:
+                    json.dump(state, f)
+                os.replace(tmp_path, SESSION_STATE_PATH)
+                return os.stat(SESSION_STATE_PATH).st_mtime_ns
+            self.shared_version = await asyncio.to_thread(write)
+        except Exception as e:
+            logger.warning("⚠️ Failed to save storage_state: %s", e)
+    
+    async def _restore_session(self) -> bool:
+        """Adopt the session loaded from storage_state if the portal still accepts it."""
+        if not await self.keeper.probe():
+            logger.info("🔑 Saved session is no longer valid, logging in")
+            return False
+        # The file is rewritten on every login, so its mtime is the session's birth
+        try:
+            age = max(0.0, time.time() - os.path.getmtime(SESSION_STATE_PATH))
+        except OSError:
+            age = 0.0
+        await self._mark_logged_in(save_state=False)
+        self._logged_in_monotonic = time.monotonic() - age
+        self.session_restored = True
+        logger.info("♻️ Restored saved session (%.0fs old), skipping login form", age)
+        return True
+    
+    async def _launch_browser(self) -> Browser:
+        """Launch Chromium with stealth-like args."""
+        return await self.playwright.chromium.launch(
             headless=True,
             args=[
                 '--no-sandbox',
@@ -87,11 +422,13 @@ class SessionManager:
                 '--allow-running-insecure-content',
             ]
         )
-        
-        # Create context with realistic browser fingerprint
-        self.context = await self.browser.new_context(
+    
+    async def _new_context(self, browser: Browser, storage_state=None) -> BrowserContext:
+        """Context with the stealth fingerprint, request filter and batch binding."""
+        context = await browser.new_context(
+            storage_state=storage_state,
             viewport={'width': 1920, 'height': 1080},
-            user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+            user_agent=USER_AGENT,
             locale='tr-TR',
             timezone_id='Europe/Istanbul',
             extra_http_headers={
@@ -108,7 +445,7 @@ class SessionManager:
         )
         
         # Mask automation detection
-        await self.context.add_init_script("""
+        await context.add_init_script("""
             Object.defineProperty(navigator, 'webdriver', {
                 get: () => undefined
             });
@@ -121,22 +458,88 @@ class SessionManager:
             window.chrome = { runtime: {} };
         """)
         
+        # Abort images, fonts, stylesheets and third-party requests
+        if self.request_filter:
+            await self.request_filter.install(context)
+        
+        # Per-item callback used by batch fetches running inside a page
+        await context.expose_binding("__baremBatchEmit", self._on_batch_item)
+        return context
+    
+    async def initialize(self):
+        """Initialize browser with stealth configuration and login."""
+        logger.info("🚀 Initializing Playwright browser with stealth mode...")
+        self.playwright = await async_playwright().start()
+        self.browser = await self._launch_browser()
+        
+        storage_state = self._load_storage_state()
+        self.context = await self._new_context(self.browser, storage_state)
         self.page = await self.context.new_page()
-        print("✅ Browser initialized with stealth mode")
+        await self.pool.start(self.context)
+        self.recycler.reset()
+        logger.info("✅ Browser initialized with stealth mode")
         
-        # Attempt login
+        # Reuse the saved session when possible, otherwise log in
+        if storage_state and await self._restore_session():
+            return
         await self.login()
     
+    async def rotate(self, kind: str = "context", reason: str = ""):
+        """
+        Swap in a fresh context ("context") or a fresh browser plus context
+        ("browser") carrying the current storage_state, so no new login is
+        needed. New work goes to the new pool at once; work already holding
+        an old page finishes before the old context is closed.
+        """
+        async with self._login_lock:
+            logger.info("♻️ Rotating %s (%s)", kind, reason)
+            old_browser, old_context, old_pool = self.browser, self.context, self.pool
+            state = await old_context.storage_state()
+            browser = await self._launch_browser() if kind == "browser" else old_browser
+            context = None
+            try:
+                context = await self._new_context(browser, state)
+                page = await context.new_page()
+                pool = PagePool(PAGE_POOL_SIZE, PAGE_MAX_FAILURES)
+                await pool.start(context)
+            except Exception:
+                if context is not None:
+                    await context.close()
+                if browser is not old_browser:
+                    await browser.close()
+                raise
+            self.browser, self.context, self.page, self.pool = browser, context, page, pool
+            self.recycler.reset()
+        
+        if not await old_pool.drain(ROTATION_DRAIN_TIMEOUT):
+            logger.warning("⚠️ Old page pool did not drain within %.0fs, closing anyway", ROTATION_DRAIN_TIMEOUT)
+        await old_pool.close()
+        await old_context.close()
+        if browser is not old_browser:
+            await old_browser.close()
+        logger.info("✅ %s rotation done", kind.capitalize())
+    
     async def login(self):
         """Perform login to Alliance Healthcare with retry logic."""
-        if not all([PHARMACY_CODE, USERNAME, PASSWORD]):
-            print("⚠️ Missing credentials, skipping login")
+        if self.is_leader and not all([PHARMACY_CODE, USERNAME, PASSWORD]):
+            logger.warning("⚠️ Missing credentials, skipping login")
             return False
         
-        async with self._lock:
+        generation = self._login_generation
+        wait_started = time.perf_counter()
+        async with self._login_lock:
+            metrics.LOCK_WAIT_SECONDS.observe(time.perf_counter() - wait_started, "login")
+            # Another caller finished a login while we were waiting - reuse it
+            if generation != self._login_generation and self.logged_in:
+                return True
+            if not self.is_leader:
+                return await self._follow_login()
+            self._login_trace = trace = Trace("login")
             for attempt in range(3):
                 try:
-                    print(f"🔐 Login attempt {attempt + 1}/3 as {USERNAME}...")
+                    logger.info("🔐 Login attempt %d/3 as %s...", attempt + 1, USERNAME)
+                    metrics.LOGIN_ATTEMPTS.inc()
+                    self.context_requests += 1
                     
                     # Navigate to login page - base URL is the login page
                     await self.page.goto(
@@ -144,59 +547,50 @@ class SessionManager:
                         wait_until="load",
                         timeout=60000
                     )
+                    trace.mark("navigate")
                     
                     # Wait for JavaScript to render - wait up to 15 seconds for any input
-                    print("⏳ Waiting for page JavaScript to render...")
+                    logger.debug("⏳ Waiting for page JavaScript to render...")
                     try:
                         await self.page.wait_for_selector('input', timeout=15000)
                     except:
-                        print("⚠️ No input fields appeared after 15s")
+                        logger.warning("⚠️ No input fields appeared after 15s")
                     
                     await asyncio.sleep(3)
+                    trace.mark("render_wait")
                     
-                    # Debug: Print page title and URL
-                    print(f"📄 Page title: {await self.page.title()}")
-                    print(f"📄 Page URL: {self.page.url}")
+                    # Debug: page details, input fields and the raw login HTML
+                    if logger.isEnabledFor(logging.DEBUG):
+                        logger.debug("📄 Page title: %s", await self.page.title())
+                        logger.debug("📄 Page URL: %s", self.page.url)
+                        inputs = await self.page.locator('input').all()
+                        logger.debug("📋 Found %d input fields on page", len(inputs))
+                        for i, inp in enumerate(inputs[:10]):  # Show first 10
+                            try:
+                                name = await inp.get_attribute('name') or ''
+                                inp_id = await inp.get_attribute('id') or ''
+                                inp_type = await inp.get_attribute('type') or ''
+                                placeholder = await inp.get_attribute('placeholder') or ''
+                                visible = await inp.is_visible()
+                                logger.debug("  [%d] name='%s' id='%s' type='%s' placeholder='%s' visible=%s",
+                                             i, name, inp_id, inp_type, placeholder, visible)
+                            except:
+                                pass
                     
-                    # Debug: Capture screenshot and HTML on first attempt
-                    if attempt == 0:
-                        try:
-                            await self.page.screenshot(path="/app/debug_login.png")
-                            print("📷 Screenshot saved to /app/debug_login.png")
-                        except Exception as e:
-                            print(f"⚠️ Screenshot failed: {e}")
-                        
-                        # Save HTML content
+                    if attempt == 0 and captures.enabled:
                         try:
-                            html_content = await self.page.content()
-                            with open("/app/debug_page.html", "w") as f:
-                                f.write(html_content)
-                            print(f"📝 HTML saved to /app/debug_page.html ({len(html_content)} bytes)")
-                            print(f"📝 First 500 chars: {html_content[:500]}")
+                            captures.record_response("login_page", None, await self.page.content())
                         except Exception as e:
-                            print(f"⚠️ HTML dump failed: {e}")
+                            logger.warning("⚠️ Login page capture failed: %s", e)
                     
-                    # Debug: List all visible input fields
-                    inputs = await self.page.locator('input').all()
-                    print(f"📋 Found {len(inputs)} input fields on page")
-                    for i, inp in enumerate(inputs[:10]):  # Show first 10
-                        try:
-                            name = await inp.get_attribute('name') or ''
-                            inp_id = await inp.get_attribute('id') or ''
-                            inp_type = await inp.get_attribute('type') or ''
-                            placeholder = await inp.get_attribute('placeholder') or ''
-                            visible = await inp.is_visible()
-                            print(f"  [{i}] name='{name}' id='{inp_id}' type='{inp_type}' placeholder='{placeholder}' visible={visible}")
-                        except:
-                            pass
                     try:
                         eczane_tab = self.page.locator('a:has-text("Eczane Girişi"), [data-toggle="tab"]:has-text("Eczane")')
                         if await eczane_tab.count() > 0:
                             await eczane_tab.first.click()
                             await asyncio.sleep(1)
-                            print("📋 Clicked Eczane Girişi tab")
+                            logger.debug("📋 Clicked Eczane Girişi tab")
                     except Exception as e:
-                        print(f"⚠️ Could not click Eczane tab: {e}")
+                        logger.warning("⚠️ Could not click Eczane tab: %s", e)
                     
                     # Try multiple selectors for form fields
                     eczane_kodu_selectors = [
@@ -225,7 +619,7 @@ class SessionManager:
                             field = self.page.locator(selector)
                             if await field.count() > 0:
                                 await field.first.fill(PHARMACY_CODE)
-                                print(f"✅ Filled Eczane Kodu with selector: {selector}")
+                                logger.debug("✅ Filled Eczane Kodu with selector: %s", selector)
                                 break
                         except:
                             continue
@@ -236,7 +630,7 @@ class SessionManager:
                             field = self.page.locator(selector)
                             if await field.count() > 0:
                                 await field.first.fill(USERNAME)
-                                print(f"✅ Filled Kullanıcı Adı with selector: {selector}")
+                                logger.debug("✅ Filled Kullanıcı Adı with selector: %s", selector)
                                 break
                         except:
                             continue
@@ -247,12 +641,13 @@ class SessionManager:
                             field = self.page.locator(selector)
                             if await field.count() > 0:
                                 await field.first.fill(PASSWORD)
-                                print(f"✅ Filled Şifre with selector: {selector}")
+                                logger.debug("✅ Filled Şifre with selector: %s", selector)
                                 break
                         except:
                             continue
                     
                     await asyncio.sleep(1)
+                    trace.mark("fill_form")
                     
                     # Submit form - try multiple selectors
                     submit_selectors = [
@@ -268,7 +663,7 @@ class SessionManager:
                             btn = self.page.locator(selector)
                             if await btn.count() > 0:
                                 await btn.first.click()
-                                print(f"✅ Clicked submit with selector: {selector}")
+                                logger.debug("✅ Clicked submit with selector: %s", selector)
                                 break
                         except:
                             continue
@@ -278,6 +673,7 @@ class SessionManager:
                         await self.page.wait_for_load_state("networkidle", timeout=30000)
                     except:
                         await asyncio.sleep(5)
+                    trace.mark("submit")
                     
                     # Check if login was successful - URL should change from base URL
                     current_url = self.page.url
@@ -286,7 +682,7 @@ class SessionManager:
                     
                     # Handle UniqueLogin page (another session exists)
                     if "UniqueLogin" in current_url:
-                        print("⚠️ Another session exists - clicking 'Aktif Oturumları Kapat'")
+                        logger.warning("⚠️ Another session exists - clicking 'Aktif Oturumları Kapat'")
                         try:
                             # Click "Aktif Oturumları Kapat" button repeatedly until normal page loads
                             for click_attempt in range(5):  # Try up to 5 times
@@ -294,7 +690,7 @@ class SessionManager:
                                 if await close_btn.count() > 0:
                                     await close_btn.first.click()
                                     await asyncio.sleep(2)
-                                    print(f"   Clicked 'Aktif Oturumları Kapat' (attempt {click_attempt + 1})")
+                                    logger.debug("   Clicked 'Aktif Oturumları Kapat' (attempt %d)", click_attempt + 1)
                                     
                                     # Wait for page to load
                                     try:
@@ -305,9 +701,8 @@ class SessionManager:
                                     # Check if we're on main page now
                                     new_url = self.page.url
                                     if "MainPage" in new_url or ("Home" in new_url and "UniqueLogin" not in new_url):
-                                        self.logged_in = True
-                                        self.last_login_at = datetime.now().isoformat()
-                                        print(f"✅ Login successful after closing active sessions!")
+                                        await self._mark_logged_in()
+                                        logger.info("✅ Login successful after closing active sessions!")
                                         return True
                                     
                                     if "UniqueLogin" not in new_url:
@@ -317,44 +712,113 @@ class SessionManager:
                                     break  # Button not found
                                     
                         except Exception as e:
-                            print(f"⚠️ Failed to handle UniqueLogin: {e}")
+                            logger.warning("⚠️ Failed to handle UniqueLogin: %s", e)
+                        trace.mark("unique_login")
                     
                     # Success if URL is different from base URL (login page) and contains MainPage or Home
                     if ("MainPage" in current_url or ("Home" in current_url and "UniqueLogin" not in current_url)):
-                        self.logged_in = True
-                        self.last_login_at = datetime.now().isoformat()
-                        print(f"✅ Login successful! Redirected to: {current_url}")
+                        await self._mark_logged_in()
+                        logger.info("✅ Login successful! Redirected to: %s", current_url)
                         return True
                     elif current_url_clean != base_url_clean and "UniqueLogin" not in current_url:
                         # Some other dashboard page
-                        self.logged_in = True
-                        self.last_login_at = datetime.now().isoformat()
-                        print(f"✅ Login successful! Redirected to: {current_url}")
+                        await self._mark_logged_in()
+                        logger.info("✅ Login successful! Redirected to: %s", current_url)
                         return True
                     else:
-                        print(f"⚠️ Still on login page: {current_url}")
+                        logger.warning("⚠️ Still on login page: %s", current_url)
                         
                         # Check for error messages
                         try:
                             error = self.page.locator('.alert-danger, .error-message, .validation-summary-errors, .text-danger')
                             if await error.count() > 0:
                                 error_text = await error.first.text_content()
-                                print(f"❌ Login error message: {error_text}")
+                                logger.error("❌ Login error message: %s", error_text)
                         except:
                             pass
                         
                 except Exception as e:
-                    print(f"❌ Login attempt {attempt + 1} error: {e}")
+                    logger.error("❌ Login attempt %d error: %s", attempt + 1, e)
                 
                 # Wait before retry
                 if attempt < 2:
-                    print(f"⏳ Waiting 5 seconds before retry...")
+                    logger.debug("⏳ Waiting 5 seconds before retry...")
                     await asyncio.sleep(5)
+                    trace.mark("retry_wait")
             
-            print("❌ All login attempts failed")
+            logger.error("❌ All login attempts failed")
             self.logged_in = False
+            metrics.LOGIN_FAILURES.inc()
+            trace.error = "All login attempts failed"
+            finish_trace(trace, "failure")
             return False
     
+    async def _follow_login(self) -> bool:
+        """Follower: get a fresh session from the leader instead of the login form."""
+        seen = self.shared_version
+        current = self.coordinator.state_version()
+        if current is None or current == seen:
+            logger.info("🤝 Asking the session leader (pid %s) for a fresh session", self.coordinator.leader_pid())
+            self.coordinator.request_refresh(seen)
+            if not await self.coordinator.wait_for_new_state(seen):
+                self.logged_in = False
+                if not self.coordinator.is_leader:
+                    logger.error("❌ Session leader did not refresh the session within %.0fs", SESSION_FOLLOWER_WAIT)
+                return False
+        return await self.adopt_shared_session()
+    
+    async def adopt_shared_session(self) -> bool:
+        """Follower: load the cookies of the leader's latest storage_state into our context."""
+        if self.context is None:
+            return False
+        version = self.coordinator.state_version()
+        def read():
+            with open(SESSION_STATE_PATH, encoding="utf-8") as f:
+                return json.load(f)
+        try:
+            state = await asyncio.to_thread(read)
+            await self.context.clear_cookies()
+            await self.context.add_cookies(state.get("cookies", []))
+        except Exception as e:
+            logger.warning("⚠️ Failed to adopt the shared session: %s", e)
+            return False
+        self.shared_version = version
+        await self._mark_logged_in(save_state=False)
+        age = max(0.0, time.time() - version / 1e9) if version else 0.0
+        self._logged_in_monotonic = time.monotonic() - age
+        logger.info("🤝 Adopted the leader's session (%.0fs old)", age)
+        return True
+    
+    async def refresh_shared_session(self):
+        """Leader: a follower was rejected - log in again, or re-publish a still valid session."""
+        if self.logged_in and await self.keeper.probe():
+            await self._save_storage_state()
+            return
+        self._session_rejected()
+        await self.login()
+    
+    async def promote(self):
+        """Follower -> leader: keep the adopted session if it is valid, otherwise log in."""
+        self.keeper.start()
+        if self.logged_in and await self.keeper.probe():
+            return
+        self.logged_in = False
+        await self.login()
+    
+    async def _mark_logged_in(self, save_state: bool = True):
+        """Record a successful login and hand the fresh cookies to the HTTP client."""
+        self.logged_in = True
+        self.last_login_at = datetime.now().isoformat()
+        self._logged_in_monotonic = time.monotonic()
+        self._login_generation += 1
+        if self.http:
+            self.http.load_cookies(await self.context.cookies())
+        if save_state:
+            await self._save_storage_state()
+        if self._login_trace is not None:
+            finish_trace(self._login_trace, "success")
+            self._login_trace = None
+    
     async def ensure_logged_in(self):
         """Ensure we're logged in, re-login if needed."""
         if not self.logged_in or not self.page:
@@ -365,7 +829,8 @@ class SessionManager:
             current_url = self.page.url.rstrip('/').split('?')[0]
             base_url = ALLIANCE_BASE_URL.rstrip('/')
             if current_url == base_url or current_url == base_url + "/":
-                print("🔄 Session expired, re-logging in...")
+                logger.info("🔄 Session expired, re-logging in...")
+                self._session_rejected()
                 return await self.login()
         except:
             return await self.login()
@@ -373,37 +838,210 @@ class SessionManager:
         return True
     
     async def fetch_barem(self, item_id: int) -> BaremResponse:
-        """Fetch barem data for an item using search on main page."""
+        """Fetch barem data for an item via POST /Sales/ItemDetailv3."""
         response = BaremResponse(
             success=False,
             item_id=item_id,
             fetched_at=datetime.now().isoformat()
         )
-        
-        if not await self.ensure_logged_in():
-            response.error = "Not logged in"
-            return response
-        
-        async with self._lock:
+        trace = Trace("fetch_barem", item_id)
+        metrics.INFLIGHT.inc("fetch_barem")
+        outcome = None
+        admission = None
+        try:
+            with trace.stage("admission"):
+                admission = await self._admit()
+            await self._fetch_barem_traced(item_id, response, trace, admission)
+        except Backpressure as e:
+            trace.error = str(e)
+            outcome = "shed" if isinstance(e, DeadlineExceeded) else "rejected"
+            raise
+        finally:
+            if admission is not None:
+                admission.release()  # No-op once an outcome was recorded
+            metrics.INFLIGHT.dec("fetch_barem")
+            finish_trace(trace, outcome or ("error" if response.error else "success"))
+        return response
+    
+    async def _admit(self) -> Admission:
+        """
+        Gate one upstream call: shed when the request deadline cannot cover
+        the expected queue wait plus portal latency, refused while the
+        breaker is open, otherwise queued for a token in the caller's lane
+        (429 once the queue is full) for no longer than the deadline allows.
+
+        The caller owns the returned admission and must resolve it - record
+        the outcome via _record_upstream, or release it - in a finally.
+        """
+        expected_latency = self.limiter.latency or 0.0
+        try:
+            if not self._renewal_done.is_set():
+                try:
+                    await asyncio.wait_for(self._renewal_done.wait(), deadline.remaining())
+                except asyncio.TimeoutError:
+                    raise DeadlineExceeded("Request deadline passed while the session was renewed") from None
+            deadline.check(self.limiter.expected_wait() + expected_latency, "admission")
+        except DeadlineExceeded:
+            metrics.UPSTREAM_REJECTIONS.inc("deadline")
+            raise
+        try:
+            admission = self.breaker.check()
             try:
-                print(f"📡 Fetching barem for item {item_id}...")
+                try:
+                    await asyncio.wait_for(self.limiter.acquire(), deadline.remaining())
+                except asyncio.TimeoutError:
+                    raise DeadlineExceeded("Request deadline passed while queued for the portal") from None
+                try:
+                    deadline.check(expected_latency, "admission")
+                except DeadlineExceeded:
+                    self.limiter.bucket.release()  # Token unused - hand it to the next caller
+                    raise
+            except BaseException:
+                admission.release()
+                raise
+        except Backpressure as e:
+            if isinstance(e, DeadlineExceeded):
+                reason = "deadline"
+            else:
+                reason = "circuit_open" if e.status_code == 503 else "overloaded"
+            metrics.UPSTREAM_REJECTIONS.inc(reason)
+            raise
+        self._upstream_calls += 1
+        self._upstream_idle.clear()
+        admission.add_done_callback(self._upstream_call_done)
+        return admission
+    
+    def _upstream_call_done(self, admission: Admission):
+        self._upstream_calls -= 1
+        if not self._upstream_calls:
+            self._upstream_idle.set()
+    
+    async def renew_session(self) -> bool:
+        """
+        Proactive re-login while the current session still works. The login
+        form's UniqueLogin step logs that session out, so new upstream calls
+        wait and the running ones finish first, as a rotation drains pages.
+        """
+        self._renewal_done.clear()
+        try:
+            try:
+                await asyncio.wait_for(self._upstream_idle.wait(), SESSION_RENEWAL_DRAIN_TIMEOUT)
+            except asyncio.TimeoutError:
+                logger.warning("⚠️ %d upstream calls still running after %.0fs, renewing the session anyway",
+                               self._upstream_calls, SESSION_RENEWAL_DRAIN_TIMEOUT)
+            return await self.login()
+        finally:
+            self._renewal_done.set()
+    
+    def _record_upstream(self, admission: Admission, latency: float, status, generation: int):
+        """Feed an upstream outcome to the limiter and breaker."""
+        ok = isinstance(status, int) and status < 500 and status != 429
+        if generation != self._login_generation:
+            latency = 0.0  # A re-login happened inside the call; don't blame the portal's latency
+        self.limiter.record(latency, ok)
+        admission.record(ok)
+    
+    async def _fetch_barem_traced(self, item_id: int, response: BaremResponse, trace: Trace, admission: Admission):
+        with trace.stage("ensure_logged_in"):
+            # Shielded: a caller leaving must not abort a login others wait on
+            logged_in = await asyncio.shield(self.ensure_logged_in())
+        if not logged_in:
+            response.error = trace.error = "Not logged in"
+            return
+        deadline.check(self.limiter.latency or 0.0, "upstream")
+        
+        generation = self._login_generation
+        upstream_started = time.perf_counter()
+        timeout = deadline.bounded(UPSTREAM_TIMEOUT)
+        try:
+            logger.debug("📡 Fetching barem for item %d", item_id)
+            
+            with trace.stage("upstream"):
+                if self.http:
+                    api_response = await self._fetch_via_http(item_id, timeout)
+                else:
+                    api_response = await self._fetch_via_page(item_id, timeout)
+            trace.status = api_response.get("status") if api_response else None
+            metrics.UPSTREAM_RESPONSES.inc(trace.status or "error")
+            self._record_upstream(admission, time.perf_counter() - upstream_started, trace.status, generation)
+            
+            if api_response and api_response.get("success"):
+                html = api_response.get("html", "")
+                if captures.sample():
+                    captures.record_response("item_detail", item_id, html, trace.status)
+                
+                # Parse HTML to extract barem data
+                # The HTML contains a table with barem information
+                with trace.stage("parse"):
+                    response.barems = await self.parser.parse_async(html)
                 
+                if not response.barems:
+                    logger.debug("⚠️ No barems found in HTML for item %d (%d bytes)", item_id, len(html))
+                    
+            else:
+                error = api_response.get("error", "Unknown error") if api_response else "No response"
+                logger.warning("❌ ItemDetailv3 call failed for item %d: %s", item_id, error)
+                response.error = trace.error = error
+            
+            response.success = True
+            logger.info("✅ Found %d barems for item %d", len(response.barems), item_id)
+            
+        except asyncio.TimeoutError:
+            logger.warning("⏱️ ItemDetailv3 for item %d gave no answer within %.1fs", item_id, timeout)
+            response.error = trace.error = f"Upstream timed out after {timeout:.1f}s"
+            metrics.UPSTREAM_RESPONSES.inc("timeout")
+            self._record_upstream(admission, time.perf_counter() - upstream_started, None, generation)
+        except Exception as e:
+            logger.error("❌ Error fetching barem for item %d: %s", item_id, e)
+            response.error = trace.error = str(e)
+            if trace.status is None:
+                metrics.UPSTREAM_RESPONSES.inc("error")
+                if isinstance(e, httpx.HTTPError):
+                    self._record_upstream(admission, time.perf_counter() - upstream_started, None, generation)
+                # Anything else is local (parser, failed re-login...) and says
+                # nothing about the portal: fetch_barem releases the admission
+    
+    async def _fetch_via_http(self, item_id: int, timeout: float) -> dict:
+        """Direct httpx fetch; re-authenticates through the browser once on expiry."""
+        generation = self._login_generation
+        try:
+            return await asyncio.wait_for(self.http.fetch_item_detail(item_id), timeout)
+        except SessionExpired as e:
+            # Only log in again if nobody else did since this request went out
+            if generation == self._login_generation or not self.logged_in:
+                logger.warning("🔄 HTTP session rejected (%s), re-logging in via browser...", e)
+                self._session_rejected()
+                if not await asyncio.shield(self.login()):
+                    raise
+            deadline.check(self.limiter.latency or 0.0, "upstream")
+            timeout = deadline.bounded(UPSTREAM_TIMEOUT)
+            return await asyncio.wait_for(self.http.fetch_item_detail(item_id), timeout)
+    
+    async def _fetch_via_page(self, item_id: int, timeout: float) -> dict:
+        """Run the ItemDetailv3 fetch inside a pooled page, giving up after `timeout` seconds."""
+        async with self.pool.checkout() as pooled:
+            metrics.LOCK_WAIT_SECONDS.observe(pooled.wait_seconds, "page_pool")
+            self.context_requests += 1
+            page = pooled.page
+            try:
                 # Make sure we're on a valid page (MainPage or QuickOrder)
-                current_url = self.page.url
+                current_url = page.url
                 if "MainPage" not in current_url and "QuickOrder" not in current_url:
-                    await self.page.goto(
+                    await page.goto(
                         f"{ALLIANCE_BASE_URL}/Home/MainPage",
-                        wait_until="networkidle"
+                        wait_until="networkidle",
+                        timeout=max(1.0, deadline.bounded(UPSTREAM_TIMEOUT)) * 1000,  # 0 would mean no timeout
                     )
                     await asyncio.sleep(1)
                 
                 # Use the correct API: POST /Sales/ItemDetailv3
-                print(f"📋 Calling POST /Sales/ItemDetailv3 for item {item_id}...")
+                logger.debug("📋 Calling POST /Sales/ItemDetailv3 for item %d", item_id)
                 
                 api_url = f"{ALLIANCE_BASE_URL}/Sales/ItemDetailv3"
                 
-                # Make POST request with itemId in body
-                api_response = await self.page.evaluate(f'''
+                # Make POST request with itemId in body; evaluate has no
+                # timeout of its own, so bound it here (the page is marked failed)
+                api_response = await asyncio.wait_for(page.evaluate(f'''
                     async () => {{
                         try {{
                             const response = await fetch("{api_url}", {{
@@ -426,141 +1064,212 @@ class SessionManager:
                             return {{ success: false, error: e.message }};
                         }}
                     }}
-                ''')
-                
-                if api_response and api_response.get("success"):
-                    html = api_response.get("html", "")
-                    print(f"   ✅ Got HTML response ({len(html)} bytes)")
-                    
-                    # Save HTML for debugging
-                    try:
-                        with open("/app/debug_barem.html", "w") as f:
-                            f.write(html)
-                        print(f"   📄 Saved to /app/debug_barem.html")
-                    except:
-                        pass
-                    
-                    # Parse HTML to extract barem data
-                    # The HTML contains a table with barem information
-                    barems = self._parse_barem_html(html, item_id)
-                    response.barems = barems
-                    
-                    if barems:
-                        print(f"   ✅ Parsed {len(barems)} barems from HTML!")
-                    else:
-                        print(f"   ⚠️ No barems found in HTML")
-                        
-                else:
-                    error = api_response.get("error", "Unknown error") if api_response else "No response"
-                    print(f"   ❌ API call failed: {error}")
-                
-                response.success = True
-                print(f"✅ Found {len(response.barems)} barems for item {item_id}")
-                
+                '''), timeout)
             except Exception as e:
-                print(f"❌ Error fetching barem: {e}")
-                response.error = str(e)
+                pooled.mark_failure(str(e) or type(e).__name__)
+                raise
+            
+            if api_response and api_response.get("success"):
+                pooled.mark_success()
+            else:
+                pooled.mark_failure(api_response.get("error", "Unknown error") if api_response else "No response")
+            return api_response
+    
+    async def _on_batch_item(self, source, batch_id: str, item_id: int, result: dict):
+        """Binding target for BATCH_FETCH_JS - routes one finished item to its batch."""
+        queue = self._batch_queues.get(batch_id)
+        if queue is not None:
+            queue.put_nowait((item_id, result))
+    
+    async def fetch_barem_batch(self, item_ids: List[int], concurrency: Optional[int] = None) -> AsyncIterator[BaremResponse]:
+        """
+        Fetch many items, yielding each BaremResponse as soon as its upstream
+        request completes: parallel httpx calls in HTTP mode, otherwise one
+        page.evaluate per chunk of `concurrency` items.
+        """
+        item_ids = list(dict.fromkeys(item_ids))
+        if not item_ids:
+            return
         
-        return response
+        if not await self.ensure_logged_in():
+            for item_id in item_ids:
+                yield BaremResponse(success=False, item_id=item_id, error="Not logged in", fetched_at=datetime.now().isoformat())
+            return
+        
+        concurrency = max(1, min(concurrency or BATCH_CONCURRENCY, BATCH_CONCURRENCY, len(item_ids)))
+        
+        if self.http:
+            async for result in self._fetch_batch_via_http(item_ids, concurrency):
+                yield result
+            return
+        
+        # Each in-page evaluate runs a whole chunk, so its items are admitted up
+        # front; chunks of `concurrency` keep that wait short and results streaming
+        for start in range(0, len(item_ids), concurrency):
+            admissions: Dict[int, Admission] = {}
+            try:
+                for item_id in item_ids[start:start + concurrency]:
+                    try:
+                        admissions[item_id] = await self._admit()
+                    except Backpressure as e:
+                        yield BaremResponse(success=False, item_id=item_id, error=str(e), fetched_at=datetime.now().isoformat())
+                if admissions:
+                    async for result in self._fetch_batch_via_page(list(admissions), concurrency, admissions):
+                        yield result
+            finally:
+                for admission in admissions.values():
+                    admission.release()  # Items that never got an upstream answer
     
-    def _parse_barem_html(self, html: str, item_id: int) -> list:
-        """Parse HTML response to extract barem data using BeautifulSoup."""
-        barems = []
+    async def _fetch_batch_via_page(self, item_ids: List[int], concurrency: int,
+                                    admissions: Dict[int, Admission]) -> AsyncIterator[BaremResponse]:
+        """Browser batch: BATCH_FETCH_JS in a pooled page, yielded as the page reports items."""
+        generation = self._login_generation
+        batch_id = uuid.uuid4().hex
+        queue: asyncio.Queue = asyncio.Queue()
+        self._batch_queues[batch_id] = queue
+        pending = set(item_ids)
         
-        try:
-            soup = BeautifulSoup(html, 'lxml')
-            
-            # Find the barem table (id='popup_tblKampanyalar')
-            table = soup.find('table', id='popup_tblKampanyalar')
-            if not table:
-                # Try any table with kampanya in id
-                table = soup.find('table', id=lambda x: x and 'kampanya' in x.lower())
-            if not table:
-                # Fallback to first table
-                tables = soup.find_all('table')
-                if tables:
-                    table = tables[0]
-                    print(f"   📋 Using first table (no kampanya table found)")
-            
-            if table:
-                tbody = table.find('tbody')
-                rows = tbody.find_all('tr') if tbody else table.find_all('tr')
+        def settle(item_id: int, api_response: dict):
+            pending.discard(item_id)
+            self._record_upstream(admissions[item_id], api_response.get("elapsed", 0.0),
+                                  api_response.get("status"), generation)
+        
+        async with self.pool.checkout() as pooled:
+            metrics.LOCK_WAIT_SECONDS.observe(pooled.wait_seconds, "page_pool")
+            self.context_requests += len(item_ids)
+            page = pooled.page
+            task = None
+            # Each worker fetches its items one after another: allow every item the upstream timeout
+            timeout = deadline.bounded(UPSTREAM_TIMEOUT * -(-len(item_ids) // concurrency))
+            try:
+                logger.info("📡 Fetching batch of %d items (concurrency=%d)", len(item_ids), concurrency)
                 
-                print(f"   📋 Found {len(rows)} rows in barem table")
+                current_url = page.url
+                if "MainPage" not in current_url and "QuickOrder" not in current_url:
+                    await page.goto(
+                        f"{ALLIANCE_BASE_URL}/Home/MainPage",
+                        wait_until="networkidle",
+                        timeout=max(1.0, deadline.bounded(UPSTREAM_TIMEOUT)) * 1000,  # 0 would mean no timeout
+                    )
+                    await asyncio.sleep(1)
                 
-                for row in rows:
-                    cells = row.find_all('td')
-                    if len(cells) >= 6:  # Full barem row has 7 columns (radio, vade, minadet, mf, kurum, ticari, fiyat)
-                        try:
-                            # Extract cell values - columns are:
-                            # [0] radio button, [1] Vade, [2] Min Adet, [3] MF, [4] Kurum, [5] Ticari, [6] Fiyat
-                            vade_text = cells[1].get_text(strip=True) if len(cells) > 1 else "0"
-                            min_adet_text = cells[2].get_text(strip=True) if len(cells) > 2 else "1"
-                            mf_text = cells[3].get_text(strip=True) if len(cells) > 3 else "0"
-                            kurum_text = cells[4].get_text(strip=True) if len(cells) > 4 else ""
-                            ticari_text = cells[5].get_text(strip=True) if len(cells) > 5 else ""
-                            fiyat_text = cells[6].get_text(strip=True) if len(cells) > 6 else "0"
-                            
-                            # Parse values
-                            vade = int(vade_text) if vade_text.isdigit() else 0
-                            min_adet = int(min_adet_text) if min_adet_text.isdigit() else 1
-                            mf = mf_text
-                            
-                            # Parse kurum iskonto (might be empty or have % symbol)
-                            kurum_iskonto = 0.0
-                            if kurum_text and kurum_text not in ['&nbsp;', '\xa0', '']:
-                                kurum_iskonto = float(kurum_text.replace('%', '').replace(',', '.').strip() or '0')
-                            
-                            # Parse ticari iskonto
-                            ticari_iskonto = 0.0
-                            if ticari_text and ticari_text not in ['&nbsp;', '\xa0', '']:
-                                ticari_iskonto = float(ticari_text.replace('%', '').replace(',', '.').strip() or '0')
-                            
-                            # Parse fiyat
-                            fiyat = 0.0
-                            if fiyat_text:
-                                fiyat = float(fiyat_text.replace(',', '.').replace(' ', '').strip() or '0')
-                            
-                            if vade > 0 or fiyat > 0:
-                                barem = BaremInfo(
-                                    Vade=vade,
-                                    MinimumAdet=min_adet,
-                                    MalFazlasi=mf,
-                                    IskontoKurum=kurum_iskonto,
-                                    IskontoTicari=ticari_iskonto,
-                                    BirimFiyat=fiyat,
-                                    Warehouse="Alliance",
-                                    Discount=max(kurum_iskonto, ticari_iskonto)
-                                )
-                                barems.append(barem)
-                                print(f"   📦 Barem: Vade={vade}, MinAdet={min_adet}, Fiyat={fiyat}")
-                                
-                        except Exception as e:
-                            print(f"   ⚠️ Error parsing row: {e}")
-                            continue
-            else:
-                print(f"   ⚠️ No barem table found in HTML")
-                            
-        except Exception as e:
-            print(f"   ⚠️ HTML parsing error: {e}")
+                task = asyncio.create_task(asyncio.wait_for(page.evaluate(BATCH_FETCH_JS, {
+                    "batchId": batch_id,
+                    "itemIds": item_ids,
+                    "concurrency": concurrency,
+                    "url": f"{ALLIANCE_BASE_URL}/Sales/ItemDetailv3",
+                }), timeout))
+                
+                while pending and not task.done():
+                    getter = asyncio.ensure_future(queue.get())
+                    done, _ = await asyncio.wait({getter, task}, return_when=asyncio.FIRST_COMPLETED)
+                    if getter not in done:
+                        getter.cancel()
+                        break
+                    item_id, api_response = getter.result()
+                    settle(item_id, api_response)
+                    yield await self._response_from_api(item_id, api_response)
+                
+                # The evaluate call ended; drain what was emitted before it did
+                while pending and not queue.empty():
+                    item_id, api_response = queue.get_nowait()
+                    settle(item_id, api_response)
+                    yield await self._response_from_api(item_id, api_response)
+                if task.done():
+                    task.result()  # Surface evaluate errors
+                
+                pooled.mark_success()
+                
+            except asyncio.TimeoutError:
+                logger.warning("⏱️ Batch left %d items unanswered within %.1fs", len(pending), timeout)
+                error = f"Upstream timed out after {timeout:.1f}s"
+                pooled.mark_failure(error)
+                for item_id in list(pending):
+                    settle(item_id, {"elapsed": timeout})
+                    yield BaremResponse(success=False, item_id=item_id, error=error, fetched_at=datetime.now().isoformat())
+            except Exception as e:
+                logger.error("❌ Error fetching barem batch: %s", e)
+                pooled.mark_failure(str(e))
+                for item_id in list(pending):
+                    yield BaremResponse(success=False, item_id=item_id, error=str(e), fetched_at=datetime.now().isoformat())
+                pending.clear()
+            finally:
+                self._batch_queues.pop(batch_id, None)
+                if task is not None and not task.done():
+                    task.cancel()
         
-        # Remove duplicate barems based on key fields (Vade, MinimumAdet, MalFazlasi, BirimFiyat)
-        unique_barems = []
-        seen_keys = set()
-        for barem in barems:
-            # Create a unique key from key fields
-            key = (barem.Vade, barem.MinimumAdet, barem.MalFazlasi, barem.BirimFiyat)
-            if key not in seen_keys:
-                seen_keys.add(key)
-                unique_barems.append(barem)
+        # Items the page never reported on (e.g. evaluate returned early)
+        for item_id in pending:
+            yield BaremResponse(success=False, item_id=item_id, error="No response", fetched_at=datetime.now().isoformat())
+    
+    async def _fetch_batch_via_http(self, item_ids: List[int], concurrency: int) -> AsyncIterator[BaremResponse]:
+        """HTTP fast-path batch: bounded parallel httpx fetches, yielded in completion order."""
+        logger.info("📡 Fetching batch of %d items over HTTP (concurrency=%d)", len(item_ids), concurrency)
+        semaphore = asyncio.Semaphore(concurrency)
         
-        if len(barems) != len(unique_barems):
-            print(f"   🔄 Removed {len(barems) - len(unique_barems)} duplicate barems")
+        async def fetch_one(item_id: int):
+            async with semaphore:
+                try:
+                    admission = await self._admit()
+                except Backpressure as e:
+                    return item_id, {"success": False, "error": str(e), "local": True}
+                try:
+                    generation = self._login_generation
+                    started = time.perf_counter()
+                    timeout = deadline.bounded(UPSTREAM_TIMEOUT)
+                    try:
+                        api_response = await self._fetch_via_http(item_id, timeout)
+                    except asyncio.TimeoutError:
+                        api_response = {"success": False, "error": f"Upstream timed out after {timeout:.1f}s"}
+                    except httpx.HTTPError as e:
+                        api_response = {"success": False, "error": str(e) or type(e).__name__}
+                    except Exception as e:
+                        # Local failure (or a re-login that didn't work): not the portal's fault
+                        logger.error("❌ Error fetching barem for item %d: %s", item_id, e)
+                        return item_id, {"success": False, "error": str(e), "local": True}
+                    self._record_upstream(admission, time.perf_counter() - started, api_response.get("status"), generation)
+                    return item_id, api_response
+                finally:
+                    admission.release()
         
-        return unique_barems
+        tasks = [asyncio.create_task(fetch_one(item_id)) for item_id in item_ids]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                item_id, api_response = await next_done
+                yield await self._response_from_api(item_id, api_response)
+        finally:
+            for task in tasks:
+                task.cancel()
+    
+    async def _response_from_api(self, item_id: int, api_response: Optional[dict]) -> BaremResponse:
+        """Build a BaremResponse from one in-page ItemDetailv3 fetch result."""
+        response = BaremResponse(
+            success=False,
+            item_id=item_id,
+            fetched_at=datetime.now().isoformat()
+        )
+        if api_response and api_response.get("local"):
+            response.error = api_response["error"]
+            return response
+        metrics.UPSTREAM_RESPONSES.inc((api_response or {}).get("status") or "error")
+        if api_response and api_response.get("success"):
+            response.barems = await self.parser.parse_async(api_response.get("html", ""))
+            response.success = True
+        else:
+            response.error = api_response.get("error", "Unknown error") if api_response else "No response"
+            logger.warning("❌ ItemDetailv3 call failed for item %d: %s", item_id, response.error)
+        return response
     
     async def close(self):
         """Clean up browser resources."""
+        if self.coordinator:
+            await self.coordinator.stop()
+        await self.keeper.stop()
+        await self.recycler.stop()
+        await self.pool.close()
+        self.parser.close()
+        if self.http:
+            await self.http.close()
         if self.browser:
             await self.browser.close()
         if self.playwright:
@@ -571,16 +1280,182 @@ class SessionManager:
 # FastAPI Application
 # ============================================================================
 session_manager = SessionManager()
+barem_cache = BaremCache(
+    max_entries=BAREM_CACHE_MAX_ENTRIES,
+    soft_ttl=BAREM_CACHE_SOFT_TTL,
+    hard_ttl=BAREM_CACHE_HARD_TTL,
+    is_cacheable=lambda result: result.success and not result.error,
+)
+barem_store = BaremStore(STORE_PATH)
+change_feed = ChangeFeed()
+
+metrics.POOL_WAITING.set_function(lambda: session_manager.pool.waiting)
+metrics.UPSTREAM_RATE.set_function(lambda: session_manager.limiter.rate)
+metrics.UPSTREAM_QUEUED.set_function(lambda: {
+    lane_name: session_manager.limiter.queued(lane_name) for lane_name in ("interactive", "background")
+})
+metrics.BREAKER_OPEN.set_function(lambda: 1 if session_manager.breaker.state != "closed" else 0)
+metrics.SESSION_AGE.set_function(lambda: session_manager.session_age or 0.0)
+metrics.CACHE_EVENTS.set_function(lambda: {
+    "hit": barem_cache.hits,
+    "stale_hit": barem_cache.stale_hits,
+    "miss": barem_cache.misses,
+    "coalesced": barem_cache.coalesced,
+})
+
+
+interactive_gate = InteractiveGate()
+crawler: Optional[BaremCrawler] = None
+product_catalog: Optional[Catalog] = None
+muadil_index: Optional[MuadilIndex] = None
+search_index: Optional[SearchIndex] = None
+
+
+async def load_barem_interactive(item_id: int) -> BaremResponse:
+    """Cache loader for user-facing requests; holds the crawler off while it runs."""
+    async with interactive_gate:
+        return await load_barem(item_id)
+
+
+async def crawl_barem(item_id: int) -> bool:
+    """Crawler fetch: store only, the in-process cache is left to interactive traffic."""
+    with lane(BACKGROUND):
+        result = await session_manager.fetch_barem(item_id)
+    await persist_barem(result)
+    return barem_cache.is_cacheable(result)
+
+
+async def stored_barem_age(item_id: int) -> Optional[float]:
+    stored = await barem_store.get_latest_async(item_id)
+    return stored.age_seconds if stored else None
+
+
+def create_crawler() -> Optional[BaremCrawler]:
+    if CRAWLER_MODE == "off":
+        return None
+    try:
+        item_ids = load_api_ids(CRAWLER_CSV_PATH)
+    except OSError as e:
+        logger.warning("⚠️ Crawler disabled, cannot read %s: %s", CRAWLER_CSV_PATH, e)
+        return None
+    return BaremCrawler(
+        item_ids,
+        fetch=crawl_barem,
+        stored_age=stored_barem_age,
+        ready=lambda: session_manager.browser is not None and session_manager.logged_in,
+        checkpoint_path=CRAWLER_CHECKPOINT_PATH,
+        rate=CRAWLER_RATE,
+        concurrency=CRAWLER_CONCURRENCY,
+        min_age=CRAWLER_MIN_AGE,
+        pass_interval=CRAWLER_PASS_INTERVAL,
+        gate=interactive_gate,
+    )
+
+
+async def load_barem(item_id: int) -> BaremResponse:
+    """Live fetch used as the cache loader; successful results are persisted."""
+    result = await session_manager.fetch_barem(item_id)
+    await persist_barem(result)
+    return result
+
+
+async def persist_barem(result: BaremResponse):
+    if not barem_cache.is_cacheable(result):
+        return
+    try:
+        change = await barem_store.save_async(jsonable_encoder(result))
+    except Exception as e:
+        logger.warning("⚠️ Failed to persist barem for item %d: %s", result.item_id, e)
+        return
+    if change:
+        logger.info("🔔 Barems changed for item %d (+%d -%d ~%d)", result.item_id,
+                    len(change["added"]), len(change["removed"]), len(change["changed"]))
+        change_feed.publish(change)
+
+
+async def watch_catalog():
+    """Reload the catalog and its indexes when the CSV's size or mtime changes."""
+    global product_catalog, muadil_index, search_index
+    while True:
+        await asyncio.sleep(CATALOG_WATCH_INTERVAL)
+        try:
+            fingerprint = await asyncio.to_thread(source_fingerprint, CATALOG_CSV_PATH)
+            if product_catalog is not None and fingerprint == (product_catalog.source_size, product_catalog.source_mtime_ns):
+                continue
+            catalog = await asyncio.to_thread(load_catalog, CATALOG_CSV_PATH, CATALOG_SNAPSHOT_PATH)
+            muadil = await asyncio.to_thread(load_muadil_index, CATALOG_CSV_PATH, MUADIL_SNAPSHOT_PATH)
+            if search_index is None:
+                search_index = await asyncio.to_thread(SearchIndex.from_catalog, catalog)
+                changes = {"added": len(search_index), "changed": 0, "removed": 0}
+            else:
+                # In place on the event loop, so no query sees a half-synced index
+                changes = search_index.sync(catalog)
+            product_catalog, muadil_index = catalog, muadil
+            logger.info("📚 Catalog reloaded: %d products, search +%d ~%d -%d", len(catalog),
+                        changes["added"], changes["changed"], changes["removed"])
+        except Exception as e:
+            logger.warning("⚠️ Catalog reload failed: %s", e)
+
+
+async def compact_store_periodically():
+    """Trim old barem versions from the store at a fixed interval."""
+    while True:
+        await asyncio.sleep(STORE_COMPACT_INTERVAL)
+        try:
+            removed = await barem_store.compact_async(STORE_KEEP_VERSIONS, CHANGES_RETENTION)
+            logger.info("🧹 Store compaction removed %d old barem versions and changes", removed)
+        except Exception as e:
+            logger.warning("⚠️ Store compaction failed: %s", e)
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Application lifespan manager."""
     # Startup
-    await session_manager.initialize()
+    # Browser launch and login run in the background so /health and
+    # stored barems are served immediately
+    compaction_task = asyncio.create_task(compact_store_periodically())
+    global product_catalog
+    try:
+        product_catalog = await asyncio.to_thread(load_catalog, CATALOG_CSV_PATH, CATALOG_SNAPSHOT_PATH)
+        logger.info("📚 Catalog ready: %d products", len(product_catalog))
+        global search_index
+        search_index = await asyncio.to_thread(SearchIndex.from_catalog, product_catalog)
+    except (OSError, ValueError) as e:
+        logger.warning("⚠️ Catalog disabled, cannot load %s: %s", CATALOG_CSV_PATH, e)
+    global muadil_index
+    try:
+        muadil_index = await asyncio.to_thread(load_muadil_index, CATALOG_CSV_PATH, MUADIL_SNAPSHOT_PATH)
+        logger.info("🔗 Muadil index ready: %d clusters", muadil_index.stats()["clusters"])
+    except (OSError, ValueError) as e:
+        logger.warning("⚠️ Muadil index disabled, cannot load %s: %s", CATALOG_CSV_PATH, e)
+    catalog_task = asyncio.create_task(watch_catalog()) if CATALOG_WATCH_INTERVAL > 0 else None
+    startup_task = asyncio.create_task(session_manager.start())
+    global crawler
+    crawler = create_crawler()
+    if crawler:
+        # One crawler per shared session: only the leader runs it (a
+        # follower that takes over the lead starts it then)
+        start_crawler = lambda: crawler.start(paused=CRAWLER_MODE != "on")
+        if session_manager.claim_leadership():
+            start_crawler()
+        else:
+            session_manager.coordinator.on_promoted.append(start_crawler)
     yield
+    if crawler:
+        await crawler.stop()
     # Shutdown
+    compaction_task.cancel()
+    if catalog_task:
+        catalog_task.cancel()
+    startup_task.cancel()
+    try:
+        await startup_task
+    except asyncio.CancelledError:
+        pass
     await session_manager.close()
+    barem_store.close()
+    stop_logging()
 
 
 app = FastAPI(
@@ -591,27 +1466,431 @@ app = FastAPI(
 )
 
 
+@app.exception_handler(Backpressure)
+async def backpressure_handler(request: Request, exc: Backpressure):
+    """429 (queue full) or 503 (circuit open) with a Retry-After hint."""
+    return JSONResponse(
+        status_code=exc.status_code,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(int(exc.retry_after + 0.999))},
+    )
+
+
 @app.get("/health", response_model=HealthResponse)
 async def health_check():
     """Health check endpoint."""
+    if session_manager.startup_error:
+        status = "failed"
+    elif session_manager.browser:
+        status = "healthy"
+    else:
+        status = "starting"
     return HealthResponse(
-        status="healthy" if session_manager.browser else "starting",
+        status=status,
         browser_ready=session_manager.browser is not None,
         logged_in=session_manager.logged_in,
-        last_login_at=session_manager.last_login_at
+        last_login_at=session_manager.last_login_at,
+        pool_size=session_manager.pool.size,
+        pool_available=session_manager.pool.available,
+        session_restored=session_manager.session_restored,
     )
 
 
-@app.get("/get-barem/{item_id}")
-async def get_barem(item_id: int):
-    """Fetch barem data for an item."""
+async def get_alliance_barem(item_id: int) -> BaremResponse:
+    """Alliance barems: cache, then store while the session warms up, then live."""
+    # While the breaker is open, stored data of any age beats an error
+    session_ready = (
+        session_manager.browser is not None
+        and session_manager.logged_in
+        and not session_manager.breaker.is_open
+    )
+    
+    if not barem_cache.contains(item_id):
+        stored = await barem_store.get_latest_async(item_id)
+        if stored:
+            if not session_ready:
+                # Live session still warming up - answer from disk regardless of age
+                return BaremResponse(**stored.payload)
+            age = stored.age_seconds
+            if age <= STORE_SERVE_MAX_AGE:
+                # Crawled/persisted data: serve it now, refresh in the background
+                age = min(age, BAREM_CACHE_SOFT_TTL)
+            barem_cache.put(item_id, BaremResponse(**stored.payload), age=age)
+    elif not session_ready:
+        return barem_cache.peek(item_id)
+    
     if not session_manager.browser:
         raise HTTPException(status_code=503, detail="Browser not ready")
     
-    result = await session_manager.fetch_barem(item_id)
+    return await barem_cache.get(item_id, lambda: load_barem_interactive(item_id))
+
+
+alliance_adapter = AllianceAdapter(get_alliance_barem, deadline=WAREHOUSE_DEADLINE)
+warehouse_fanout = WarehouseFanOut(parse_warehouse_config(WAREHOUSES, alliance_adapter, WAREHOUSE_DEADLINE))
+
+
+async def run_for_client(request: Request, coro):
+    """
+    Run a handler coroutine as a task that is cancelled as soon as the
+    client disconnects (answered 499) or the request deadline passes (504),
+    so abandoned requests stop consuming portal capacity.
+    """
+    task = asyncio.ensure_future(coro)
+    try:
+        while True:
+            left = deadline.remaining()
+            wait = DISCONNECT_POLL_INTERVAL if left is None else max(0.0, min(DISCONNECT_POLL_INTERVAL, left))
+            done, _ = await asyncio.wait({task}, timeout=wait)
+            if done:
+                return task.result()
+            if await request.is_disconnected():
+                metrics.ABANDONED_REQUESTS.inc("disconnect")
+                logger.info("🔌 Client left %s, cancelling", request.url.path)
+                return Response(status_code=499)
+            left = deadline.remaining()
+            if left is not None and left <= 0:
+                metrics.ABANDONED_REQUESTS.inc("deadline")
+                raise DeadlineExceeded(f"Request deadline passed for {request.url.path}")
+    finally:
+        if not task.done():
+            task.cancel()
+
+
+@app.get("/get-barem/{item_id}")
+async def get_barem(item_id: int, request: Request):
+    """
+    Fetch barem data for an item from every configured warehouse, within
+    the X-Request-Timeout budget (seconds) or the server default.
+    """
+    budget = deadline.parse_header(
+        request.headers.get(deadline.DEADLINE_HEADER), REQUEST_DEADLINE, REQUEST_DEADLINE_MAX
+    )
+    with deadline.scope(budget):
+        return await run_for_client(request, fetch_all_warehouses(item_id))
+
+
+async def fetch_all_warehouses(item_id: int):
+    if warehouse_fanout.adapters == [alliance_adapter]:
+        return await get_alliance_barem(item_id)
+    
+    result = await warehouse_fanout.fetch(item_id)
+    if not result.success and all(source.status == "unavailable" for source in result.sources):
+        raise HTTPException(status_code=503, detail=result.error)
     return result
 
 
+@app.get("/warehouses")
+async def warehouse_stats():
+    """Configured warehouse adapters with request, timeout and error counts."""
+    return warehouse_fanout.stats()
+
+
+@app.get("/get-barem/{item_id}/history")
+async def get_barem_history(item_id: int, limit: int = 20):
+    """Stored barem versions for an item, newest first."""
+    versions = await barem_store.history_async(item_id, limit)
+    return [version.to_dict() for version in versions]
+
+
+@app.post("/get-barem/batch")
+async def get_barem_batch(request: BaremBatchRequest):
+    """Fetch barems for many items, streamed back as NDJSON in completion order."""
+    if not session_manager.browser:
+        raise HTTPException(status_code=503, detail="Browser not ready")
+    if len(request.item_ids) > BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=400, detail=f"At most {BATCH_MAX_ITEMS} item IDs per batch")
+    
+    async def stream():
+        # Cached items go out first; only the rest hit the portal
+        misses = []
+        for item_id in dict.fromkeys(request.item_ids):
+            if barem_cache.contains(item_id):
+                result = await barem_cache.get(item_id, lambda item_id=item_id: load_barem_interactive(item_id))
+                yield json.dumps(jsonable_encoder(result), ensure_ascii=False) + "\n"
+            else:
+                misses.append(item_id)
+        async with interactive_gate:
+            async for result in session_manager.fetch_barem_batch(misses, request.concurrency):
+                barem_cache.put(result.item_id, result)
+                await persist_barem(result)
+                yield json.dumps(jsonable_encoder(result), ensure_ascii=False) + "\n"
+    
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+
+@app.get("/changes")
+async def get_changes(since: int = 0, limit: int = CHANGES_PAGE_SIZE):
+    """Barem changes after cursor `since`, oldest first; pass `next` back as `since`."""
+    changes, cursor = await barem_store.changes_since_async(since, max(1, min(limit, CHANGES_PAGE_SIZE)))
+    return {"changes": changes, "next": cursor}
+
+
+@app.get("/changes/stream")
+async def stream_changes(request: Request, since: Optional[int] = None):
+    """
+    Server-Sent Events feed of barem changes. Replays from `since` (or the
+    Last-Event-ID header on reconnect), then pushes changes as they happen,
+    whichever worker saved them. Without either, only changes from now on
+    are sent.
+    """
+    last_event_id = request.headers.get("last-event-id")
+    if last_event_id and last_event_id.isdigit():
+        since = int(last_event_id)
+    
+    def event(change: dict) -> str:
+        return f"id: {change['seq']}\nevent: change\ndata: {json.dumps(change, ensure_ascii=False)}\n\n"
+    
+    async def stream():
+        # Events are always read from the shared store, so changes saved by
+        # other workers show up and seq order holds; this worker's own
+        # publishes only wake the stream before the next poll
+        queue = change_feed.subscribe()
+        try:
+            cursor = since
+            if cursor is None:
+                _, cursor = await barem_store.changes_since_async(2 ** 62, 1)
+            quiet_since = time.monotonic()
+            while True:
+                while True:
+                    changes, cursor_next = await barem_store.changes_since_async(cursor, CHANGES_PAGE_SIZE)
+                    for change in changes:
+                        yield event(change)
+                    if changes:
+                        quiet_since = time.monotonic()
+                    cursor = cursor_next
+                    if len(changes) < CHANGES_PAGE_SIZE:
+                        break
+                try:
+                    if await asyncio.wait_for(queue.get(), CHANGES_POLL_INTERVAL) is None:
+                        queue = change_feed.subscribe()  # Dropped for lagging; the store has it all
+                    while not queue.empty():
+                        queue.get_nowait()
+                except asyncio.TimeoutError:
+                    pass
+                if time.monotonic() - quiet_since >= CHANGES_HEARTBEAT:
+                    if await request.is_disconnected():
+                        return
+                    yield ": keepalive\n\n"
+                    quiet_since = time.monotonic()
+        finally:
+            change_feed.unsubscribe(queue)
+    
+    return StreamingResponse(stream(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+
+@app.get("/export")
+async def export_barems(request: Request, format: str = "ndjson", since: Optional[str] = None):
+    """
+    Every stored barem as one flat row, streamed as NDJSON or CSV (gzip
+    when the client accepts it). Pass the X-Export-Cursor of the previous
+    export as `since`, or send If-Modified-Since, to get only items whose
+    barems changed after that; 304 when none did.
+    """
+    if format not in export.MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail=f"format must be one of {', '.join(export.MEDIA_TYPES)}")
+    # Taken before reading, so changes stored during the export show up next time
+    cursor = time.time()
+    last_modified = await barem_store.last_modified_async()
+    
+    modified_since = export.parse_cursor(since)
+    if_modified_since = None if modified_since is not None else export.parse_http_date(
+        request.headers.get("if-modified-since")
+    )
+    headers = {"X-Export-Cursor": f"{cursor:.3f}", "Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+    if last_modified:
+        headers["Last-Modified"] = export.http_date(last_modified)
+    if if_modified_since is not None:
+        # HTTP dates have whole seconds; compare at that resolution
+        modified_since = if_modified_since
+        if last_modified is None or int(last_modified) <= if_modified_since:
+            return Response(status_code=304, headers=headers)
+    elif modified_since is not None and (last_modified is None or last_modified < modified_since):
+        return Response(status_code=304, headers=headers)
+    
+    compress = "gzip" in request.headers.get("accept-encoding", "").lower()
+    if compress:
+        headers["Content-Encoding"] = "gzip"
+    headers["Content-Disposition"] = f'attachment; filename="barems.{format}"'
+    return StreamingResponse(
+        export.stream_export(barem_store.export_page_async, format, modified_since, compress, EXPORT_PAGE_SIZE),
+        media_type=export.MEDIA_TYPES[format],
+        headers=headers,
+    )
+
+
+@app.get("/upstream")
+async def upstream_status():
+    """Adaptive rate, lane queue depths and circuit breaker state."""
+    return {"limiter": session_manager.limiter.stats(), "breaker": session_manager.breaker.stats()}
+
+
+@app.get("/cache/stats")
+async def cache_stats():
+    """Barem cache counters (hits, misses, coalesced loads, evictions)."""
+    return barem_cache.stats()
+
+
+@app.get("/store/stats")
+async def store_stats():
+    """Persistent barem store size and row counts."""
+    return await asyncio.to_thread(barem_store.stats)
+
+
+def _require_crawler() -> BaremCrawler:
+    if crawler is None:
+        raise HTTPException(status_code=404, detail="Crawler is disabled")
+    return crawler
+
+
+@app.get("/crawler/status")
+async def crawler_status():
+    """Crawl progress, counters and state."""
+    return _require_crawler().status()
+
+
+@app.post("/crawler/pause")
+async def crawler_pause():
+    """Pause the crawler after the items currently in flight."""
+    active = _require_crawler()
+    active.pause()
+    return active.status()
+
+
+@app.post("/crawler/resume")
+async def crawler_resume():
+    """Resume crawling from the checkpointed position."""
+    active = _require_crawler()
+    active.resume()
+    return active.status()
+
+
+def _require_catalog() -> Catalog:
+    if product_catalog is None:
+        raise HTTPException(status_code=503, detail="Catalog not loaded")
+    return product_catalog
+
+
+@app.get("/catalog")
+async def catalog_stats():
+    """Catalog size and snapshot details."""
+    stats = _require_catalog().stats()
+    if search_index is not None:
+        stats["search"] = search_index.stats()
+    return stats
+
+
+@app.get("/catalog/search")
+async def catalog_search(q: str, limit: int = 10):
+    """Products ranked by name match; tolerant of Turkish letters, unit spacing and typos."""
+    if search_index is None:
+        raise HTTPException(status_code=503, detail="Search index not loaded")
+    results = []
+    for hit in search_index.search(q, max(1, min(limit, SEARCH_MAX_LIMIT))):
+        row = product_catalog.find_api_id(hit.api_id)
+        product = product_catalog.to_dict(row) if row is not None else {"api_id": hit.api_id, "name": hit.name}
+        results.append({**product, "score": hit.score})
+    return {"query": q, "count": len(results), "results": results}
+
+
+def _require_muadil() -> MuadilIndex:
+    if muadil_index is None:
+        raise HTTPException(status_code=503, detail="Muadil index not loaded")
+    return muadil_index
+
+
+@app.get("/catalog/muadil/stats")
+async def catalog_muadil_stats():
+    """Cluster size distribution, dangling barcodes and one-sided links."""
+    return _require_muadil().stats()
+
+
+@app.get("/catalog/by-api-id/{api_id}")
+async def catalog_by_api_id(api_id: int):
+    """Product for a portal API_ID (the ItemDetailv3 itemId)."""
+    index = _require_catalog().find_api_id(api_id)
+    if index is None:
+        raise HTTPException(status_code=404, detail=f"No product with API_ID {api_id}")
+    return product_catalog.to_dict(index)
+
+
+@app.get("/catalog/{barcode}")
+async def catalog_by_barcode(barcode: str):
+    """Product (with its API_ID) for a barcode."""
+    index = _require_catalog().find_barcode(barcode)
+    if index is None:
+        raise HTTPException(status_code=404, detail=f"No product with barcode {barcode}")
+    return product_catalog.to_dict(index)
+
+
+@app.get("/catalog/{barcode}/equivalents")
+async def catalog_equivalents(barcode: str):
+    """Every barcode in the barcode's muadil cluster, with catalog rows where known."""
+    index = _require_muadil().find(barcode)
+    if index is None:
+        raise HTTPException(status_code=404, detail=f"Unknown barcode {barcode}")
+    cluster_id = muadil_index.cluster_id(index)
+    equivalents = []
+    for member in muadil_index.members(cluster_id):
+        if member == index:
+            continue
+        other = muadil_index.barcode(member)
+        row = product_catalog.find_barcode(other) if product_catalog is not None else None
+        equivalents.append({
+            "barcode": other,
+            "in_catalog": muadil_index.in_catalog(member),
+            "product": product_catalog.to_dict(row) if row is not None else None,
+        })
+    return {"barcode": barcode, "cluster_id": cluster_id, "equivalents": equivalents}
+
+
+@app.get("/browser/lifecycle")
+async def browser_lifecycle():
+    """Context age, request count, Chromium RSS and rotation history."""
+    return session_manager.recycler.stats()
+
+
+@app.post("/browser/rotate")
+async def browser_rotate(kind: str = "context"):
+    """Rotate the context (or the whole browser with kind=browser) now."""
+    if kind not in ("context", "browser"):
+        raise HTTPException(status_code=400, detail="kind must be 'context' or 'browser'")
+    if not session_manager.browser:
+        raise HTTPException(status_code=503, detail="Browser not ready")
+    await session_manager.recycler.rotate(kind, "manual")
+    return session_manager.recycler.stats()
+
+
+@app.get("/browser/requests")
+async def browser_request_stats():
+    """Requests allowed/blocked by the interception layer, per navigation."""
+    if not session_manager.request_filter:
+        return {"enabled": False}
+    return {"enabled": True, **session_manager.request_filter.stats()}
+
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    """Prometheus text-format metrics."""
+    return PlainTextResponse(metrics.REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/debug/captures")
+async def debug_captures(type: Optional[str] = None, limit: int = 20):
+    """Recent sampled raw responses and slow-request traces, newest first."""
+    return {"stats": captures.stats(), "captures": captures.snapshot(type, limit)}
+
+
+@app.get("/session")
+async def session_status():
+    """Session age, predicted lifetime, keepalive probe counters and leader/follower role."""
+    return {
+        "logged_in": session_manager.logged_in,
+        "last_login_at": session_manager.last_login_at,
+        **session_manager.keeper.stats(),
+        "coordination": session_manager.coordinator.stats() if session_manager.coordinator else None,
+    }
+
+
 @app.post("/login")
 async def trigger_login():
     """Manually trigger login."""
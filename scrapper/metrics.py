@@ -0,0 +1,299 @@
+"""
+Metrics
+Minimal Prometheus text-format metrics (counters, gauges, histograms) for
+the scrapper. Recording is a dict lookup plus an add, so it is safe to call
+on every request; formatting only happens when /metrics is scraped.
+"""
+import os
+import math
+import bisect
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+
+LabelValues = Tuple[str, ...]
+
+# Seconds; covers sub-ms cache/parse work up to multi-second logins
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(f'{extra[0]}="{extra[1]}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+
+    def _key(self, labels: Sequence[str]) -> LabelValues:
+        return tuple(str(v) for v in labels)
+
+    def samples(self) -> Iterable[str]:
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}", *self.samples()]
+
+
+class _ValueMetric(_Metric):
+    """Counter/gauge storage; values can also be computed at scrape time."""
+
+    def __init__(self, name, help_text, labelnames=(), function: Optional[Callable] = None):
+        super().__init__(name, help_text, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+        self._function = function
+
+    def set_function(self, function: Callable):
+        """
+        Compute values at scrape time instead of on every change. The
+        function returns a number (unlabelled) or a {label tuple: number} dict.
+        """
+        self._function = function
+
+    def _current(self) -> Dict[LabelValues, float]:
+        if self._function is None:
+            return self._values
+        try:
+            value = self._function()
+        except Exception:
+            return {(): float("nan")} if not self.labelnames else {}
+        if isinstance(value, dict):
+            return {self._key(k if isinstance(k, tuple) else (k,)): float(v) for k, v in value.items()}
+        return {(): float(value)}
+
+    def samples(self):
+        for key, value in sorted(self._current().items()):
+            rendered = "NaN" if math.isnan(value) else _format_value(value)
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {rendered}"
+
+
+class Counter(_ValueMetric):
+    kind = "counter"
+
+    def inc(self, *labels, amount: float = 1.0):
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+
+class Gauge(_ValueMetric):
+    kind = "gauge"
+
+    def set(self, value: float, *labels):
+        self._values[self._key(labels)] = value
+
+    def inc(self, *labels, amount: float = 1.0):
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, *labels, amount: float = 1.0):
+        self.inc(*labels, amount=-amount)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labelnames=(), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [per-bucket counts..., +Inf count], sum
+        self._counts: Dict[LabelValues, List[int]] = {}
+        self._sums: Dict[LabelValues, float] = {}
+
+    def observe(self, value: float, *labels):
+        key = self._key(labels)
+        counts = self._counts.get(key)
+        if counts is None:
+            counts = self._counts[key] = [0] * (len(self.buckets) + 1)
+            self._sums[key] = 0.0
+        counts[bisect.bisect_left(self.buckets, value)] += 1
+        self._sums[key] += value
+
+    def samples(self):
+        for key in sorted(self._counts):
+            cumulative = 0
+            counts = self._counts[key]
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                yield f"{self.name}_bucket{_format_labels(self.labelnames, key, ('le', _format_value(bound)))} {cumulative}"
+            cumulative += counts[-1]
+            yield f"{self.name}_bucket{_format_labels(self.labelnames, key, ('le', '+Inf'))} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(self._sums[key])}"
+            yield f"{self.name}_count{_format_labels(self.labelnames, key)} {cumulative}"
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+# ============================================================================
+# Browser process memory
+# ============================================================================
+BROWSER_PROCESS_NAMES = ("chrome", "chromium", "headless_shell")
+
+
+def _children() -> Optional[Dict[int, List[int]]]:
+    """Parent pid -> child pids, read from /proc/<pid>/stat."""
+    try:
+        pids = [int(p) for p in os.listdir("/proc") if p.isdigit()]
+    except OSError:
+        return None
+    children: Dict[int, List[int]] = {}
+    for pid in pids:
+        try:
+            with open(f"/proc/{pid}/stat") as f:
+                stat = f.read()
+            # "pid (comm) state ppid ...": comm may contain spaces and parens
+            ppid = int(stat[stat.rindex(")") + 2:].split()[1])
+        except (OSError, ValueError, IndexError):
+            continue
+        children.setdefault(ppid, []).append(pid)
+    return children
+
+
+def browser_memory_bytes(root: Optional[int] = None) -> float:
+    """
+    RSS of the Chromium processes descending from `root` (default: this
+    process), Linux only. Playwright doesn't expose the browser's pid, but
+    the browser runs under this worker's driver subprocess, so walking down
+    from our own pid counts this worker's browsers and no other worker's.
+    """
+    children = _children()
+    if children is None:
+        return float("nan")
+    total = 0
+    stack = list(children.get(os.getpid() if root is None else root, ()))
+    while stack:
+        pid = stack.pop()
+        stack.extend(children.get(pid, ()))
+        try:
+            with open(f"/proc/{pid}/comm") as f:
+                comm = f.read().strip()
+            if not comm.startswith(BROWSER_PROCESS_NAMES):
+                continue
+            with open(f"/proc/{pid}/status") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        total += int(line.split()[1]) * 1024
+                        break
+        except (OSError, ValueError, IndexError):
+            continue
+    return float(total)
+
+
+# ============================================================================
+# Scrapper metrics
+# ============================================================================
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.register(Histogram(
+    "scrapper_stage_seconds", "Duration of each stage of an operation",
+    ("operation", "stage"),
+))
+OPERATION_SECONDS = REGISTRY.register(Histogram(
+    "scrapper_operation_seconds", "End-to-end duration of an operation",
+    ("operation", "outcome"),
+))
+LOCK_WAIT_SECONDS = REGISTRY.register(Histogram(
+    "scrapper_lock_wait_seconds", "Time spent waiting for a lock or pooled resource",
+    ("resource",),
+))
+INFLIGHT = REGISTRY.register(Gauge(
+    "scrapper_inflight_requests", "Requests currently being processed",
+    ("operation",),
+))
+POOL_WAITING = REGISTRY.register(Gauge(
+    "scrapper_page_pool_waiting", "Callers queued for a pooled page",
+))
+UPSTREAM_RESPONSES = REGISTRY.register(Counter(
+    "scrapper_upstream_responses_total", "ItemDetailv3 responses by HTTP status ('error' for transport failures)",
+    ("status",),
+))
+LOGIN_ATTEMPTS = REGISTRY.register(Counter(
+    "scrapper_login_attempts_total", "Individual login form submissions",
+))
+LOGIN_FAILURES = REGISTRY.register(Counter(
+    "scrapper_login_failures_total", "Login calls that exhausted all attempts",
+))
+SESSION_PROBES = REGISTRY.register(Counter(
+    "scrapper_session_probes_total", "Background session keepalive probes by result",
+    ("result",),
+))
+SESSION_AGE = REGISTRY.register(Gauge(
+    "scrapper_session_age_seconds", "Age of the current portal session (0 when logged out)",
+))
+BLOCKED_REQUESTS = REGISTRY.register(Counter(
+    "scrapper_browser_blocked_requests_total", "Browser requests aborted by the request filter",
+    ("resource_type",),
+))
+BLOCKED_BYTES = REGISTRY.register(Counter(
+    "scrapper_browser_blocked_bytes_estimated_total", "Estimated transfer bytes saved by aborted requests",
+))
+BROWSER_ROTATIONS = REGISTRY.register(Counter(
+    "scrapper_browser_rotations_total", "Context/browser rotations triggered by the recycler",
+    ("kind",),
+))
+UPSTREAM_RATE = REGISTRY.register(Gauge(
+    "scrapper_upstream_rate", "Current adaptive ItemDetailv3 rate limit (requests/second)",
+))
+UPSTREAM_QUEUED = REGISTRY.register(Gauge(
+    "scrapper_upstream_queued", "Calls waiting for an upstream token, by priority lane",
+    ("lane",),
+))
+UPSTREAM_REJECTIONS = REGISTRY.register(Counter(
+    "scrapper_upstream_rejections_total", "Upstream calls refused by the limiter, circuit breaker or request deadline",
+    ("reason",),
+))
+ABANDONED_REQUESTS = REGISTRY.register(Counter(
+    "scrapper_abandoned_requests_total", "Requests cancelled because the client left or the deadline passed",
+    ("reason",),
+))
+BREAKER_OPEN = REGISTRY.register(Gauge(
+    "scrapper_upstream_breaker_open", "1 while the portal circuit breaker is open or half-open",
+))
+CACHE_EVENTS = REGISTRY.register(Counter(
+    "scrapper_cache_events_total", "Barem cache lookups by result (read from BaremCache counters)",
+    ("result",),
+))
+BROWSER_MEMORY = REGISTRY.register(Gauge(
+    "scrapper_browser_memory_bytes", "Resident memory of this worker's Chromium processes",
+    function=browser_memory_bytes,
+))
+
+
+def observe_trace(trace, outcome: str):
+    """Feed a diagnostics.Trace into the stage and operation histograms."""
+    for stage, seconds in trace.stages.items():
+        STAGE_SECONDS.observe(seconds, trace.kind, stage)
+    OPERATION_SECONDS.observe(trace.elapsed, trace.kind, outcome)
@@ -0,0 +1,54 @@
+"""
+Response Models
+Pydantic models shared by the scrapper API, parser and store.
+"""
+from typing import Optional, List
+
+from pydantic import BaseModel
+
+
+class BaremInfo(BaseModel):
+    Vade: int
+    MinimumAdet: int = 1
+    MalFazlasi: Optional[str] = ""
+    IskontoKurum: float = 0.0
+    IskontoTicari: float = 0.0
+    BirimFiyat: float = 0.0
+    Warehouse: str = "Alliance"
+    Discount: float = 0.0
+
+
+class SourceStatus(BaseModel):
+    warehouse: str
+    status: str  # ok | timeout | unavailable | error
+    elapsed_ms: float = 0.0
+    barem_count: int = 0
+    error: Optional[str] = None
+
+
+class BaremResponse(BaseModel):
+    success: bool
+    item_id: int
+    name: Optional[str] = None
+    barcode: Optional[str] = None
+    barems: List[BaremInfo] = []
+    error: Optional[str] = None
+    fetched_at: str = ""
+    # Only set on multi-warehouse responses
+    sources: Optional[List[SourceStatus]] = None
+    partial: bool = False
+
+
+class BaremBatchRequest(BaseModel):
+    item_ids: List[int]
+    concurrency: Optional[int] = None
+
+
+class HealthResponse(BaseModel):
+    status: str
+    browser_ready: bool
+    logged_in: bool
+    last_login_at: Optional[str] = None
+    pool_size: int = 0
+    pool_available: int = 0
+    session_restored: bool = False
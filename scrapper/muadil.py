@@ -0,0 +1,287 @@
+"""
+Muadil Graph
+Equivalence classes over the Muadil_Barkodlari column of the product
+archive. The column repeats entries within a list and is not symmetric
+across rows (A lists B, B does not list A), so "every equivalent of X" is
+only answerable after normalizing the whole file.
+
+The build deduplicates the lists, treats every listed pair as an undirected
+edge and clusters barcodes with union-find. Members of a cluster are stored
+contiguously in a memory-mapped snapshot (same layout as the catalog's), so
+all-equivalents lookups are one hash probe plus a slice. Quality stats
+(cluster size distribution, dangling barcodes without a catalog row,
+one-sided links) are computed at build time and stored alongside.
+
+Usage:
+    python muadil.py build [--csv ilac_arsivi.csv] [--snapshot muadil.snapshot]
+    python muadil.py lookup <barcode> [--csv ...] [--snapshot ...]
+"""
+import os
+import sys
+import json
+import time
+import logging
+from array import array
+from collections import Counter
+from typing import Dict, Iterable, List, Optional
+
+from catalog import (
+    CatalogRow, bytes_slot, map_file, pack_sections, read_catalog_csv, source_fingerprint,
+    string_column, table_size, unpack_sections, write_snapshot,
+)
+
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"PDMUADL\0"
+FORMAT_VERSION = 1
+
+SECTIONS = (
+    "barcode_offsets", "barcodes",
+    "clusters", "cluster_offsets", "in_catalog",
+    "barcode_table", "stats",
+)
+SECTION_FORMATS = {
+    "barcode_offsets": "I", "clusters": "i", "cluster_offsets": "I", "barcode_table": "i",
+}
+DANGLING_SAMPLE = 20
+
+
+class UnionFind:
+    """Disjoint sets over 0..n-1 with path halving and union by size."""
+
+    def __init__(self, count: int = 0):
+        self.parent = list(range(count))
+        self.size = [1] * count
+
+    def add(self) -> int:
+        self.parent.append(len(self.parent))
+        self.size.append(1)
+        return len(self.parent) - 1
+
+    def find(self, node: int) -> int:
+        parent = self.parent
+        while parent[node] != node:
+            parent[node] = parent[parent[node]]
+            node = parent[node]
+        return node
+
+    def union(self, a: int, b: int) -> bool:
+        a, b = self.find(a), self.find(b)
+        if a == b:
+            return False
+        if self.size[a] < self.size[b]:
+            a, b = b, a
+        self.parent[b] = a
+        self.size[a] += self.size[b]
+        return True
+
+
+# ============================================================================
+# Build
+# ============================================================================
+def build_snapshot(rows: Iterable[CatalogRow], source_size: int = 0, source_mtime_ns: int = 0) -> bytes:
+    """Cluster the barcodes of `rows` and serialize the index."""
+    nodes: Dict[str, int] = {}
+    sets = UnionFind()
+
+    def node(barcode: str) -> int:
+        index = nodes.get(barcode)
+        if index is None:
+            index = nodes[barcode] = sets.add()
+        return index
+
+    listed: Dict[str, List[str]] = {}
+    self_references = 0
+    for row in rows:
+        if not row.barcode:
+            continue
+        node(row.barcode)
+        links = listed.setdefault(row.barcode, [])
+        for other in row.muadil:
+            if other == row.barcode:
+                self_references += 1
+                continue
+            links.append(other)
+            sets.union(nodes[row.barcode], node(other))
+
+    edges = set()
+    asymmetric = 0
+    for barcode, links in listed.items():
+        for other in links:
+            edges.add((barcode, other) if barcode < other else (other, barcode))
+            if other in listed and barcode not in listed[other]:
+                asymmetric += 1
+    dangling = sorted(barcode for barcode in nodes if barcode not in listed)
+
+    # Largest clusters first; members sorted so the layout is deterministic
+    groups: Dict[int, List[str]] = {}
+    for barcode, index in nodes.items():
+        groups.setdefault(sets.find(index), []).append(barcode)
+    ordered = sorted((sorted(members) for members in groups.values()), key=lambda m: (-len(m), m[0]))
+
+    members: List[str] = []
+    clusters = array("i")
+    cluster_offsets = array("I", [0])
+    for cluster_id, group in enumerate(ordered):
+        members.extend(group)
+        clusters.extend([cluster_id] * len(group))
+        cluster_offsets.append(len(members))
+    encoded = [barcode.encode("utf-8") for barcode in members]
+    barcode_table = array("i", [0]) * table_size(len(encoded))
+    mask = len(barcode_table) - 1
+    for index, barcode in enumerate(encoded):
+        slot = bytes_slot(barcode, mask)
+        while barcode_table[slot]:
+            slot = (slot + 1) & mask
+        barcode_table[slot] = index + 1
+
+    sizes = Counter(len(group) for group in ordered)
+    stats = {
+        "barcodes": len(members),
+        "catalog_barcodes": len(listed),
+        "links": len(edges),
+        "clusters": len(ordered),
+        "clusters_with_equivalents": sum(count for size, count in sizes.items() if size > 1),
+        "largest_cluster": len(ordered[0]) if ordered else 0,
+        "cluster_sizes": {str(size): sizes[size] for size in sorted(sizes)},
+        "dangling_barcodes": len(dangling),
+        "dangling_sample": dangling[:DANGLING_SAMPLE],
+        "asymmetric_links": asymmetric,
+        "self_references": self_references,
+    }
+
+    barcode_offsets, barcodes = string_column(members)
+    sections = {
+        "barcode_offsets": barcode_offsets.tobytes(), "barcodes": barcodes,
+        "clusters": clusters.tobytes(), "cluster_offsets": cluster_offsets.tobytes(),
+        "in_catalog": bytes(barcode in listed for barcode in members),
+        "barcode_table": barcode_table.tobytes(),
+        "stats": json.dumps(stats, separators=(",", ":")).encode("utf-8"),
+    }
+    return pack_sections(MAGIC, FORMAT_VERSION, SECTIONS, sections, len(members), source_size, source_mtime_ns)
+
+
+# ============================================================================
+# Index
+# ============================================================================
+class MuadilIndex:
+    """Read-only view over a muadil snapshot buffer (bytes or an mmap)."""
+
+    def __init__(self, buffer, source: str = ""):
+        self._buffer = buffer
+        self.source = source
+        self.count, self.source_size, self.source_mtime_ns, sections = unpack_sections(
+            buffer, MAGIC, FORMAT_VERSION, SECTIONS, SECTION_FORMATS)
+        for name, section in sections.items():
+            setattr(self, "_" + name, section)
+        self._mask = len(self._barcode_table) - 1
+        self._stats = json.loads(bytes(self._stats))
+
+    def __len__(self) -> int:
+        return self.count
+
+    def find(self, barcode: str) -> Optional[int]:
+        """Member index of a barcode (catalog or muadil-only)."""
+        encoded = barcode.strip().encode("utf-8")
+        if not encoded:
+            return None
+        slot = bytes_slot(encoded, self._mask)
+        while True:
+            entry = self._barcode_table[slot]
+            if not entry:
+                return None
+            index = entry - 1
+            if self._barcodes[self._barcode_offsets[index]:self._barcode_offsets[index + 1]] == encoded:
+                return index
+            slot = (slot + 1) & self._mask
+
+    def barcode(self, index: int) -> str:
+        return bytes(self._barcodes[self._barcode_offsets[index]:self._barcode_offsets[index + 1]]).decode("utf-8")
+
+    def in_catalog(self, index: int) -> bool:
+        return bool(self._in_catalog[index])
+
+    def cluster_id(self, index: int) -> int:
+        return self._clusters[index]
+
+    def members(self, cluster_id: int) -> range:
+        return range(self._cluster_offsets[cluster_id], self._cluster_offsets[cluster_id + 1])
+
+    def equivalents(self, barcode: str) -> Optional[List[str]]:
+        """Every other barcode in the same cluster; None if the barcode is unknown."""
+        index = self.find(barcode)
+        if index is None:
+            return None
+        return [self.barcode(member) for member in self.members(self._clusters[index]) if member != index]
+
+    def stats(self) -> dict:
+        return {
+            "source": self.source,
+            "snapshot_bytes": len(self._buffer),
+            **self._stats,
+        }
+
+
+def build_index(csv_path: str, snapshot_path: Optional[str] = None) -> MuadilIndex:
+    """Parse the CSV, write the snapshot (atomically) if a path is given, and load it."""
+    size, mtime_ns = source_fingerprint(csv_path)
+    data = build_snapshot(read_catalog_csv(csv_path), size, mtime_ns)
+    if snapshot_path:
+        try:
+            write_snapshot(snapshot_path, data)
+            return MuadilIndex(map_file(snapshot_path), csv_path)
+        except OSError as e:
+            logger.warning("⚠️ Cannot write muadil snapshot %s: %s", snapshot_path, e)
+    return MuadilIndex(data, csv_path)
+
+
+def load_index(csv_path: str, snapshot_path: Optional[str] = None) -> MuadilIndex:
+    """Map the snapshot if it matches the CSV, otherwise rebuild it from the CSV."""
+    if snapshot_path and os.path.exists(snapshot_path):
+        try:
+            index = MuadilIndex(map_file(snapshot_path), csv_path)
+            if (index.source_size, index.source_mtime_ns) == source_fingerprint(csv_path):
+                return index
+            logger.info("🔗 %s changed, rebuilding the muadil snapshot", csv_path)
+        except (OSError, ValueError) as e:
+            logger.warning("⚠️ Unusable muadil snapshot %s: %s", snapshot_path, e)
+    return build_index(csv_path, snapshot_path)
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=("build", "lookup"))
+    parser.add_argument("barcode", nargs="?")
+    parser.add_argument("--csv", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "ilac_arsivi.csv"))
+    parser.add_argument("--snapshot", default="muadil.snapshot")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        started = time.perf_counter()
+        index = build_index(args.csv, args.snapshot)
+        built = time.perf_counter() - started
+        stats = index.stats()
+        print(f"🔗 {stats['barcodes']} barcodes, {stats['links']} links -> {stats['clusters']} clusters "
+              f"({stats['clusters_with_equivalents']} with equivalents, largest {stats['largest_cluster']})")
+        print(f"   dangling {stats['dangling_barcodes']}, asymmetric links {stats['asymmetric_links']}, "
+              f"self references {stats['self_references']}")
+        print("   cluster sizes " + ", ".join(f"{size}: {count}" for size, count in stats["cluster_sizes"].items()))
+        print(f"⏱️ CSV parse + build {built * 1000:.1f} ms, snapshot {stats['snapshot_bytes'] / 1024:.0f} KiB")
+        return 0
+
+    if not args.barcode:
+        parser.error("lookup needs a barcode")
+    index = load_index(args.csv, args.snapshot)
+    equivalents = index.equivalents(args.barcode)
+    if equivalents is None:
+        print(f"❌ {args.barcode} not found")
+        return 1
+    print(json.dumps({"barcode": args.barcode, "equivalents": equivalents}, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,132 @@
+"""
+Page Pool
+Bounded pool of Playwright pages that share one logged-in browser context.
+"""
+import logging
+import time
+import asyncio
+from typing import Optional, List
+from contextlib import asynccontextmanager
+
+from playwright.async_api import BrowserContext, Page
+
+
+logger = logging.getLogger(__name__)
+
+class PooledPage:
+    """A pool member plus the health bookkeeping used to decide when to replace it."""
+
+    def __init__(self, page: Page, max_failures: int):
+        self.page = page
+        self.max_failures = max_failures
+        self.uses = 0
+        self.failures = 0
+        self.created_at = time.monotonic()
+        self.last_error: Optional[str] = None
+        self.wait_seconds = 0.0  # How long the current borrower queued for it
+
+    @property
+    def healthy(self) -> bool:
+        return self.failures < self.max_failures and not self.page.is_closed()
+
+    def mark_success(self):
+        self.failures = 0
+        self.last_error = None
+
+    def mark_failure(self, error: str):
+        self.failures += 1
+        self.last_error = error
+
+
+class PagePool:
+    """
+    Fixed-size set of pages checked out FIFO.
+
+    Waiters are served in arrival order (asyncio.Queue wakes getters
+    first-come first-served), so a burst of requests cannot starve an
+    earlier caller. Pages that fail repeatedly are closed and replaced on
+    their next checkout.
+    """
+
+    def __init__(self, size: int, max_failures: int = 3):
+        self.size = max(1, size)
+        self.max_failures = max_failures
+        self.context: Optional[BrowserContext] = None
+        self._pages: List[PooledPage] = []
+        self._idle: asyncio.Queue = asyncio.Queue()
+        self.replaced = 0
+
+    async def start(self, context: BrowserContext):
+        """Open `size` pages in the given context."""
+        self.context = context
+        for _ in range(self.size):
+            pooled = PooledPage(await context.new_page(), self.max_failures)
+            self._pages.append(pooled)
+            self._idle.put_nowait(pooled)
+        logger.info("🧵 Page pool ready with %d pages", self.size)
+
+    @property
+    def available(self) -> int:
+        return self._idle.qsize()
+
+    @property
+    def waiting(self) -> int:
+        return len(getattr(self._idle, "_getters", ()))
+
+    async def _replace(self, pooled: PooledPage) -> PooledPage:
+        logger.warning("♻️ Replacing unhealthy pooled page (failures=%d, last_error=%s)", pooled.failures, pooled.last_error)
+        try:
+            if not pooled.page.is_closed():
+                await pooled.page.close()
+        except Exception:
+            pass
+        fresh = PooledPage(await self.context.new_page(), self.max_failures)
+        self._pages[self._pages.index(pooled)] = fresh
+        self.replaced += 1
+        return fresh
+
+    @asynccontextmanager
+    async def checkout(self):
+        """Borrow a page; it is always returned to the pool, even on error."""
+        wait_started = time.perf_counter()
+        pooled = await self._idle.get()
+        pooled.wait_seconds = time.perf_counter() - wait_started
+        try:
+            if not pooled.healthy:
+                pooled = await self._replace(pooled)
+            pooled.uses += 1
+            yield pooled
+        finally:
+            self._idle.put_nowait(pooled)
+
+    async def drain(self, timeout: float = 60.0) -> bool:
+        """
+        Wait until every page is back and nobody is queued for one. The
+        caller must already route new work elsewhere. Returns False on timeout.
+        """
+        deadline = time.monotonic() + timeout
+        while self.available < len(self._pages) or self.waiting:
+            if time.monotonic() >= deadline:
+                return False
+            await asyncio.sleep(0.05)
+        return True
+
+    def stats(self) -> dict:
+        return {
+            "size": self.size,
+            "available": self.available,
+            "waiting": self.waiting,
+            "replaced": self.replaced,
+            "pages": [
+                {"uses": p.uses, "failures": p.failures, "healthy": p.healthy, "last_error": p.last_error}
+                for p in self._pages
+            ],
+        }
+
+    async def close(self):
+        for pooled in self._pages:
+            try:
+                await pooled.page.close()
+            except Exception:
+                pass
+        self._pages.clear()
@@ -0,0 +1,343 @@
+"""
+Rate Limiting
+Async token buckets, an adaptive upstream limiter with priority lanes, and
+a circuit breaker for the portal.
+"""
+import time
+import asyncio
+import contextvars
+from collections import deque
+from contextlib import contextmanager
+from typing import Callable, Deque, Dict, List, Optional
+
+
+class TokenBucket:
+    """
+    `rate` tokens per second refill a bucket of `capacity` tokens.
+
+    `acquire()` waits until enough tokens are available; waiters are served
+    in arrival order because they queue on a single lock.
+    """
+
+    def __init__(self, rate: float, capacity: float = 1.0):
+        self.rate = max(rate, 1e-6)
+        self.capacity = max(capacity, 1.0)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    @property
+    def tokens(self) -> float:
+        self._refill()
+        return self._tokens
+
+    def try_acquire(self, tokens: float = 1.0) -> bool:
+        self._refill()
+        if self._tokens >= tokens:
+            self._tokens -= tokens
+            return True
+        return False
+
+    async def acquire(self, tokens: float = 1.0):
+        async with self._lock:
+            while not self.try_acquire(tokens):
+                await asyncio.sleep((tokens - self._tokens) / self.rate)
+
+    def release(self, tokens: float = 1.0):
+        """Return tokens that were acquired but not used."""
+        self._refill()
+        self._tokens = min(self.capacity, self._tokens + tokens)
+
+    def stats(self) -> dict:
+        return {"rate": self.rate, "capacity": self.capacity, "tokens": round(self.tokens, 3)}
+
+
+# ============================================================================
+# Backpressure errors
+# ============================================================================
+class Backpressure(Exception):
+    """Upstream work refused; the caller should retry after `retry_after` seconds."""
+
+    status_code = 503
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = max(1.0, retry_after)
+
+
+class Overloaded(Backpressure):
+    """Too many requests already queued for the interactive lane."""
+
+    status_code = 429
+
+
+class CircuitOpen(Backpressure):
+    """The portal is failing; calls are refused until the breaker half-opens."""
+
+    status_code = 503
+
+
+# ============================================================================
+# Priority lanes
+# ============================================================================
+INTERACTIVE = "interactive"
+BACKGROUND = "background"
+
+_lane: contextvars.ContextVar = contextvars.ContextVar("scrapper_lane", default=INTERACTIVE)
+
+
+def current_lane() -> str:
+    return _lane.get()
+
+
+@contextmanager
+def lane(name: str):
+    """Run the enclosed upstream calls in the given lane."""
+    token = _lane.set(name)
+    try:
+        yield
+    finally:
+        _lane.reset(token)
+
+
+class AdaptiveLimiter:
+    """
+    Token bucket whose rate follows upstream health (AIMD):
+      - a response slower than `target_latency`, or a failure, multiplies the
+        rate by `decrease` (at most once per `cooldown` seconds)
+      - every healthy response adds `increase` requests/second
+    bounded by [min_rate, max_rate].
+
+    Tokens are handed out interactive lane first; background waiters only
+    get a token when no interactive caller is queued. Once `max_queue`
+    interactive callers are waiting, further ones get Overloaded with a
+    Retry-After estimated from the queue depth and current rate.
+    """
+
+    def __init__(self, rate: float = 5.0, min_rate: float = 0.5, max_rate: float = 20.0,
+                 capacity: float = 5.0, target_latency: float = 2.0, increase: float = 0.1,
+                 decrease: float = 0.7, cooldown: float = 2.0, max_queue: int = 50):
+        self.bucket = TokenBucket(rate, capacity)
+        self.min_rate = min_rate
+        self.max_rate = max(max_rate, min_rate)
+        self.target_latency = target_latency
+        self.increase = increase
+        self.decrease = decrease
+        self.cooldown = cooldown
+        self.max_queue = max_queue
+        self._waiters: Dict[str, Deque[asyncio.Future]] = {INTERACTIVE: deque(), BACKGROUND: deque()}
+        self._dispatcher: Optional[asyncio.Task] = None
+        self._last_decrease = 0.0
+        self.granted = {INTERACTIVE: 0, BACKGROUND: 0}
+        self.rejected = 0
+        self.latency: Optional[float] = None  # EWMA of upstream latency, for deadline shedding
+
+    @property
+    def rate(self) -> float:
+        return self.bucket.rate
+
+    def queued(self, lane_name: str = INTERACTIVE) -> int:
+        return len(self._waiters[lane_name])
+
+    def retry_after(self) -> float:
+        return (self.queued(INTERACTIVE) + self.queued(BACKGROUND) + 1) / self.rate
+
+    def expected_wait(self, lane_name: Optional[str] = None) -> float:
+        """Rough seconds until a new caller in `lane_name` gets a token."""
+        lane_name = lane_name or current_lane()
+        ahead = self.queued(INTERACTIVE) + (self.queued(BACKGROUND) if lane_name == BACKGROUND else 0)
+        if not ahead and self.bucket.tokens >= 1:
+            return 0.0
+        return (ahead + 1) / self.rate
+
+    async def acquire(self, lane_name: Optional[str] = None):
+        lane_name = lane_name or current_lane()
+        if lane_name not in self._waiters:
+            lane_name = BACKGROUND
+        ahead = self.queued(INTERACTIVE) + (self.queued(BACKGROUND) if lane_name == BACKGROUND else 0)
+        if not ahead and self.bucket.try_acquire():
+            self.granted[lane_name] += 1
+            return
+        if lane_name == INTERACTIVE and self.queued(INTERACTIVE) >= self.max_queue:
+            self.rejected += 1
+            raise Overloaded(f"{self.queued(INTERACTIVE)} requests queued for the portal", self.retry_after())
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters[lane_name].append(waiter)
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = asyncio.create_task(self._dispatch())
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            try:
+                self._waiters[lane_name].remove(waiter)
+            except ValueError:
+                pass  # Already handed a token; it is lost with the caller
+            raise
+        self.granted[lane_name] += 1
+
+    def _next_waiter(self) -> Optional[asyncio.Future]:
+        for lane_name in (INTERACTIVE, BACKGROUND):
+            queue = self._waiters[lane_name]
+            while queue:
+                waiter = queue.popleft()
+                if not waiter.done():
+                    return waiter
+        return None
+
+    async def _dispatch(self):
+        while self._waiters[INTERACTIVE] or self._waiters[BACKGROUND]:
+            await self.bucket.acquire()
+            waiter = self._next_waiter()
+            if waiter is None:
+                self.bucket.release()  # Everyone left while we waited
+                return
+            waiter.set_result(None)
+
+    def record(self, latency: float, ok: bool):
+        """Feed one upstream outcome into the rate controller."""
+        now = time.monotonic()
+        if latency > 0:
+            self.latency = latency if self.latency is None else 0.8 * self.latency + 0.2 * latency
+        if not ok or latency > self.target_latency:
+            if now - self._last_decrease >= self.cooldown:
+                self._last_decrease = now
+                self.bucket.rate = max(self.min_rate, self.bucket.rate * self.decrease)
+        else:
+            self.bucket.rate = min(self.max_rate, self.bucket.rate + self.increase)
+
+    def stats(self) -> dict:
+        return {
+            "rate": round(self.rate, 3),
+            "min_rate": self.min_rate,
+            "max_rate": self.max_rate,
+            "tokens": round(self.bucket.tokens, 3),
+            "queued": {name: len(queue) for name, queue in self._waiters.items()},
+            "granted": dict(self.granted),
+            "rejected": self.rejected,
+            "latency_ewma_seconds": round(self.latency, 3) if self.latency is not None else None,
+        }
+
+
+# ============================================================================
+# Circuit breaker
+# ============================================================================
+class Admission:
+    """
+    One call let through by CircuitBreaker.check(). Resolve it exactly once:
+    record() with the upstream outcome, or release() when the call never got
+    an answer from upstream. Later calls are no-ops, so a `finally:
+    admission.release()` can guard the whole admitted section.
+    """
+
+    __slots__ = ("_breaker", "trial", "resolved", "_callbacks")
+
+    def __init__(self, breaker: "CircuitBreaker", trial: bool):
+        self._breaker = breaker
+        self.trial = trial  # Holds the half-open trial slot
+        self.resolved = False
+        self._callbacks: List[Callable[["Admission"], None]] = []
+
+    def add_done_callback(self, callback: Callable[["Admission"], None]):
+        """Call `callback(admission)` once the admission is resolved."""
+        self._callbacks.append(callback)
+
+    def _resolve(self):
+        self.resolved = True
+        for callback in self._callbacks:
+            callback(self)
+
+    def record(self, ok: bool):
+        if not self.resolved:
+            self._breaker._record(ok, self.trial)
+            self._resolve()
+
+    def release(self):
+        if not self.resolved:
+            if self.trial:
+                self._breaker._trial_running = False
+            self._resolve()
+
+
+class CircuitBreaker:
+    """
+    closed    -> `failure_threshold` failures within the last `window` calls
+                 (and at least `min_calls` calls) open the breaker
+    open      -> every call is refused until `reset_timeout` has passed
+    half_open -> one trial call; success closes, failure reopens (with the
+                 timeout doubled, up to `max_reset_timeout`)
+
+    Outcomes arrive through the Admission returned by check(); only the
+    trial's admission can end the half-open state.
+    """
+
+    def __init__(self, failure_threshold: int = 5, window: int = 20, min_calls: int = 5,
+                 reset_timeout: float = 30.0, max_reset_timeout: float = 300.0):
+        self.failure_threshold = failure_threshold
+        self.min_calls = min_calls
+        self.base_reset_timeout = reset_timeout
+        self.reset_timeout = reset_timeout
+        self.max_reset_timeout = max_reset_timeout
+        self._outcomes: Deque[bool] = deque(maxlen=window)
+        self.state = "closed"
+        self.opened_at = 0.0
+        self._trial_running = False
+        self.opens = 0
+
+    @property
+    def is_open(self) -> bool:
+        """True while calls would be refused (open and not yet due for a trial)."""
+        return self.state == "open" and time.monotonic() - self.opened_at < self.reset_timeout
+
+    def retry_after(self) -> float:
+        return max(0.0, self.reset_timeout - (time.monotonic() - self.opened_at))
+
+    def check(self) -> Admission:
+        """Admit one call, or raise CircuitOpen if it must not go upstream."""
+        if self.state == "closed":
+            return Admission(self, trial=False)
+        if self.state == "open":
+            if self.is_open:
+                raise CircuitOpen("Portal circuit breaker is open", self.retry_after())
+            self.state = "half_open"
+        if self._trial_running:
+            raise CircuitOpen("Portal circuit breaker is testing the upstream", self.reset_timeout / 4)
+        self._trial_running = True
+        return Admission(self, trial=True)
+
+    def _open(self):
+        self.state = "open"
+        self.opened_at = time.monotonic()
+        self.opens += 1
+
+    def _record(self, ok: bool, trial: bool):
+        if trial:
+            self._trial_running = False
+            if ok:
+                self.state = "closed"
+                self.reset_timeout = self.base_reset_timeout
+                self._outcomes.clear()
+            else:
+                self.reset_timeout = min(self.max_reset_timeout, self.reset_timeout * 2)
+                self._open()
+            return
+        if self.state != "closed":
+            return  # Admitted before the breaker opened; the trial decides now
+        self._outcomes.append(ok)
+        failures = self._outcomes.count(False)
+        if len(self._outcomes) >= self.min_calls and failures >= self.failure_threshold:
+            self._open()
+
+    def stats(self) -> dict:
+        return {
+            "state": "half_open" if self.state == "open" and not self.is_open else self.state,
+            "recent_failures": self._outcomes.count(False),
+            "recent_calls": len(self._outcomes),
+            "reset_timeout_seconds": self.reset_timeout,
+            "retry_after_seconds": round(self.retry_after(), 1) if self.state == "open" else 0.0,
+            "opens": self.opens,
+        }
@@ -0,0 +1,167 @@
+"""
+Request Filter
+Context-wide route handler that aborts requests the login and ItemDetailv3
+flows don't need (images, fonts, stylesheets and, if asked to, third-party
+hosts) and keeps per-navigation counts of what was blocked.
+"""
+import logging
+from collections import deque
+from typing import Dict, Iterable, Optional
+from urllib.parse import urlsplit
+
+from playwright.async_api import BrowserContext, Route, Request
+
+import metrics
+
+
+logger = logging.getLogger(__name__)
+
+# Rough transfer sizes used to estimate what a blocked request would have cost;
+# aborted requests are never downloaded, so the real size is unknown
+ESTIMATED_BYTES = {
+    "image": 30_000,
+    "media": 250_000,
+    "font": 40_000,
+    "stylesheet": 25_000,
+    "script": 60_000,
+    "xhr": 5_000,
+    "fetch": 5_000,
+    "websocket": 0,
+    "manifest": 2_000,
+    "other": 5_000,
+}
+
+
+def _host_matches(host: str, patterns: Iterable[str]) -> bool:
+    """True if `host` equals or is a subdomain of any pattern."""
+    return any(host == p or host.endswith("." + p) for p in patterns)
+
+
+class NavigationStats:
+    """Allowed/blocked counts between one main-frame navigation and the next."""
+
+    __slots__ = ("url", "allowed", "blocked", "bytes_saved")
+
+    def __init__(self, url: str):
+        self.url = url
+        self.allowed = 0
+        self.blocked = 0
+        self.bytes_saved = 0
+
+    def to_dict(self) -> dict:
+        return {
+            "url": self.url,
+            "allowed": self.allowed,
+            "blocked": self.blocked,
+            "estimated_bytes_saved": self.bytes_saved,
+        }
+
+
+class RequestFilter:
+    """
+    Decision order for each request:
+      1. host on the deny list                -> abort
+      2. documents, xhr/fetch to allowed host -> continue
+      3. resource type on the deny list       -> abort
+      4. host not on the allow list           -> abort (third party,
+                                                 only with block_third_party)
+      5. otherwise                            -> continue
+
+    An empty allow list disables the third-party rule.
+    """
+
+    def __init__(self, allowed_hosts: Iterable[str] = (), blocked_hosts: Iterable[str] = (),
+                 blocked_types: Iterable[str] = ("image", "media", "font", "stylesheet"),
+                 block_third_party: bool = False, history: int = 50):
+        self.allowed_hosts = tuple(h.strip().lower() for h in allowed_hosts if h.strip())
+        self.blocked_hosts = tuple(h.strip().lower() for h in blocked_hosts if h.strip())
+        self.blocked_types = frozenset(t.strip().lower() for t in blocked_types if t.strip())
+        self.block_third_party = block_third_party
+        self.allowed = 0
+        self.blocked = 0
+        self.bytes_saved = 0
+        self.blocked_by_type: Dict[str, int] = {}
+        self._current: Dict[int, NavigationStats] = {}  # id(page) -> open window
+        self.navigations: deque = deque(maxlen=history)
+
+    async def install(self, context: BrowserContext):
+        await context.route("**/*", self._handle)
+        logger.info(
+            "🛡️ Request filter on (blocked types=%s, allowed hosts=%s, blocked hosts=%s)",
+            ",".join(sorted(self.blocked_types)) or "-",
+            ",".join(self.allowed_hosts) if self.block_third_party and self.allowed_hosts else "*",
+            ",".join(self.blocked_hosts) or "-",
+        )
+
+    def should_block(self, resource_type: str, url: str) -> bool:
+        host = (urlsplit(url).hostname or "").lower()
+        if not host:
+            return False  # data:, blob: and friends never hit the network
+        if self.blocked_hosts and _host_matches(host, self.blocked_hosts):
+            return True
+        first_party = not self.allowed_hosts or _host_matches(host, self.allowed_hosts)
+        if resource_type in ("document", "xhr", "fetch") and first_party:
+            return False
+        if resource_type in self.blocked_types:
+            return True
+        return self.block_third_party and not first_party
+
+    def _window(self, request: Request) -> Optional[NavigationStats]:
+        try:
+            frame = request.frame
+            page = frame.page
+        except Exception:
+            return None  # Service worker or detached frame
+        key = id(page)
+        if request.is_navigation_request() and frame.parent_frame is None:
+            if key in self._current:
+                self._close_window(key)
+            else:
+                # First navigation of this page: forget it once it closes, as ids get reused
+                page.once("close", lambda _: self._close_window(key))
+            self._current[key] = NavigationStats(request.url)
+        return self._current.get(key)
+
+    def _close_window(self, key: int):
+        window = self._current.pop(key, None)
+        if window is not None:
+            self.navigations.append(window)
+            logger.debug("🛡️ %s: %d allowed, %d blocked (~%d KB saved, estimated)",
+                         window.url, window.allowed, window.blocked, window.bytes_saved // 1024)
+
+    async def _handle(self, route: Route, request: Request):
+        resource_type = request.resource_type
+        window = self._window(request)
+        if self.should_block(resource_type, request.url):
+            estimate = ESTIMATED_BYTES.get(resource_type, ESTIMATED_BYTES["other"])
+            self.blocked += 1
+            self.bytes_saved += estimate
+            self.blocked_by_type[resource_type] = self.blocked_by_type.get(resource_type, 0) + 1
+            metrics.BLOCKED_REQUESTS.inc(resource_type)
+            metrics.BLOCKED_BYTES.inc(amount=estimate)
+            if window is not None:
+                window.blocked += 1
+                window.bytes_saved += estimate
+            try:
+                await route.abort("blockedbyclient")
+            except Exception:
+                pass  # Page closed while the request was pending
+            return
+        self.allowed += 1
+        if window is not None:
+            window.allowed += 1
+        try:
+            await route.continue_()
+        except Exception:
+            pass
+
+    def stats(self) -> dict:
+        return {
+            "allowed": self.allowed,
+            "blocked": self.blocked,
+            "estimated_bytes_saved": self.bytes_saved,
+            "bytes_saved_basis": "estimate: a fixed size per blocked resource type, not measured",
+            "blocked_by_type": dict(self.blocked_by_type),
+            "navigations": [w.to_dict() for w in reversed(self.navigations)],
+            "open_navigations": [w.to_dict() for w in self._current.values()],
+        }
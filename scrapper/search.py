@@ -0,0 +1,322 @@
+"""
+Product Search
+Trigram-backed name search over the product catalog, e.g. "acyl krem",
+"ACNELYSE 20" or "çinko oksit 20 gr".
+
+Names and queries go through the same normalization: Turkish letters fold
+to their ASCII base (İ/ı -> i, ş -> s, ğ -> g, ç -> c, ö -> o, ü -> u),
+strengths and package sizes join their unit ("20 GR", "20gr" and "20 gram"
+all become "20gr"; "30 TABLET" becomes "30tb") and common dosage form
+spellings collapse to the archive's abbreviations.
+
+Each query token matches vocabulary tokens exactly or by prefix. A token
+of four or more letters that the archive does not contain as typed also
+matches by trigram similarity, which absorbs a typo or two. A product
+scores the sum of its best match per query token.
+
+The index is kept in memory and synced in place from a rebuilt Catalog:
+only products whose name changed are re-tokenized.
+
+Usage:
+    python search.py query "acyl krem" [--csv ilac_arsivi.csv] [--limit 10]
+    python search.py bench [--csv ...] [--rounds 20]
+"""
+import os
+import re
+import sys
+import time
+import heapq
+import bisect
+from collections import Counter
+from typing import Dict, List, NamedTuple, Optional, Set, Tuple
+
+
+TURKISH_FOLD = str.maketrans({
+    "İ": "i", "I": "i", "ı": "i", "Ş": "s", "ş": "s", "Ğ": "g", "ğ": "g",
+    "Ç": "c", "ç": "c", "Ö": "o", "ö": "o", "Ü": "u", "ü": "u",
+    "Â": "a", "â": "a", "Î": "i", "î": "i", "Û": "u", "û": "u",
+})
+TOKEN_RE = re.compile(r"%?\d+(?:[.,]\d+)?|[a-z]+")
+
+# Units and package forms a number is joined with, in their archive spelling
+UNITS = {
+    "mg": "mg", "g": "gr", "gr": "gr", "gram": "gr", "kg": "kg",
+    "mcg": "mcg", "mikrogram": "mcg", "ml": "ml", "l": "lt", "lt": "lt", "litre": "lt",
+    "iu": "iu", "ui": "iu", "cm": "cm", "mm": "mm",
+    "tb": "tb", "tab": "tb", "tablet": "tb", "kap": "kap", "kapsul": "kap",
+    "amp": "amp", "ampul": "amp", "flk": "flk", "flakon": "flk", "sase": "sase", "li": "li",
+}
+# Form words outside a strength, collapsed the same way
+FORMS = {"tablet": "tb", "tab": "tb", "kapsul": "kap", "ampul": "amp", "flakon": "flk"}
+
+FUZZY_MIN_LENGTH = 4
+FUZZY_MIN_SIMILARITY = 0.3
+MAX_QUERY_TOKENS = 8
+# Vocabulary tokens one query token may expand to (prefix and fuzzy each)
+MAX_EXPANSIONS = 32
+
+
+def fold(text: str) -> str:
+    return text.translate(TURKISH_FOLD).lower()
+
+
+def tokenize(text: str) -> List[str]:
+    """Normalized search tokens of a product name or query."""
+    raw = TOKEN_RE.findall(fold(text))
+    tokens: List[str] = []
+    position = 0
+    while position < len(raw):
+        token = raw[position].replace(",", ".")
+        if token[-1].isdigit():
+            unit = UNITS.get(raw[position + 1]) if position + 1 < len(raw) else None
+            if unit:
+                token += unit
+                position += 1
+        else:
+            token = FORMS.get(token, token)
+        tokens.append(token)
+        position += 1
+    return tokens
+
+
+def trigrams(token: str) -> Set[str]:
+    padded = f" {token} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class SearchHit(NamedTuple):
+    api_id: int
+    name: str
+    score: float
+
+
+class SearchIndex:
+    """
+    token   -> documents containing it (inverted index)
+    trigram -> vocabulary tokens containing it (for typo tolerance)
+
+    Documents are keyed by API_ID; their slots are reused after deletes.
+    """
+
+    def __init__(self):
+        self._docs: List[Optional[Tuple[int, str, Tuple[str, ...]]]] = []
+        self._free: List[int] = []
+        self._by_api_id: Dict[int, int] = {}
+        self._postings: Dict[str, Set[int]] = {}
+        self._grams: Dict[str, Set[str]] = {}
+        self._gram_counts: Dict[str, int] = {}
+        self._vocabulary: List[str] = []
+        self._vocabulary_dirty = False
+        self.syncs = 0
+        self.queries = 0
+
+    def __len__(self) -> int:
+        return len(self._by_api_id)
+
+    # ------------------------------------------------------------------
+    # Maintenance
+    # ------------------------------------------------------------------
+    def _add_token(self, token: str, doc: int):
+        docs = self._postings.get(token)
+        if docs is None:
+            docs = self._postings[token] = set()
+            grams = trigrams(token)
+            self._gram_counts[token] = len(grams)
+            for gram in grams:
+                self._grams.setdefault(gram, set()).add(token)
+            self._vocabulary_dirty = True
+        docs.add(doc)
+
+    def _remove_token(self, token: str, doc: int):
+        docs = self._postings[token]
+        docs.discard(doc)
+        if not docs:
+            del self._postings[token]
+            del self._gram_counts[token]
+            for gram in trigrams(token):
+                tokens = self._grams[gram]
+                tokens.discard(token)
+                if not tokens:
+                    del self._grams[gram]
+            self._vocabulary_dirty = True
+
+    def add(self, api_id: int, name: str):
+        if api_id in self._by_api_id:
+            self.remove(api_id)
+        tokens = tuple(dict.fromkeys(tokenize(name)))
+        doc = self._free.pop() if self._free else len(self._docs)
+        if doc == len(self._docs):
+            self._docs.append(None)
+        self._docs[doc] = (api_id, name, tokens)
+        self._by_api_id[api_id] = doc
+        for token in tokens:
+            self._add_token(token, doc)
+
+    def remove(self, api_id: int):
+        doc = self._by_api_id.pop(api_id)
+        for token in self._docs[doc][2]:
+            self._remove_token(token, doc)
+        self._docs[doc] = None
+        self._free.append(doc)
+
+    def sync(self, catalog) -> Dict[str, int]:
+        """Bring the index in line with `catalog`, touching only what changed."""
+        names: Dict[int, str] = {}
+        for row in range(len(catalog)):
+            names.setdefault(catalog.api_id(row), catalog.name(row))
+        removed = [api_id for api_id in self._by_api_id if api_id not in names]
+        for api_id in removed:
+            self.remove(api_id)
+        added = changed = 0
+        for api_id, name in names.items():
+            doc = self._by_api_id.get(api_id)
+            if doc is None:
+                added += 1
+            elif self._docs[doc][1] != name:
+                changed += 1
+            else:
+                continue
+            self.add(api_id, name)
+        self._sorted_vocabulary()
+        self.syncs += 1
+        return {"added": added, "changed": changed, "removed": len(removed)}
+
+    @classmethod
+    def from_catalog(cls, catalog) -> "SearchIndex":
+        index = cls()
+        index.sync(catalog)
+        return index
+
+    # ------------------------------------------------------------------
+    # Query
+    # ------------------------------------------------------------------
+    def _sorted_vocabulary(self) -> List[str]:
+        if self._vocabulary_dirty:
+            self._vocabulary = sorted(self._postings)
+            self._vocabulary_dirty = False
+        return self._vocabulary
+
+    def _prefixed(self, prefix: str) -> List[str]:
+        vocabulary = self._sorted_vocabulary()
+        start = bisect.bisect_left(vocabulary, prefix)
+        end = bisect.bisect_left(vocabulary, prefix + "\uffff", start)
+        return vocabulary[start:end]
+
+    def _matches(self, token: str) -> List[Tuple[str, float]]:
+        """Vocabulary tokens `token` may stand for, best first, similarity in (0, 1]."""
+        matches: Dict[str, float] = {}
+        numeric = token[-1].isdigit()
+        prefixed = self._prefixed(token)
+        if len(prefixed) > MAX_EXPANSIONS:
+            prefixed = heapq.nsmallest(MAX_EXPANSIONS, prefixed, key=len)
+        for candidate in prefixed:
+            if candidate == token:
+                matches[candidate] = 1.0
+            elif numeric:
+                # "20" matches "20gr" and "20tb", not "200mg"
+                if not candidate[len(token)].isdigit() and candidate[len(token)] != ".":
+                    matches[candidate] = 0.9
+            else:
+                matches[candidate] = 0.6 + 0.3 * len(token) / len(candidate)
+        # Typo tolerance only for words the archive does not contain as typed
+        if token not in matches and not numeric and len(token) >= FUZZY_MIN_LENGTH:
+            grams = trigrams(token)
+            shared = Counter()
+            for gram in grams:
+                shared.update(self._grams.get(gram, ()))
+            fuzzy = []
+            for candidate, common in shared.items():
+                similarity = common / (len(grams) + self._gram_counts[candidate] - common)
+                if similarity >= FUZZY_MIN_SIMILARITY:
+                    fuzzy.append((similarity * 0.9, candidate))
+            for similarity, candidate in heapq.nlargest(MAX_EXPANSIONS, fuzzy):
+                if similarity > matches.get(candidate, 0.0):
+                    matches[candidate] = similarity
+        return sorted(matches.items(), key=lambda match: -match[1])
+
+    def search(self, query: str, limit: int = 10) -> List[SearchHit]:
+        """Top `limit` products for `query`, best first (shorter names win ties)."""
+        self.queries += 1
+        tokens = list(dict.fromkeys(tokenize(query)))[:MAX_QUERY_TOKENS]
+        scores: Dict[int, float] = {}
+        for token in tokens:
+            # A product counts once per query token, at its best match
+            seen: Set[int] = set()
+            for candidate, similarity in self._matches(token):
+                docs = self._postings[candidate] - seen
+                seen |= docs
+                for doc in docs:
+                    scores[doc] = scores.get(doc, 0.0) + similarity
+        if not scores or limit <= 0:
+            return []
+        # Cut at the k-th best score first so only the ties there need the full key
+        cutoff = heapq.nlargest(limit, scores.values())[-1]
+        docs = self._docs
+        top = sorted(((doc, score) for doc, score in scores.items() if score >= cutoff),
+                     key=lambda item: (-item[1], len(docs[item[0]][1]), docs[item[0]][0]))[:limit]
+        return [SearchHit(docs[doc][0], docs[doc][1], round(score, 3)) for doc, score in top]
+
+    def stats(self) -> dict:
+        return {
+            "products": len(self),
+            "tokens": len(self._postings),
+            "trigrams": len(self._grams),
+            "syncs": self.syncs,
+            "queries": self.queries,
+        }
+
+
+def main():
+    import argparse
+
+    from catalog import load_catalog
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=("query", "bench"))
+    parser.add_argument("query", nargs="?")
+    parser.add_argument("--csv", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "ilac_arsivi.csv"))
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--rounds", type=int, default=20, help="bench: passes over the sample queries")
+    args = parser.parse_args()
+
+    catalog = load_catalog(args.csv)
+    started = time.perf_counter()
+    index = SearchIndex.from_catalog(catalog)
+    print(f"🔎 {len(index)} products, {index.stats()['tokens']} tokens indexed in "
+          f"{(time.perf_counter() - started) * 1000:.0f} ms")
+
+    if args.command == "query":
+        if not args.query:
+            parser.error("query needs a search string")
+        started = time.perf_counter()
+        hits = index.search(args.query, args.limit)
+        elapsed = time.perf_counter() - started
+        for hit in hits:
+            print(f"  {hit.score:>6.3f}  {hit.api_id:>7}  {hit.name}")
+        print(f"⏱️ {elapsed * 1000:.3f} ms")
+        return 0 if hits else 1
+
+    # Bench: product names cut down to partial, lower-case and misspelt queries
+    names = [catalog.name(row) for row in range(0, len(catalog), max(1, len(catalog) // 300))]
+    queries = []
+    for name in names:
+        words = name.split()
+        queries.append(" ".join(words[:2]).lower())
+        queries.append(words[0][:5])
+        if len(words[0]) > 5:
+            queries.append(words[0][:3] + words[0][4:] + " " + " ".join(words[1:3]))
+    latencies = []
+    for _ in range(args.rounds):
+        for query in queries:
+            started = time.perf_counter()
+            index.search(query, args.limit)
+            latencies.append(time.perf_counter() - started)
+    latencies.sort()
+    print(f"📊 {len(latencies)} queries ({len(queries)} distinct)")
+    for label, pct in (("p50", 0.50), ("p95", 0.95), ("p99", 0.99), ("max", 1.0)):
+        print(f"  {label:<4} {latencies[min(len(latencies) - 1, int(len(latencies) * pct))] * 1000:>8.3f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
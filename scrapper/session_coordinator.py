@@ -0,0 +1,194 @@
+"""
+Session Coordinator
+Lets several scrapper processes (uvicorn --workers, or replicas sharing the
+data volume) use one portal session: an flock() on a shared lock file
+elects a single leader that owns the login form, and everyone else picks
+up the leader's storage_state file instead of logging in themselves.
+"""
+import os
+import json
+import time
+import fcntl
+import asyncio
+import logging
+from typing import Callable, List, Optional
+
+
+logger = logging.getLogger(__name__)
+
+
+class SessionCoordinator:
+    """
+    leader   -> holds the lock for the life of the process, logs in and
+                writes storage_state; a follower's refresh request makes it
+                probe the session and either log in again or re-save the
+                state file
+    follower -> never opens the login form; adopts the state file whenever
+                its mtime changes, and on rejection files a refresh request
+                and waits for the next version. Every `interval` seconds it
+                also tries the lock, so it takes over when the leader dies.
+
+    The state file's mtime (ns) is its version. The lock is released by the
+    kernel when the leader exits, however it exits.
+    """
+
+    def __init__(self, manager, lock_path: str, state_path: str, interval: float = 2.0,
+                 wait_timeout: float = 90.0):
+        self.manager = manager
+        self.lock_path = lock_path
+        self.state_path = state_path
+        self.refresh_path = state_path + ".refresh"
+        self.interval = interval
+        self.wait_timeout = wait_timeout
+        self.is_leader = False
+        self.on_promoted: List[Callable[[], None]] = []
+        self.promotions = 0
+        self.adoptions = 0
+        self.refresh_requests = 0
+        self.refreshes_served = 0
+        self._lock_fd: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+
+    # ------------------------------------------------------------------
+    # Leadership
+    # ------------------------------------------------------------------
+    def try_acquire(self) -> bool:
+        """Take the leader lock if it is free; True if this process leads."""
+        if self.is_leader:
+            return True
+        try:
+            os.makedirs(os.path.dirname(self.lock_path) or ".", exist_ok=True)
+            fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o600)
+        except OSError as e:
+            # No shared directory means nobody to share with - run standalone
+            logger.warning("⚠️ Cannot open session lock %s (%s), running as leader", self.lock_path, e)
+            self.is_leader = True
+            return True
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return False
+        os.ftruncate(fd, 0)
+        os.write(fd, str(os.getpid()).encode())
+        self._lock_fd = fd
+        self.is_leader = True
+        logger.info("👑 Session leader (pid %d)", os.getpid())
+        return True
+
+    def release(self):
+        if self._lock_fd is not None:
+            fcntl.flock(self._lock_fd, fcntl.LOCK_UN)
+            os.close(self._lock_fd)
+            self._lock_fd = None
+        self.is_leader = False
+
+    def leader_pid(self) -> Optional[int]:
+        try:
+            with open(self.lock_path, encoding="utf-8") as f:
+                return int(f.read().strip() or 0) or None
+        except (OSError, ValueError):
+            return None
+
+    # ------------------------------------------------------------------
+    # Shared state
+    # ------------------------------------------------------------------
+    def state_version(self) -> Optional[int]:
+        try:
+            return os.stat(self.state_path).st_mtime_ns
+        except OSError:
+            return None
+
+    def request_refresh(self, version: Optional[int]):
+        """Follower: tell the leader that state `version` was rejected."""
+        self.refresh_requests += 1
+        try:
+            tmp_path = f"{self.refresh_path}.{os.getpid()}"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"version": version, "pid": os.getpid(), "at": time.time()}, f)
+            os.replace(tmp_path, self.refresh_path)
+        except OSError as e:
+            logger.warning("⚠️ Failed to request a session refresh: %s", e)
+
+    def take_refresh_request(self) -> Optional[dict]:
+        """Leader: pop the pending refresh request, if any."""
+        try:
+            with open(self.refresh_path, encoding="utf-8") as f:
+                request = json.load(f)
+            os.unlink(self.refresh_path)
+            return request
+        except (OSError, ValueError):
+            return None
+
+    async def wait_for_new_state(self, version: Optional[int]) -> bool:
+        """Wait until the state file moves past `version` (or we become leader)."""
+        deadline = time.monotonic() + self.wait_timeout
+        while time.monotonic() < deadline:
+            current = self.state_version()
+            if current is not None and current != version:
+                return True
+            if self.is_leader:
+                return False
+            await asyncio.sleep(0.25)
+        return False
+
+    # ------------------------------------------------------------------
+    # Loop
+    # ------------------------------------------------------------------
+    async def _tick(self):
+        manager = self.manager
+        if self.is_leader:
+            request = self.take_refresh_request()
+            if request is not None and request.get("version") == manager.shared_version:
+                self.refreshes_served += 1
+                logger.info("🔁 Follower pid %s reported the session rejected", request.get("pid"))
+                await manager.refresh_shared_session()
+            return
+        if self.try_acquire():
+            self.promotions += 1
+            logger.warning("👑 Previous session leader is gone, taking over")
+            await manager.promote()
+            for callback in self.on_promoted:
+                callback()
+            return
+        version = self.state_version()
+        if version is not None and version != manager.shared_version and not manager.login_running:
+            if await manager.adopt_shared_session():
+                self.adoptions += 1
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self._tick()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error("❌ Session coordination error: %s", e)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self.release()
+
+    def stats(self) -> dict:
+        version = self.state_version()
+        return {
+            "role": "leader" if self.is_leader else "follower",
+            "pid": os.getpid(),
+            "leader_pid": self.leader_pid(),
+            "state_age_seconds": round(time.time() - version / 1e9, 1) if version else None,
+            "promotions": self.promotions,
+            "adoptions": self.adoptions,
+            "refresh_requests": self.refresh_requests,
+            "refreshes_served": self.refreshes_served,
+        }
@@ -0,0 +1,158 @@
+"""
+Session Keeper
+Background task that probes the portal session, records how long sessions
+actually live and logs in again before the predicted expiry, so user
+requests don't pay for a full login.
+"""
+import time
+import asyncio
+import logging
+import statistics
+from collections import deque
+from typing import Optional
+from urllib.parse import urlsplit
+
+from http_fetcher import LOGIN_PAGE_MARKERS
+import metrics
+
+
+logger = logging.getLogger(__name__)
+
+
+class SessionKeeper:
+    """
+    Every `interval` seconds:
+      - not logged in          -> log in
+      - age past the predicted -> log in again proactively, once the
+        lifetime * refresh_fraction   manager has drained in-flight calls
+      - otherwise              -> cheap GET /Home/MainPage probe through the
+                                  context's request API (shares its cookies,
+                                  no page involved); a login redirect marks
+                                  the session expired and triggers a login
+
+    Requests arriving during a re-login queue on the session manager's login
+    lock and reuse its result, so only one login runs at a time.
+    """
+
+    def __init__(self, manager, base_url: str, interval: float = 60.0, refresh_fraction: float = 0.8,
+                 default_max_age: float = 0.0, history: int = 20):
+        self.manager = manager
+        self.base_url = base_url.rstrip('/')
+        self.interval = interval
+        self.refresh_fraction = refresh_fraction
+        self.default_max_age = default_max_age
+        self.lifetimes: deque = deque(maxlen=history)
+        self.probes = 0
+        self.probe_failures = 0
+        self.proactive_logins = 0
+        self.last_probe_at: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+
+    # ------------------------------------------------------------------
+    # Lifetime tracking
+    # ------------------------------------------------------------------
+    def record_expiry(self, age: Optional[float]):
+        """Called whenever a session is found expired; `age` is how long it lived."""
+        if age and age > 0:
+            self.lifetimes.append(age)
+            logger.info("⏱️ Session expired after %.0fs (observed %d lifetimes)", age, len(self.lifetimes))
+
+    def predicted_lifetime(self) -> Optional[float]:
+        """Conservative estimate: the lower quartile of observed lifetimes."""
+        if len(self.lifetimes) >= 4:
+            return statistics.quantiles(self.lifetimes, n=4)[0]
+        if self.lifetimes:
+            return min(self.lifetimes)
+        return self.default_max_age or None
+
+    def refresh_due(self) -> bool:
+        age = self.manager.session_age
+        predicted = self.predicted_lifetime()
+        return age is not None and predicted is not None and age >= predicted * self.refresh_fraction
+
+    # ------------------------------------------------------------------
+    # Probe
+    # ------------------------------------------------------------------
+    async def probe(self) -> bool:
+        """True if the portal still accepts the current session cookies."""
+        context = self.manager.context
+        if context is None:
+            return False
+        self.probes += 1
+        self.last_probe_at = time.time()
+        try:
+            response = await context.request.get(
+                f"{self.base_url}/Home/MainPage", max_redirects=0, timeout=15000
+            )
+            if 300 <= response.status < 400:
+                # Same rule as HttpBaremFetcher: a redirect to / or a Login URL means we are out
+                location = response.headers.get("location", "")
+                valid = urlsplit(location).path.rstrip('/') != "" and "Login" not in location
+            elif response.status == 200:
+                body = await response.text()
+                valid = not any(marker in body for marker in LOGIN_PAGE_MARKERS)
+            else:
+                valid = False
+        except Exception as e:
+            logger.warning("⚠️ Session probe failed: %s", e)
+            valid = False
+        metrics.SESSION_PROBES.inc("valid" if valid else "expired")
+        if not valid:
+            self.probe_failures += 1
+        return valid
+
+    # ------------------------------------------------------------------
+    # Loop
+    # ------------------------------------------------------------------
+    async def _tick(self):
+        manager = self.manager
+        if not manager.logged_in:
+            await manager.login()
+            return
+        if self.refresh_due():
+            self.proactive_logins += 1
+            logger.info("🔁 Session is %.0fs old (predicted lifetime %.0fs) - logging in again proactively",
+                        manager.session_age, self.predicted_lifetime())
+            await manager.renew_session()
+            return
+        if not await self.probe():
+            manager._session_rejected()
+            logger.info("🔄 Probe found the session expired, re-logging in...")
+            await manager.login()
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self._tick()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error("❌ Session keepalive error: %s", e)
+
+    def start(self):
+        if self._task is None and self.interval > 0:
+            self._task = asyncio.create_task(self._run())
+            logger.info("💓 Session keepalive every %.0fs", self.interval)
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> dict:
+        predicted = self.predicted_lifetime()
+        return {
+            "session_age_seconds": self.manager.session_age,
+            "predicted_lifetime_seconds": predicted,
+            "refresh_at_age_seconds": predicted * self.refresh_fraction if predicted else None,
+            "observed_lifetimes_seconds": [round(x, 1) for x in self.lifetimes],
+            "probes": self.probes,
+            "probe_failures": self.probe_failures,
+            "proactive_logins": self.proactive_logins,
+            "last_probe_at": self.last_probe_at,
+        }
@@ -0,0 +1,23 @@
+"""
+Test setup: main.py reads its configuration at import time, so point every
+on-disk path at a scratch directory and keep the background crawler off
+before any test imports it.
+"""
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_scratch = tempfile.mkdtemp(prefix="scrapper-tests-")
+for name, value in {
+    "SCRAPPER_CRAWLER": "off",
+    "SCRAPPER_FETCH_MODE": "http",
+    "SCRAPPER_STORE_PATH": os.path.join(_scratch, "barems.sqlite"),
+    "SCRAPPER_SESSION_LOCK_PATH": os.path.join(_scratch, "session.lock"),
+    "SCRAPPER_SESSION_STATE_PATH": os.path.join(_scratch, "storage_state.json"),
+    "SCRAPPER_CATALOG_SNAPSHOT": os.path.join(_scratch, "catalog.snapshot"),
+    "SCRAPPER_MUADIL_SNAPSHOT": os.path.join(_scratch, "muadil.snapshot"),
+    "SCRAPPER_CRAWLER_CHECKPOINT": os.path.join(_scratch, "crawler_checkpoint.json"),
+}.items():
+    os.environ[name] = value
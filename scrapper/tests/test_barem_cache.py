@@ -0,0 +1,74 @@
+"""BaremCache stale-while-revalidate refreshes."""
+import asyncio
+
+import deadline
+from barem_cache import BaremCache
+from ratelimit import BACKGROUND, INTERACTIVE, current_lane
+
+
+def test_background_refresh_runs_without_the_request_deadline():
+    cache = BaremCache(soft_ttl=0.0, hard_ttl=60.0)
+    seen = []
+
+    async def loader():
+        seen.append((deadline.remaining(), current_lane()))
+        return len(seen)
+
+    async def scenario():
+        assert await cache.get(1, loader) == 1
+        with deadline.scope(5.0):
+            assert await cache.get(1, loader) == 1  # Stale hit, refresh starts
+        await asyncio.gather(*cache._refreshing)
+        return cache._lookup(1).value
+
+    assert asyncio.run(scenario()) == 2
+    assert seen == [(None, INTERACTIVE), (None, BACKGROUND)]
+
+
+def test_shared_load_ignores_the_first_callers_deadline():
+    cache = BaremCache()
+    seen = []
+
+    async def loader():
+        seen.append(deadline.remaining())
+        await asyncio.sleep(0.2)
+        return "fresh"
+
+    async def impatient():
+        with deadline.scope(0.05):
+            return await cache.get(1, loader)
+
+    async def scenario():
+        first = asyncio.create_task(impatient())
+        await asyncio.sleep(0)
+        second = asyncio.create_task(cache.get(1, loader))
+        return await asyncio.gather(first, second, return_exceptions=True)
+
+    first, second = asyncio.run(scenario())
+    assert isinstance(first, deadline.DeadlineExceeded)
+    assert second == "fresh"
+    assert seen == [None]
+    assert cache.abandoned == 0
+
+
+def test_load_abandoned_when_the_last_caller_times_out():
+    cache = BaremCache()
+    finished = []
+
+    async def loader():
+        await asyncio.sleep(0.2)
+        finished.append(True)
+        return "fresh"
+
+    async def scenario():
+        with deadline.scope(0.05):
+            try:
+                await cache.get(1, loader)
+            except deadline.DeadlineExceeded:
+                pass
+        await asyncio.sleep(0.3)
+
+    asyncio.run(scenario())
+    assert finished == []
+    assert cache.abandoned == 1
+    assert not cache.contains(1)
@@ -0,0 +1,73 @@
+"""BaremStore: content-hash versioning, change records and compaction."""
+import pytest
+
+from barem_store import BaremStore, content_hash
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = BaremStore(str(tmp_path / "barems.sqlite"))
+    yield store
+    store.close()
+
+
+def payload(item_id, *vades, fetched_at="2026-01-01T00:00:00"):
+    return {"success": True, "item_id": item_id, "name": "PAROL 500 MG 20 TB",
+            "barems": [{"Vade": vade, "MinimumAdet": 1} for vade in vades], "fetched_at": fetched_at}
+
+
+def test_content_hash_ignores_fetch_time():
+    assert content_hash(payload(1, 30, fetched_at="a")) == content_hash(payload(1, 30, fetched_at="b"))
+    assert content_hash(payload(1, 30)) != content_hash(payload(1, 60))
+
+
+def test_first_save_is_version_one_without_a_change(store):
+    assert store.save(payload(1, 30)) is None
+    latest = store.get_latest(1)
+    assert latest.version == 1
+    assert latest.payload["barems"] == [{"Vade": 30, "MinimumAdet": 1}]
+    assert store.changes_since(0) == ([], 0)
+
+
+def test_refetching_unchanged_content_only_touches_the_latest_row(store):
+    store.save(payload(1, 30))
+    before = store.get_latest(1)
+    assert store.save(payload(1, 30, fetched_at="2026-01-02T00:00:00")) is None
+
+    latest = store.get_latest(1)
+    assert latest.version == 1
+    assert latest.fetched_at == "2026-01-02T00:00:00"
+    assert latest.fetched_ts >= before.fetched_ts
+    assert store.stats()["versions"] == 1
+
+
+def test_changed_barems_write_a_version_and_a_change(store):
+    store.save(payload(1, 30, 60))
+    change = store.save(payload(1, 30, 90))
+
+    assert change["seq"] == 1 and change["item_id"] == 1 and change["version"] == 2
+    assert change["added"] == [{"Vade": 90, "MinimumAdet": 1}]
+    assert change["removed"] == [{"Vade": 60, "MinimumAdet": 1}]
+    assert change["changed"] == []
+    assert [row.version for row in store.history(1)] == [2, 1]
+    assert store.changes_since(0) == ([change], 1)
+
+
+def test_compact_keeps_the_newest_versions(store):
+    for vade in range(30, 80, 10):
+        store.save(payload(1, vade))
+    store.save(payload(2, 30))
+
+    assert store.compact(keep_versions=2) == 3
+    assert [row.version for row in store.history(1)] == [5, 4]
+    assert [row.version for row in store.history(2)] == [1]
+    assert store.stats()["changes"] == 4  # Change records have their own retention
+
+
+def test_compact_expires_old_change_records(store):
+    store.save(payload(1, 30))
+    store.save(payload(1, 60))
+
+    assert store.compact(keep_changes_seconds=3600) == 0
+    assert store.compact(keep_changes_seconds=-1) == 1
+    assert store.changes_since(0) == ([], 0)
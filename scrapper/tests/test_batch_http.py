@@ -0,0 +1,95 @@
+"""HTTP fast-path batch: /get-barem/batch in the default SCRAPPER_FETCH_MODE=http."""
+import asyncio
+
+import pytest
+
+import main
+
+
+def run_batch(manager, item_ids):
+    async def collect():
+        try:
+            return [result async for result in manager.fetch_barem_batch(item_ids)]
+        finally:
+            await manager.http.close()
+            manager.parser.close()
+    return asyncio.run(collect())
+
+
+@pytest.fixture
+def manager():
+    manager = main.SessionManager()
+
+    async def logged_in():
+        return True
+
+    manager.ensure_logged_in = logged_in
+    return manager
+
+
+def test_batch_fetches_every_item(manager):
+    calls = []
+
+    async def fetch_item_detail(item_id, timeout=None):
+        calls.append(item_id)
+        return {"success": True, "html": "<table></table>", "status": 200}
+
+    manager.http.fetch_item_detail = fetch_item_detail
+    results = run_batch(manager, list(range(1, 9)))
+
+    assert sorted(result.item_id for result in results) == list(range(1, 9))
+    assert all(result.success and not result.error for result in results)
+    assert sorted(calls) == list(range(1, 9))
+    assert manager.breaker.state == "closed"
+    assert manager.breaker.stats()["recent_calls"] == 8
+
+
+def test_local_errors_do_not_trip_the_breaker(manager):
+    async def fetch_item_detail(item_id, timeout=None):
+        raise RuntimeError("bug on our side")
+
+    manager.http.fetch_item_detail = fetch_item_detail
+    results = run_batch(manager, list(range(1, 9)))
+
+    assert all(not result.success and result.error == "bug on our side" for result in results)
+    assert manager.breaker.state == "closed"
+    assert manager.breaker.stats()["recent_calls"] == 0
+    manager.breaker.check()  # Still admits calls
+
+
+def test_upstream_failures_still_count(manager):
+    async def fetch_item_detail(item_id, timeout=None):
+        return {"success": False, "status": 502, "error": "HTTP 502"}
+
+    manager.http.fetch_item_detail = fetch_item_detail
+    results = run_batch(manager, list(range(1, 9)))
+
+    assert all(not result.success for result in results)
+    assert manager.breaker.state == "open"
+    # Once open, the rest of the batch is refused instead of sent upstream
+    assert any("circuit breaker" in result.error for result in results)
+
+
+def test_client_concurrency_is_capped(manager):
+    running, peak = 0, 0
+
+    async def fetch_item_detail(item_id, timeout=None):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        return {"success": True, "html": "<table></table>", "status": 200}
+
+    manager.http.fetch_item_detail = fetch_item_detail
+    manager.limiter.bucket.capacity = manager.limiter.bucket._tokens = 50.0
+
+    async def collect():
+        try:
+            return [result async for result in manager.fetch_barem_batch(list(range(1, 41)), concurrency=200)]
+        finally:
+            await manager.http.close()
+            manager.parser.close()
+
+    assert len(asyncio.run(collect())) == 40
+    assert peak == main.BATCH_CONCURRENCY
@@ -0,0 +1,106 @@
+"""Browser-mode batch: /get-barem/batch with SCRAPPER_FETCH_MODE=browser."""
+import asyncio
+
+import pytest
+
+import main
+
+
+class StalledPage:
+    """Answers the first `answered` items of a batch, then never returns."""
+
+    url = f"{main.ALLIANCE_BASE_URL}/Home/MainPage"
+
+    def __init__(self, manager, answered: int):
+        self.manager = manager
+        self.answered = answered
+
+    def is_closed(self):
+        return False
+
+    async def evaluate(self, script, args):
+        for item_id in args["itemIds"][:self.answered]:
+            result = {"success": True, "html": "<table></table>", "status": 200, "elapsed": 0.01}
+            await self.manager._on_batch_item(None, args["batchId"], item_id, result)
+        await asyncio.sleep(3600)
+
+
+class FakeContext:
+    def __init__(self, page):
+        self.page = page
+
+    async def new_page(self):
+        return self.page
+
+
+@pytest.fixture
+def manager(monkeypatch):
+    monkeypatch.setattr(main, "UPSTREAM_TIMEOUT", 0.2)
+    manager = main.SessionManager()
+
+    async def logged_in():
+        return True
+
+    manager.ensure_logged_in = logged_in
+    return manager
+
+
+def run_batch(manager, page, item_ids, concurrency):
+    async def collect():
+        http, manager.http = manager.http, None
+        try:
+            await manager.pool.start(FakeContext(page))
+            return [result async for result in manager.fetch_barem_batch(item_ids, concurrency)]
+        finally:
+            await http.close()
+            manager.parser.close()
+    return asyncio.run(collect())
+
+
+def test_stalled_evaluate_times_out(manager):
+    results = run_batch(manager, StalledPage(manager, answered=2), [1, 2, 3, 4], concurrency=4)
+
+    by_id = {result.item_id: result for result in results}
+    assert sorted(by_id) == [1, 2, 3, 4]
+    assert by_id[1].success and by_id[2].success
+    assert not by_id[3].success and "timed out" in by_id[3].error
+    assert not by_id[4].success and "timed out" in by_id[4].error
+    # Answers and timeouts alike reached the breaker
+    assert manager.breaker.stats()["recent_calls"] == 4
+    assert manager.breaker.stats()["recent_failures"] == 2
+
+
+class AnsweringPage(StalledPage):
+    """Answers every item, noting how many items were admitted by then."""
+
+    def __init__(self, manager, admitted):
+        super().__init__(manager, answered=0)
+        self.admitted = admitted
+        self.admitted_at_evaluate = []
+
+    async def evaluate(self, script, args):
+        self.admitted_at_evaluate.append(len(self.admitted))
+        for item_id in args["itemIds"]:
+            result = {"success": True, "html": "<table></table>", "status": 200, "elapsed": 0.01}
+            await self.manager._on_batch_item(None, args["batchId"], item_id, result)
+        return len(args["itemIds"])
+
+
+def test_batch_is_admitted_in_chunks(manager):
+    admitted = []
+    admit = manager._admit
+
+    async def counting_admit():
+        admission = await admit()
+        admitted.append(admission)
+        return admission
+
+    manager._admit = counting_admit
+    page = AnsweringPage(manager, admitted)
+    results = run_batch(manager, page, list(range(1, 11)), concurrency=4)
+
+    assert sorted(result.item_id for result in results) == list(range(1, 11))
+    assert all(result.success for result in results)
+    # The page starts on the first chunk instead of waiting for all ten tokens
+    assert page.admitted_at_evaluate == [4, 8, 10]
+    assert manager.breaker.stats()["recent_calls"] == 10
@@ -0,0 +1,50 @@
+"""Browser RSS is measured over this worker's process tree only."""
+import os
+import shutil
+import subprocess
+import time
+
+import pytest
+
+import metrics
+
+
+pytestmark = pytest.mark.skipif(not os.path.isdir("/proc"), reason="needs /proc")
+
+
+@pytest.fixture
+def fake_chrome(tmp_path):
+    """A copy of `sleep` whose process name looks like Chromium."""
+    path = tmp_path / "chrome"
+    shutil.copy(shutil.which("sleep"), path)
+    return str(path)
+
+
+def wait_for(predicate, timeout=5.0):
+    until = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < until, "timed out"
+        time.sleep(0.02)
+
+
+def test_counts_own_descendants(fake_chrome):
+    before = metrics.browser_memory_bytes()
+    # Grandchild, like Chromium under the Playwright driver
+    driver = subprocess.Popen(["sh", "-c", f"{fake_chrome} 30; :"])
+    try:
+        wait_for(lambda: metrics.browser_memory_bytes() > before)
+    finally:
+        driver.kill()
+        driver.wait()
+        subprocess.run(["pkill", "-f", fake_chrome])
+
+
+def test_ignores_other_workers_browsers(fake_chrome):
+    before = metrics.browser_memory_bytes()
+    # Double fork: the browser is re-parented away from this process
+    subprocess.run(["sh", "-c", f"{fake_chrome} 30 >/dev/null 2>&1 &"], check=True)
+    try:
+        wait_for(lambda: subprocess.run(["pgrep", "-f", fake_chrome], capture_output=True).returncode == 0)
+        assert metrics.browser_memory_bytes() == before
+    finally:
+        subprocess.run(["pkill", "-f", fake_chrome])
@@ -0,0 +1,85 @@
+"""Catalog snapshots: CSV -> snapshot -> mmap round-trips and lookups."""
+import csv
+import json
+import os
+
+import pytest
+
+import catalog
+
+
+HEADER = ["Sira_ID", "API_ID", "Urun_Ismi", "Urun_Barkodu", "Muadil_Barkodlari", "Gorsel_Path"]
+
+
+def write_csv(path, rows):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(HEADER)
+        writer.writerows(rows)
+    return str(path)
+
+
+def products(count):
+    return [[i, 1000 + i, f"ÜRÜN {i} TB", f"869{i:010d}", json.dumps([f"868{i:010d}"]), "[]"]
+            for i in range(count)]
+
+
+@pytest.fixture
+def archive(tmp_path):
+    return write_csv(tmp_path / "ilac_arsivi.csv", products(500) + [
+        [500, 7, " ŞURUP ", "8699999999007", json.dumps(["1", " ", "1", "2"]), json.dumps(["images/7.jpg"])],
+        [501, 7, "DUPLICATE API_ID", "8699999999008", "not json", ""],
+        ["x", 9, "BAD SIRA_ID", "8699999999009", "[]", "[]"],
+    ])
+
+
+def test_snapshot_round_trips_every_row(archive, tmp_path):
+    snapshot = str(tmp_path / "catalog.snapshot")
+    built = catalog.build_catalog(archive, snapshot)
+    mapped = catalog.map_snapshot(snapshot, archive)
+
+    expected = list(catalog.read_catalog_csv(archive))
+    assert len(mapped) == len(expected) == 502
+    assert [mapped.row(row) for row in range(len(mapped))] == expected
+    assert [built.row(row) for row in range(len(built))] == expected
+
+
+def test_lookups_by_barcode_and_api_id(archive):
+    loaded = catalog.build_catalog(archive)
+    for i in (0, 137, 499):
+        row = loaded.find_api_id(1000 + i)
+        assert loaded.sira_id(row) == i
+        assert loaded.find_barcode(f"869{i:010d}") == row
+    assert loaded.find_api_id(42) is None
+    assert loaded.find_barcode("0000000000000") is None
+    assert loaded.find_barcode("  ") is None
+
+
+def test_list_columns_are_cleaned_and_duplicates_resolve_to_the_first_row(archive):
+    loaded = catalog.build_catalog(archive)
+    row = loaded.find_api_id(7)
+    assert loaded.to_dict(row) == {
+        "sira_id": 500, "api_id": 7, "name": "ŞURUP", "barcode": "8699999999007",
+        "muadil_barcodes": ["1", "2"], "image_paths": ["images/7.jpg"],
+    }
+    duplicate = loaded.find_barcode("8699999999008")
+    assert loaded.muadil(duplicate) == [] and loaded.images(duplicate) == []
+
+
+def test_load_reuses_a_matching_snapshot_and_rebuilds_a_stale_one(archive, tmp_path):
+    snapshot = str(tmp_path / "catalog.snapshot")
+    catalog.build_catalog(archive, snapshot)
+    built_at = os.stat(snapshot).st_mtime_ns
+    assert len(catalog.load_catalog(archive, snapshot)) == 502
+    assert os.stat(snapshot).st_mtime_ns == built_at
+
+    write_csv(archive, products(3))
+    assert len(catalog.load_catalog(archive, snapshot)) == 3
+    assert len(catalog.map_snapshot(snapshot)) == 3
+
+
+def test_corrupt_snapshot_is_rebuilt(archive, tmp_path):
+    snapshot = tmp_path / "catalog.snapshot"
+    snapshot.write_bytes(b"PDCATLG\0garbage")
+    assert len(catalog.load_catalog(archive, str(snapshot))) == 502
+    assert not [name for name in os.listdir(tmp_path) if name.startswith("catalog.snapshot.")]
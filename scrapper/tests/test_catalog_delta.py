@@ -0,0 +1,135 @@
+"""catalog_delta: external-sort merge-join of two archive CSVs."""
+import csv
+import io
+import json
+
+import pytest
+
+import catalog_delta
+
+
+HEADER = ["Sira_ID", "API_ID", "Urun_Ismi", "Urun_Barkodu", "Muadil_Barkodlari"]
+
+
+def write_csv(path, products):
+    """Write (api_id, name) products sorted by name, numbering rows like the real export."""
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(HEADER)
+        for sira_id, (api_id, name) in enumerate(sorted(products, key=lambda p: p[1])):
+            writer.writerow([sira_id, api_id, name, f"869{api_id:010d}", "[]"])
+    return str(path)
+
+
+def delta(old_path, new_path, **kwargs):
+    out = io.StringIO()
+    catalog_delta.write_delta(old_path, new_path, out, **kwargs)
+    lines = [json.loads(line) for line in out.getvalue().splitlines()]
+    return lines[0], lines[1:-1], lines[-1]
+
+
+def products(count):
+    return [(1000 + i, f"URUN {i:04d} TB") for i in range(count)]
+
+
+def test_renumbering_is_not_an_update(tmp_path):
+    old = products(300)
+    new = [p for p in old if p[0] != 1200] + [(5000, "URUN 0099A TB")]  # Deleted near row 200, inserted at row 100
+    header, ops, summary = delta(write_csv(tmp_path / "old.csv", old), write_csv(tmp_path / "new.csv", new),
+                                 run_size=64)
+
+    assert header["ignored_columns"] == ["Sira_ID"]
+    assert [(op["op"], op["key"]) for op in ops] == [("delete", 1200), ("insert", 5000)]
+    assert ops[1]["row"]["Sira_ID"] == 100
+    assert summary["updates"] == 0
+    assert summary["renumbered"] == 100  # Rows 100-199 moved down by one
+    assert summary["unchanged"] == 299
+
+
+def test_renumbering_is_opt_in(tmp_path):
+    old = products(300)
+    new = old + [(5000, "URUN 0099A TB")]
+    header, ops, summary = delta(write_csv(tmp_path / "old.csv", old), write_csv(tmp_path / "new.csv", new),
+                                 row_numbers=True)
+
+    assert header["ignored_columns"] == []
+    assert summary["updates"] == 200
+    assert all(op["changes"].keys() == {"Sira_ID"} for op in ops if op["op"] == "update")
+
+
+def test_real_changes_still_reported_alongside_renumbering(tmp_path):
+    old = products(10)
+    new = [(1003, "URUN 0003 TB FORTE") if api_id == 1003 else (api_id, name) for api_id, name in old]
+    new.append((5000, "URUN 0000A TB"))
+    _, ops, summary = delta(write_csv(tmp_path / "old.csv", old), write_csv(tmp_path / "new.csv", new))
+
+    updates = [op for op in ops if op["op"] == "update"]
+    assert updates == [{"op": "update", "key": 1003, "changes": {"Urun_Ismi": "URUN 0003 TB FORTE"}}]
+    assert summary["renumbered"] == 9
+
+
+def write_rows(path, rows):
+    """Write raw (sira_id, api_id, name, muadil, images) rows in the given order."""
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(HEADER + ["Gorsel_Path"])
+        for sira_id, api_id, name, muadil, images in rows:
+            writer.writerow([sira_id, api_id, name, f"869{api_id:010d}", json.dumps(muadil), json.dumps(images)])
+    return str(path)
+
+
+def test_merge_join_matches_across_spilled_runs(tmp_path):
+    shuffled = [(i, (i * 37) % 101 + 1, f"URUN {i}", [], []) for i in range(101)]  # API_IDs 1-101, out of order
+    old = [row for row in shuffled if row[1] % 10]
+    new = [(i, api_id, f"{name} FORTE" if api_id % 7 == 0 else name, [], [])
+           for i, api_id, name, _, _ in shuffled if api_id % 3]
+    old_path, new_path = write_rows(tmp_path / "old.csv", old), write_rows(tmp_path / "new.csv", new)
+
+    _, ops, summary = delta(old_path, new_path, run_size=7)
+    keys = {kind: [op["key"] for op in ops if op["op"] == kind] for kind in ("insert", "update", "delete")}
+    assert [op["key"] for op in ops] == sorted(op["key"] for op in ops)
+    assert keys["insert"] == [k for k in range(10, 102, 10) if k % 3]
+    assert keys["delete"] == [k for k in range(3, 102, 3) if k % 10]
+    assert keys["update"] == [k for k in range(7, 102, 7) if k % 3 and k % 10]
+    assert (summary["old_rows"], summary["new_rows"]) == (len(old), len(new))
+    assert delta(old_path, new_path)[1:] == (ops, summary)  # Same result from a single in-memory run
+
+
+def test_first_row_wins_when_a_key_repeats(tmp_path):
+    rows = [(i, 1 + i % 3, f"URUN {i}", [], []) for i in range(9)]  # Three copies of each API_ID
+    old_path = write_rows(tmp_path / "old.csv", rows)
+    new_path = write_rows(tmp_path / "new.csv", [(0, 1, "URUN 0", [], []), (1, 2, "URUN 4", [], [])])
+
+    _, ops, summary = delta(old_path, new_path, run_size=2)
+    assert ops == [{"op": "update", "key": 2, "changes": {"Urun_Ismi": "URUN 4"}}, {"op": "delete", "key": 3}]
+    assert summary["duplicate_keys"] == 6
+
+
+def test_muadil_order_is_ignored_but_image_order_is_not(tmp_path):
+    old_path = write_rows(tmp_path / "old.csv", [(0, 1, "A", ["2", "3"], ["a.jpg", "b.jpg"]),
+                                                  (1, 2, "B", ["1"], ["c.jpg", "d.jpg"])])
+    new_path = write_rows(tmp_path / "new.csv", [(0, 1, "A", ["3", "2", "3"], ["a.jpg", "b.jpg"]),
+                                                  (1, 2, "B", ["1"], ["d.jpg", "c.jpg"])])
+
+    _, ops, summary = delta(old_path, new_path)
+    assert ops == [{"op": "update", "key": 2, "changes": {"Gorsel_Path": ["d.jpg", "c.jpg"]}}]
+    assert summary["changed_columns"] == {"Gorsel_Path": 1}
+
+
+def test_keyed_by_sira_id(tmp_path):
+    old = products(3)
+    new = old + [(5000, "URUN 0000A TB")]
+    header, ops, summary = delta(write_csv(tmp_path / "old.csv", old), write_csv(tmp_path / "new.csv", new),
+                                 key="sira_id")
+
+    assert header["key"] == "Sira_ID" and header["ignored_columns"] == []
+    assert ops[-1] == {"op": "insert", "key": 3, "row": {
+        "Sira_ID": 3, "API_ID": 1002, "Urun_Ismi": "URUN 0002 TB", "Urun_Barkodu": "8690000001002",
+        "Muadil_Barkodlari": [], "Gorsel_Path": []}}
+    assert summary["updates"] == 2
+
+
+def test_unknown_key_is_rejected(tmp_path):
+    path = write_csv(tmp_path / "old.csv", products(1))
+    with pytest.raises(ValueError):
+        catalog_delta.write_delta(path, path, io.StringIO(), key="barcode")
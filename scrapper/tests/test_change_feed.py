@@ -0,0 +1,90 @@
+"""Barem change records: diffs, the /changes cursor and live fan-out."""
+import asyncio
+
+import pytest
+
+import main
+from barem_store import BaremStore
+from change_feed import ChangeFeed, diff_barems
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = BaremStore(str(tmp_path / "barems.sqlite"))
+    yield store
+    store.close()
+
+
+def barem(vade, adet=1, iskonto=0.0):
+    return {"Vade": vade, "MinimumAdet": adet, "IskontoKurum": iskonto}
+
+
+def payload(item_id, *barems):
+    return {"success": True, "item_id": item_id, "barems": list(barems), "fetched_at": "2026-01-01T00:00:00"}
+
+
+def fill(store, count):
+    """`count` change records, alternating between two items."""
+    for item_id in (1, 2):
+        store.save(payload(item_id, barem(0)))
+    for vade in range(1, count + 1):
+        store.save(payload(1 + vade % 2, barem(vade)))
+
+
+def test_diff_keys_rows_by_barem_identity():
+    old = [barem(30), barem(60), barem(60)]
+    new = [barem(30, iskonto=5.0), barem(90)]
+    diff = diff_barems(old, new)
+
+    assert diff["added"] == [barem(90)]
+    assert diff["removed"] == [barem(60)]
+    assert diff["changed"] == [{"before": barem(30), "after": barem(30, iskonto=5.0)}]
+    assert diff_barems(old, [barem(60), barem(30)]) is None
+
+
+def test_changes_page_through_the_cursor(store):
+    fill(store, 7)
+    pages, cursor = [], 0
+    while True:
+        changes, cursor = store.changes_since(cursor, limit=3)
+        if not changes:
+            break
+        pages.append([change["seq"] for change in changes])
+
+    assert pages == [[1, 2, 3], [4, 5, 6], [7]]
+    assert cursor == 7
+
+
+def test_caught_up_or_stale_cursors_resume_from_the_head(store):
+    assert store.changes_since(0) == ([], 0)
+    fill(store, 2)
+    assert store.changes_since(2) == ([], 2)
+    assert store.changes_since(10 ** 6) == ([], 2)  # Cursor from before the store was wiped
+
+
+def test_changes_endpoint_caps_the_page_size(store, monkeypatch):
+    monkeypatch.setattr(main, "barem_store", store)
+    monkeypatch.setattr(main, "CHANGES_PAGE_SIZE", 2)
+    fill(store, 3)
+
+    first = asyncio.run(main.get_changes(since=0, limit=100))
+    assert [change["seq"] for change in first["changes"]] == [1, 2]
+    assert first["changes"][0]["item_id"] == 2 and first["changes"][0]["added"] == [barem(1)]
+    rest = asyncio.run(main.get_changes(since=first["next"], limit=0))
+    assert [change["seq"] for change in rest["changes"]] == [3]
+    assert rest["next"] == 3
+
+
+def test_lagging_subscriber_is_dropped():
+    async def scenario():
+        feed = ChangeFeed(max_queue=2)
+        slow, fast = feed.subscribe(), feed.subscribe()
+        for seq in range(1, 4):
+            feed.publish({"seq": seq})
+            if not fast.empty():
+                await fast.get()
+        return feed, [slow.get_nowait() for _ in range(slow.qsize())]
+
+    feed, received = asyncio.run(scenario())
+    assert received == [{"seq": 1}, {"seq": 2}, None]
+    assert feed.stats() == {"subscribers": 1, "published": 3, "dropped_subscribers": 1}
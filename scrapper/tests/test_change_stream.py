@@ -0,0 +1,42 @@
+"""/changes/stream follows the shared store, not just this worker's feed."""
+import asyncio
+import json
+
+import main
+from barem_store import BaremStore
+
+
+class FakeRequest:
+    headers = {}
+
+    async def is_disconnected(self):
+        return False
+
+
+def payload(item_id, vade):
+    return {"success": True, "item_id": item_id, "barems": [{"Vade": vade, "MinimumAdet": 1}],
+            "fetched_at": "2026-01-01T00:00:00"}
+
+
+def test_stream_sees_changes_saved_by_another_worker(monkeypatch):
+    monkeypatch.setattr(main, "CHANGES_POLL_INTERVAL", 0.05)
+    other_worker = BaremStore(main.STORE_PATH)
+    other_worker.save(payload(9001, 30))
+
+    async def scenario():
+        response = await main.stream_changes(FakeRequest(), since=None)
+        events = response.body_iterator
+        first = asyncio.ensure_future(events.__anext__())
+        await asyncio.sleep(0.1)  # Stream is now live, past its replay
+        change = await asyncio.to_thread(other_worker.save, payload(9001, 60))
+        try:
+            return change, await asyncio.wait_for(first, 2.0)
+        finally:
+            await events.aclose()
+
+    change, event = asyncio.run(scenario())
+    other_worker.close()
+    lines = event.splitlines()
+    assert lines[0] == f"id: {change['seq']}"
+    data = json.loads(lines[2][len("data: "):])
+    assert data["item_id"] == 9001 and data["version"] == 2
@@ -0,0 +1,84 @@
+"""CircuitBreaker half-open trial accounting through Admission tokens."""
+import asyncio
+
+import pytest
+
+import main
+from ratelimit import CircuitBreaker, CircuitOpen
+
+
+def tripped(**kwargs) -> CircuitBreaker:
+    """A breaker that just opened and is already due for its trial call."""
+    breaker = CircuitBreaker(failure_threshold=1, min_calls=1, reset_timeout=0.0, **kwargs)
+    breaker.check().record(False)
+    assert breaker.state == "open"
+    return breaker
+
+
+def test_trial_success_closes():
+    breaker = tripped()
+    trial = breaker.check()
+    assert trial.trial and breaker.state == "half_open"
+    trial.record(True)
+    assert breaker.state == "closed"
+    breaker.check().record(True)
+    assert breaker.stats()["recent_calls"] == 1
+
+
+def test_trial_failure_reopens_with_longer_timeout():
+    breaker = tripped(max_reset_timeout=10.0)
+    breaker.reset_timeout = 1.0
+    breaker.opened_at = 0.0  # Due for a trial regardless of the timeout
+    breaker.check().record(False)
+    assert breaker.state == "open"
+    assert breaker.reset_timeout == 2.0
+
+
+def test_only_the_trial_token_ends_half_open():
+    breaker = CircuitBreaker(failure_threshold=2, min_calls=2, reset_timeout=0.0)
+    early = breaker.check()  # Admitted while closed, answers after the trip
+    breaker.check().record(False)
+    breaker.check().record(False)
+    trial = breaker.check()
+    with pytest.raises(CircuitOpen):
+        breaker.check()  # One trial at a time
+
+    early.record(True)
+    early.release()
+    assert breaker.state == "half_open"
+    with pytest.raises(CircuitOpen):
+        breaker.check()
+
+    trial.release()
+    breaker.check()  # Slot handed to the next caller
+
+
+def test_resolving_twice_is_a_no_op():
+    breaker = tripped()
+    trial = breaker.check()
+    trial.record(True)
+    trial.release()
+    trial.record(False)
+    assert breaker.state == "closed"
+
+
+def test_unanswered_single_fetch_releases_the_trial():
+    manager = main.SessionManager()
+    manager.breaker = tripped()
+
+    async def logged_out():
+        return False
+
+    manager.ensure_logged_in = logged_out
+
+    async def fetch():
+        try:
+            return await manager.fetch_barem(1)
+        finally:
+            await manager.http.close()
+            manager.parser.close()
+
+    response = asyncio.run(fetch())
+    assert response.error == "Not logged in"
+    assert manager.breaker.state == "half_open"
+    manager.breaker.check()  # Not stuck behind a trial that never reported
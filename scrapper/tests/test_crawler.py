@@ -0,0 +1,127 @@
+"""BaremCrawler: checkpointed progress across restarts."""
+import asyncio
+import json
+
+import pytest
+
+from crawler import BaremCrawler, load_api_ids
+
+
+ITEMS = list(range(101, 111))
+
+
+@pytest.fixture
+def checkpoint(tmp_path):
+    return str(tmp_path / "crawler_checkpoint.json")
+
+
+def crawler(checkpoint, fetch, stored_age=None, concurrency=1):
+    async def never_stored(item_id):
+        return None
+
+    return BaremCrawler(ITEMS, fetch, stored_age or never_stored, lambda: True, checkpoint,
+                        rate=1000.0, concurrency=concurrency, pass_interval=3600.0)
+
+
+def read(checkpoint):
+    with open(checkpoint, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def test_load_api_ids_dedupes_and_skips_bad_rows(tmp_path):
+    path = tmp_path / "archive.csv"
+    path.write_text("Sira_ID,API_ID\n0,5\n1,3\n2,5\n3,\n4,x\n5,7\n", encoding="utf-8")
+    assert load_api_ids(str(path)) == [5, 3, 7]
+
+
+def test_watermark_only_advances_past_contiguous_work(checkpoint):
+    walker = crawler(checkpoint, None)
+    walker._complete(1)
+    walker._complete(2)
+    assert walker.position == 0
+    walker._complete(0)
+    assert walker.position == 3
+
+
+def test_stopped_crawl_resumes_from_its_checkpoint(checkpoint):
+    fetched = []
+
+    async def first_run():
+        stuck = asyncio.Event()
+
+        async def fetch(item_id):
+            if item_id == ITEMS[5]:
+                stuck.set()
+                await asyncio.sleep(3600)  # Still in flight when the worker restarts
+            fetched.append(item_id)
+            return True
+
+        walker = crawler(checkpoint, fetch)
+        walker.start(paused=False)
+        await asyncio.wait_for(stuck.wait(), 2.0)
+        await walker.stop()
+
+    asyncio.run(first_run())
+    assert fetched == ITEMS[:5]
+    assert read(checkpoint)["position"] == 5
+
+    async def second_run():
+        done = asyncio.Event()
+
+        async def fetch(item_id):
+            fetched.append(item_id)
+            if item_id == ITEMS[-1]:
+                done.set()
+            return True
+
+        walker = crawler(checkpoint, fetch)
+        walker.start(paused=True)  # The checkpoint says it was running
+        await asyncio.wait_for(done.wait(), 2.0)
+        await asyncio.sleep(0)
+        status = walker.status()
+        await walker.stop()
+        return status
+
+    status = asyncio.run(second_run())
+    assert fetched == ITEMS
+    assert status["state"] == "idle" and status["position"] == len(ITEMS)
+    assert read(checkpoint)["position"] == len(ITEMS)
+
+
+def test_paused_flag_survives_a_restart(checkpoint):
+    async def scenario():
+        walker = crawler(checkpoint, None)
+        walker.start(paused=False)
+        walker.pause()
+        await walker.stop()
+
+        restarted = crawler(checkpoint, None)
+        restarted.start(paused=False)
+        state = restarted.status()["state"]
+        await restarted.stop()
+        return state
+
+    assert asyncio.run(scenario()) == "paused"
+
+
+def test_recently_stored_items_are_skipped(checkpoint):
+    fetched = []
+
+    async def fetch(item_id):
+        fetched.append(item_id)
+        return item_id != ITEMS[1]
+
+    async def stored_age(item_id):
+        return 60.0 if item_id % 2 else None  # Odd ids were stored a minute ago
+
+    async def scenario():
+        walker = crawler(checkpoint, fetch, stored_age, concurrency=3)
+        walker.start(paused=False)
+        while walker.position < len(ITEMS):
+            await asyncio.sleep(0.01)
+        await walker.stop()
+        return walker
+
+    walker = asyncio.run(scenario())
+    assert sorted(fetched) == [item for item in ITEMS if item % 2 == 0]
+    assert (walker.fetched, walker.skipped, walker.errors) == (4, 5, 1)
@@ -0,0 +1,26 @@
+"""Deadline header parsing."""
+import pytest
+
+import deadline
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("5", 5.0),
+    ("2.5", 2.5),
+    ("600", 30.0),
+    (None, 10.0),
+    ("", 10.0),
+    ("soon", 10.0),
+    ("0", 10.0),
+    ("-3", 10.0),
+    ("nan", 10.0),
+    ("NaN", 10.0),
+    ("inf", 10.0),
+    ("-inf", 10.0),
+])
+def test_parse_header(value, expected):
+    assert deadline.parse_header(value, 10.0, 30.0) == expected
+
+
+def test_parse_header_without_default():
+    assert deadline.parse_header("nan", None, 30.0) is None
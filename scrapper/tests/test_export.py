@@ -0,0 +1,110 @@
+"""Barem export: flattening, paged streaming, gzip framing and cursors."""
+import asyncio
+import csv
+import gzip
+import io
+import json
+import time
+
+import pytest
+
+import export
+import main
+from barem_store import BaremStore
+
+
+class FakeRequest:
+    def __init__(self, headers=None):
+        self.headers = headers or {}
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = BaremStore(str(tmp_path / "barems.sqlite"))
+    for item_id in range(1, 6):
+        store.save({"item_id": item_id, "name": f"URUN {item_id}", "barcode": f"869{item_id}",
+                    "barems": [{"Vade": vade, "MinimumAdet": item_id} for vade in (30, 60)][:item_id % 3],
+                    "fetched_at": "2026-01-01T00:00:00"})
+    yield store
+    store.close()
+
+
+def collect(store, fmt="ndjson", **kwargs):
+    """Run stream_export, recording the size of each page query."""
+    pages = []
+
+    async def fetch_page(after, modified_since, limit):
+        page = await store.export_page_async(after, modified_since, limit)
+        pages.append(len(page))
+        return page
+
+    async def scenario():
+        return [chunk async for chunk in export.stream_export(fetch_page, fmt, **kwargs)]
+
+    return asyncio.run(scenario()), pages
+
+
+def test_items_without_barems_still_get_a_row(store):
+    chunks, _ = collect(store)
+    rows = [json.loads(line) for line in b"".join(chunks).decode().splitlines()]
+
+    assert [(row["item_id"], row["vade"]) for row in rows] == [
+        (1, 30), (2, 30), (2, 60), (3, None), (4, 30), (5, 30), (5, 60),
+    ]
+    assert rows[3]["name"] == "URUN 3" and rows[3]["version"] == 1
+    assert list(rows[0]) == list(export.EXPORT_COLUMNS)
+
+
+def test_export_streams_one_chunk_per_page(store):
+    chunks, pages = collect(store, page_size=2)
+    assert pages == [2, 2, 1]
+    assert len(chunks) == 3
+
+
+def test_csv_header_is_written_once(store):
+    chunks, _ = collect(store, "csv", page_size=2)
+    rows = list(csv.reader(io.StringIO(b"".join(chunks).decode())))
+    assert rows[0] == list(export.EXPORT_COLUMNS)
+    assert len(rows) == 8
+    assert sum(row == rows[0] for row in rows) == 1
+
+
+def test_gzip_output_is_a_single_valid_stream(store):
+    plain, _ = collect(store, page_size=2)
+    compressed, _ = collect(store, compress=True, page_size=2)
+    assert gzip.decompress(b"".join(compressed)) == b"".join(plain)
+
+
+def test_modified_since_skips_unchanged_items(store):
+    cursor = time.time()
+    store.save({"item_id": 2, "name": "URUN 2", "barcode": "8692", "barems": [], "fetched_at": ""})
+    store.save({"item_id": 4, "name": "URUN 4", "barcode": "8694",  # Refetched, not changed
+                "barems": [{"Vade": 30, "MinimumAdet": 4}], "fetched_at": ""})
+
+    chunks, _ = collect(store, modified_since=cursor)
+    rows = [json.loads(line) for line in b"".join(chunks).decode().splitlines()]
+    assert [(row["item_id"], row["vade"], row["version"]) for row in rows] == [(2, None, 2)]
+
+
+def test_cursors_parse_leniently():
+    assert export.parse_cursor("1700000000.5") == 1700000000.5
+    assert export.parse_cursor("yesterday") is None
+    assert export.parse_http_date(export.http_date(1700000000)) == 1700000000
+    assert export.parse_http_date("not a date") is None
+
+
+def test_export_endpoint_answers_304_when_nothing_changed(store, monkeypatch):
+    monkeypatch.setattr(main, "barem_store", store)
+    last_modified = store.last_modified()
+
+    async def scenario(request, since=None):
+        return await main.export_barems(request, since=since)
+
+    unchanged = asyncio.run(scenario(FakeRequest({"if-modified-since": export.http_date(last_modified + 1)})))
+    assert unchanged.status_code == 304
+    assert asyncio.run(scenario(FakeRequest(), since=f"{last_modified + 1:.3f}")).status_code == 304
+
+    response = asyncio.run(scenario(FakeRequest({"accept-encoding": "gzip"}), since="0.001"))
+    assert response.status_code == 200
+    assert response.headers["content-encoding"] == "gzip"
+    assert float(response.headers["x-export-cursor"]) >= last_modified
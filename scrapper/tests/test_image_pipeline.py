@@ -0,0 +1,60 @@
+"""image_pipeline: permanent decode failures vs retryable I/O failures."""
+import csv
+import json
+import os
+
+import pytest
+
+PIL = pytest.importorskip("PIL")
+from PIL import Image  # noqa: E402
+
+import image_pipeline  # noqa: E402
+
+
+@pytest.fixture
+def archive(tmp_path):
+    """Two products: one real image, one file that isn't an image."""
+    images = tmp_path / "images"
+    images.mkdir()
+    Image.new("RGB", (640, 480), (200, 30, 30)).save(images / "good.jpg")
+    (images / "broken.jpg").write_bytes(b"not an image")
+    path = tmp_path / "archive.csv"
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["Sira_ID", "API_ID", "Urun_Ismi", "Urun_Barkodu", "Muadil_Barkodlari", "Gorsel_Path"])
+        writer.writerow([0, 1, "GOOD", "1", "[]", json.dumps(["images/good.jpg"])])
+        writer.writerow([1, 2, "BROKEN", "2", "[]", json.dumps(["images/broken.jpg"])])
+    return tmp_path
+
+
+def pipeline(root, out):
+    return image_pipeline.ImagePipeline(str(root / "archive.csv"), str(root), str(out),
+                                        str(root / "manifest.json"), workers=1)
+
+
+def test_render_tells_decode_failures_from_io_failures(archive):
+    _, entry = image_pipeline.render(str(archive / "images" / "broken.jpg"), "ab" * 32, str(archive / "out"))
+    assert "error" in entry and not entry.get("retry")
+
+    blocked = archive / "blocked"
+    blocked.write_text("a file where the output directory should be")
+    _, entry = image_pipeline.render(str(archive / "images" / "good.jpg"), "cd" * 32, str(blocked))
+    assert "error" in entry and entry["retry"]
+
+
+def test_output_failures_are_retried_next_run(archive):
+    out = archive / "out"
+    out.write_text("not a directory yet")
+    first = pipeline(archive, out)
+    manifest = first.run()
+    assert first.counts["deferred"] == 1
+    assert first.counts["failed"] == 1  # broken.jpg, for good
+    assert len(manifest["images"]) == 1
+
+    os.remove(out)
+    second = pipeline(archive, out)
+    manifest = second.run()
+    assert second.counts["rendered"] == 1
+    assert second.counts["reused"] == 1  # broken.jpg is not decoded again
+    assert second.counts["deferred"] == 0
+    assert list(manifest["products"]) == ["1"]
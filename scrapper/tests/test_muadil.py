@@ -0,0 +1,82 @@
+"""Muadil clustering: union-find over one-sided, repetitive muadil lists."""
+import csv
+import json
+
+import muadil
+from catalog import CatalogRow
+
+
+def row(barcode, *links):
+    return CatalogRow(0, 0, barcode, barcode, list(links), [])
+
+
+ROWS = [
+    row("A", "B", "A"),       # Self reference
+    row("B"),                 # Does not list A back
+    row("C", "D"),            # D has no catalog row
+    row("E", "D"),            # Joins C through D
+    row("F"),
+    row("G", "H"),
+    row("H", "G"),
+]
+
+
+def index(rows=ROWS):
+    return muadil.MuadilIndex(muadil.build_snapshot(rows))
+
+
+def test_links_are_undirected_and_transitive():
+    clusters = index()
+    assert clusters.equivalents("B") == ["A"]
+    assert clusters.equivalents("C") == ["D", "E"]
+    assert clusters.equivalents("D") == ["C", "E"]
+    assert clusters.equivalents("F") == []
+    assert clusters.equivalents("Z") is None
+    assert not clusters.in_catalog(clusters.find("D"))
+    assert clusters.in_catalog(clusters.find("E"))
+
+
+def test_largest_clusters_are_stored_first():
+    clusters = index()
+    layout = [[clusters.barcode(member) for member in clusters.members(cluster)] for cluster in range(4)]
+    assert layout == [["C", "D", "E"], ["A", "B"], ["G", "H"], ["F"]]
+
+
+def test_build_records_quality_stats():
+    stats = index().stats()
+    assert {name: stats[name] for name in (
+        "barcodes", "catalog_barcodes", "links", "clusters", "clusters_with_equivalents", "largest_cluster",
+        "cluster_sizes", "dangling_barcodes", "dangling_sample", "asymmetric_links", "self_references",
+    )} == {
+        "barcodes": 8, "catalog_barcodes": 7, "links": 4, "clusters": 4, "clusters_with_equivalents": 3,
+        "largest_cluster": 3, "cluster_sizes": {"1": 1, "2": 2, "3": 1}, "dangling_barcodes": 1,
+        "dangling_sample": ["D"], "asymmetric_links": 1, "self_references": 1,
+    }
+
+
+def test_long_chain_collapses_into_one_cluster():
+    barcodes = [f"869{i:010d}" for i in range(2000)]
+    rows = [row(barcode, barcodes[i - 1]) if i else row(barcode) for i, barcode in enumerate(barcodes)]
+    clusters = index(rows[::-1])
+    assert sorted(clusters.equivalents(barcodes[0])) == barcodes[1:]
+    assert clusters.stats()["clusters"] == 1
+
+
+def test_snapshot_is_reused_until_the_csv_changes(tmp_path):
+    archive = tmp_path / "ilac_arsivi.csv"
+
+    def write(rows):
+        with open(archive, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(["Sira_ID", "API_ID", "Urun_Ismi", "Urun_Barkodu", "Muadil_Barkodlari"])
+            for sira_id, (barcode, links) in enumerate(rows):
+                writer.writerow([sira_id, sira_id + 1, barcode, barcode, json.dumps(links)])
+
+    snapshot = str(tmp_path / "muadil.snapshot")
+    write([("A", ["B"]), ("B", [])])
+    assert muadil.load_index(str(archive), snapshot).equivalents("A") == ["B"]
+    assert muadil.load_index(str(archive), snapshot).source_size == archive.stat().st_size
+
+    write([("A", []), ("B", ["C"]), ("C", [])])
+    assert muadil.load_index(str(archive), snapshot).equivalents("A") == []
+    assert muadil.MuadilIndex(muadil.map_file(snapshot)).equivalents("B") == ["C"]
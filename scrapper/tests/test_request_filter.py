@@ -0,0 +1,85 @@
+"""RequestFilter decisions and per-page navigation bookkeeping."""
+import asyncio
+
+from request_filter import RequestFilter
+
+
+PORTAL = "https://portal.example.com"
+CDN = "https://cdn.thirdparty.net"
+
+
+class FakePage:
+    def __init__(self):
+        self.handlers = {}
+
+    def once(self, event, handler):
+        self.handlers[event] = handler
+
+    def close(self):
+        self.handlers.pop("close")(self)
+
+
+class FakeFrame:
+    parent_frame = None
+
+    def __init__(self, page):
+        self.page = page
+
+
+class FakeRequest:
+    def __init__(self, page, url, resource_type="document", navigation=True):
+        self.frame = FakeFrame(page)
+        self.url = url
+        self.resource_type = resource_type
+        self.navigation = navigation
+
+    def is_navigation_request(self):
+        return self.navigation
+
+
+class FakeRoute:
+    async def abort(self, reason):
+        pass
+
+    async def continue_(self):
+        pass
+
+
+def test_third_party_hosts_pass_by_default():
+    request_filter = RequestFilter(allowed_hosts=["portal.example.com"])
+    assert not request_filter.should_block("script", f"{CDN}/app.js")
+    assert not request_filter.should_block("script", f"{PORTAL}/app.js")
+    assert request_filter.should_block("image", f"{PORTAL}/logo.png")
+    assert request_filter.should_block("font", f"{CDN}/font.woff2")
+
+
+def test_third_party_blocking_is_opt_in():
+    request_filter = RequestFilter(allowed_hosts=["portal.example.com"], block_third_party=True)
+    assert request_filter.should_block("script", f"{CDN}/app.js")
+    assert request_filter.should_block("xhr", f"{CDN}/track")
+    assert not request_filter.should_block("script", f"{PORTAL}/app.js")
+
+
+def test_denied_hosts_are_always_blocked():
+    request_filter = RequestFilter(blocked_hosts=["thirdparty.net"])
+    assert request_filter.should_block("document", f"{CDN}/")
+
+
+def test_closed_pages_are_forgotten():
+    request_filter = RequestFilter()
+    page = FakePage()
+
+    async def navigate():
+        await request_filter._handle(FakeRoute(), FakeRequest(page, f"{PORTAL}/Home/MainPage"))
+        await request_filter._handle(FakeRoute(), FakeRequest(page, f"{PORTAL}/logo.png", "image", False))
+        await request_filter._handle(FakeRoute(), FakeRequest(page, f"{PORTAL}/Sales/QuickOrder"))
+
+    asyncio.run(navigate())
+    assert len(request_filter.stats()["open_navigations"]) == 1
+    assert len(request_filter.navigations) == 1
+
+    page.close()
+    stats = request_filter.stats()
+    assert stats["open_navigations"] == []
+    assert [window["url"] for window in stats["navigations"]] == [f"{PORTAL}/Sales/QuickOrder", f"{PORTAL}/Home/MainPage"]
+    assert stats["navigations"][1]["blocked"] == 1
@@ -0,0 +1,86 @@
+"""Product search: Turkish-aware normalization, ranking and in-place sync."""
+import pytest
+
+import catalog
+from search import SearchIndex, fold, tokenize
+
+
+NAMES = {
+    1: "ACYL KREM 30 GR",
+    2: "ACYL MERHEM 30 GR",
+    3: "ACNELYSE 20 GR KREM",
+    4: "ÇİNKO OKSİT %20 MERHEM 20 GR",
+    5: "PAROL 500 MG 20 TABLET",
+    6: "PAROL 500 MG 30 TABLET",
+    7: "PAROLİN 200 MG 20 TABLET",
+}
+
+
+def products(names):
+    rows = [catalog.CatalogRow(row, api_id, name, f"869{api_id:010d}", [], [])
+            for row, (api_id, name) in enumerate(names.items())]
+    return catalog.Catalog(catalog.build_snapshot(rows))
+
+
+@pytest.fixture
+def index():
+    return SearchIndex.from_catalog(products(NAMES))
+
+
+def ids(hits):
+    return [hit.api_id for hit in hits]
+
+
+def test_fold_handles_dotted_and_dotless_i():
+    assert fold("İLAÇ ışık ŞURUBU Ğ Ö Ü") == "ilac isik surubu g o u"
+
+
+@pytest.mark.parametrize("text, tokens", [
+    ("çinko oksit 20 gr", ["cinko", "oksit", "20gr"]),
+    ("ÇİNKO OKSİT 20GR", ["cinko", "oksit", "20gr"]),
+    ("ÇİNKO 20 gram", ["cinko", "20gr"]),
+    ("PAROL 500 MG 30 TABLET", ["parol", "500mg", "30tb"]),
+    ("AMOKSİSİLİN 1,5 G FLAKON", ["amoksisilin", "1.5gr", "flk"]),
+    ("%20 krem tablet", ["%20", "krem", "tb"]),
+])
+def test_tokenize_joins_units_and_collapses_forms(text, tokens):
+    assert tokenize(text) == tokens
+
+
+def test_exact_tokens_outrank_prefixes(index):
+    assert ids(index.search("parol")) == [5, 6, 7]
+    hits = index.search("parol 20 tb")
+    assert ids(hits) == [5, 7, 6]
+    assert hits[0].score > hits[1].score
+
+
+def test_numbers_only_prefix_their_unit(index):
+    assert ids(index.search("20")) == [3, 5, 7, 4]  # 7 by its 20tb, not 200mg; shorter names first
+    assert ids(index.search("200")) == [7]
+    assert 7 not in ids(index.search("20 gr"))
+
+
+def test_typos_match_by_trigrams(index):
+    assert ids(index.search("acnelyse"))[0] == 3
+    assert ids(index.search("acneylse"))[0] == 3
+    assert ids(index.search("merhme", limit=2)) == [2, 4]
+    assert index.search("xyzxyz") == []
+
+
+def test_limit_keeps_the_best_hits(index):
+    assert ids(index.search("acyl krem", limit=1)) == [1]
+    assert index.search("acyl", limit=0) == []
+
+
+def test_sync_only_touches_changed_products(index):
+    renamed = dict(NAMES)
+    del renamed[2]
+    renamed[5] = "PAROL 500 MG 20 EFERVESAN TABLET"
+    renamed[8] = "ACYL JEL 50 GR"
+
+    assert index.sync(products(renamed)) == {"added": 1, "changed": 1, "removed": 1}
+    assert len(index) == 7
+    assert ids(index.search("acyl")) == [8, 1]
+    assert ids(index.search("efervesan")) == [5]
+    assert index.search("merhem 30") and 2 not in ids(index.search("merhem 30"))
+    assert index.sync(products(renamed)) == {"added": 0, "changed": 0, "removed": 0}
@@ -0,0 +1,66 @@
+"""Proactive session renewal drains upstream calls before logging in."""
+import asyncio
+
+import pytest
+
+import main
+
+
+@pytest.fixture
+def manager():
+    manager = main.SessionManager()
+    yield manager
+    asyncio.run(manager.http.close())
+    manager.parser.close()
+
+
+def test_renewal_waits_for_running_calls_and_holds_new_ones(manager):
+    events = []
+
+    async def login():
+        events.append(("login", manager._upstream_calls))
+        await asyncio.sleep(0.05)
+        return True
+
+    manager.login = login
+
+    async def scenario():
+        running = await manager._admit()
+        renewal = asyncio.create_task(manager.renew_session())
+        await asyncio.sleep(0.05)
+        assert not renewal.done()  # Still draining
+
+        async def late_call():
+            admission = await manager._admit()
+            events.append(("admitted", None))
+            admission.release()
+
+        late = asyncio.create_task(late_call())
+        await asyncio.sleep(0.05)
+        assert events == []
+        running.record(True)
+        assert await renewal
+        await late
+
+    asyncio.run(scenario())
+    assert events == [("login", 0), ("admitted", None)]
+
+
+def test_renewal_gives_up_draining_after_the_timeout(manager, monkeypatch):
+    monkeypatch.setattr(main, "SESSION_RENEWAL_DRAIN_TIMEOUT", 0.05)
+    logins = []
+
+    async def login():
+        logins.append(manager._upstream_calls)
+        return True
+
+    manager.login = login
+
+    async def scenario():
+        stuck = await manager._admit()
+        assert await manager.renew_session()
+        stuck.release()
+
+    asyncio.run(scenario())
+    assert logins == [1]
+    assert manager._upstream_idle.is_set()
@@ -0,0 +1,42 @@
+"""Warehouse fan-out source statuses."""
+import asyncio
+
+from fastapi import HTTPException
+
+from deadline import DeadlineExceeded
+from ratelimit import CircuitOpen
+from warehouses import AllianceAdapter, StubAdapter, WarehouseFanOut
+
+
+def alliance_raising(error):
+    async def fetch(item_id):
+        raise error
+    return AllianceAdapter(fetch)
+
+
+def statuses(*adapters):
+    result = asyncio.run(WarehouseFanOut(list(adapters)).fetch(1))
+    return result, {source.warehouse: source.status for source in result.sources}
+
+
+def test_deadline_is_a_timeout_not_unavailable():
+    alliance = alliance_raising(DeadlineExceeded("Request deadline passed at admission"))
+    result, by_source = statuses(alliance, StubAdapter("Selcuk", latency=0.0))
+    assert by_source == {"Alliance": "timeout", "Selcuk": "ok"}
+    assert result.partial
+    assert alliance.timeouts == 1
+
+
+def test_backpressure_is_unavailable():
+    _, by_source = statuses(alliance_raising(CircuitOpen("Portal circuit breaker is open", 5.0)))
+    assert by_source == {"Alliance": "unavailable"}
+
+
+def test_browser_not_ready_is_unavailable():
+    _, by_source = statuses(alliance_raising(HTTPException(status_code=503, detail="Browser not ready")))
+    assert by_source == {"Alliance": "unavailable"}
+
+
+def test_slow_source_times_out():
+    _, by_source = statuses(StubAdapter("Slow", latency=1.0, deadline=0.05))
+    assert by_source == {"Slow": "timeout"}
@@ -0,0 +1,193 @@
+"""
+Warehouse Adapters
+Pluggable per-wholesaler barem sources and the fan-out that queries all of
+them concurrently under a per-source deadline.
+"""
+import time
+import random
+import asyncio
+import hashlib
+import logging
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from fastapi import HTTPException
+
+from models import BaremInfo, BaremResponse, SourceStatus
+from ratelimit import Backpressure
+import deadline as request_deadline
+
+
+logger = logging.getLogger(__name__)
+
+
+class SourceUnavailable(Exception):
+    """The source cannot answer right now (e.g. its session is still warming up)."""
+
+
+class WarehouseAdapter:
+    """
+    One wholesaler. Subclasses implement `fetch`, returning a BaremResponse
+    whose barems carry this adapter's `name` as Warehouse.
+    """
+
+    name = ""
+
+    def __init__(self, deadline: float = 25.0):
+        self.deadline = deadline
+        self.requests = 0
+        self.timeouts = 0
+        self.errors = 0
+
+    async def fetch(self, item_id: int) -> BaremResponse:
+        raise NotImplementedError
+
+    def stats(self) -> dict:
+        return {
+            "name": self.name,
+            "deadline_seconds": self.deadline,
+            "requests": self.requests,
+            "timeouts": self.timeouts,
+            "errors": self.errors,
+        }
+
+
+class AllianceAdapter(WarehouseAdapter):
+    """Alliance Healthcare through the scrapper's session, cache and store."""
+
+    name = "Alliance"
+
+    def __init__(self, fetch: Callable[[int], Awaitable[BaremResponse]], deadline: float = 25.0):
+        super().__init__(deadline)
+        self._fetch = fetch
+
+    async def fetch(self, item_id: int) -> BaremResponse:
+        try:
+            return await self._fetch(item_id)
+        except request_deadline.DeadlineExceeded:
+            raise  # Too slow, not down: the fan-out reports it as a timeout
+        except Backpressure as e:
+            raise SourceUnavailable(str(e)) from e
+        except HTTPException as e:
+            if e.status_code == 503:
+                raise SourceUnavailable(e.detail) from e
+            raise
+
+
+class StubAdapter(WarehouseAdapter):
+    """
+    Deterministic fake wholesaler for local testing: barems are derived from
+    (name, item_id), answered after `latency` seconds, and fail with
+    probability `fail_rate`.
+    """
+
+    def __init__(self, name: str, latency: float = 0.05, fail_rate: float = 0.0, deadline: float = 25.0):
+        super().__init__(deadline)
+        self.name = name
+        self.latency = latency
+        self.fail_rate = fail_rate
+
+    async def fetch(self, item_id: int) -> BaremResponse:
+        await asyncio.sleep(self.latency)
+        if self.fail_rate and random.random() < self.fail_rate:
+            raise RuntimeError(f"{self.name} stub failure")
+        seed = int.from_bytes(hashlib.blake2b(f"{self.name}:{item_id}".encode(), digest_size=8).digest(), "big")
+        rng = random.Random(seed)
+        price = round(rng.uniform(20, 900), 2)
+        vade = rng.choice((30, 60, 90))
+        barems = []
+        for minimum, extra in ((1, 0), (10, 1), (50, 8))[:rng.randint(1, 3)]:
+            barems.append(BaremInfo(
+                Vade=vade,
+                MinimumAdet=minimum,
+                MalFazlasi=f"{minimum}+{extra}" if extra else "",
+                IskontoKurum=round(rng.uniform(0, 12), 2),
+                BirimFiyat=round(price * minimum / (minimum + extra), 2),
+                Warehouse=self.name,
+            ))
+        return BaremResponse(success=True, item_id=item_id, barems=barems, fetched_at=datetime.now().isoformat())
+
+
+def parse_warehouse_config(spec: str, alliance: AllianceAdapter, deadline: float) -> List[WarehouseAdapter]:
+    """
+    Comma-separated adapter list, e.g. "alliance,stub:Selcuk:0.3:0.1"
+    (stub:<name>[:<latency seconds>[:<fail rate>]]).
+    """
+    adapters: List[WarehouseAdapter] = []
+    for entry in (part.strip() for part in spec.split(",")):
+        if not entry:
+            continue
+        kind, _, rest = entry.partition(":")
+        if kind.lower() == "alliance":
+            adapters.append(alliance)
+        elif kind.lower() == "stub":
+            fields = rest.split(":")
+            adapters.append(StubAdapter(
+                fields[0] or "Stub",
+                latency=float(fields[1]) if len(fields) > 1 and fields[1] else 0.05,
+                fail_rate=float(fields[2]) if len(fields) > 2 and fields[2] else 0.0,
+                deadline=deadline,
+            ))
+        else:
+            logger.warning("⚠️ Unknown warehouse adapter '%s', ignoring", entry)
+    return adapters or [alliance]
+
+
+class WarehouseFanOut:
+    """
+    Queries every adapter at once; each gets its own deadline, so total
+    latency is the slowest source capped by its deadline rather than the
+    sum. Results are merged; sources that time out or fail are reported in
+    `sources` and mark the response `partial`.
+    """
+
+    def __init__(self, adapters: List[WarehouseAdapter]):
+        self.adapters = adapters
+
+    async def _query(self, adapter: WarehouseAdapter, item_id: int):
+        adapter.requests += 1
+        started = time.perf_counter()
+        status = SourceStatus(warehouse=adapter.name, status="ok")
+        result: Optional[BaremResponse] = None
+        # The caller's own deadline, if tighter, caps the source's
+        timeout = request_deadline.bounded(adapter.deadline)
+        try:
+            result = await asyncio.wait_for(adapter.fetch(item_id), timeout)
+            if result.error or not result.success:
+                status.status, status.error = "error", result.error or "Unsuccessful response"
+            else:
+                status.barem_count = len(result.barems)
+        except asyncio.TimeoutError:
+            adapter.timeouts += 1
+            status.status, status.error = "timeout", f"No answer within {timeout:g}s"
+        except request_deadline.DeadlineExceeded as e:
+            adapter.timeouts += 1
+            status.status, status.error = "timeout", str(e)
+        except SourceUnavailable as e:
+            status.status, status.error = "unavailable", str(e)
+        except Exception as e:
+            adapter.errors += 1
+            status.status, status.error = "error", str(e) or type(e).__name__
+        status.elapsed_ms = round((time.perf_counter() - started) * 1000, 1)
+        return status, result
+
+    async def fetch(self, item_id: int) -> BaremResponse:
+        outcomes = await asyncio.gather(*(self._query(adapter, item_id) for adapter in self.adapters))
+        merged = BaremResponse(success=False, item_id=item_id, fetched_at=datetime.now().isoformat())
+        merged.sources = [status for status, _ in outcomes]
+        errors = []
+        for status, result in outcomes:
+            if status.status != "ok":
+                errors.append(f"{status.warehouse}: {status.error}")
+                continue
+            merged.success = True
+            merged.name = merged.name or result.name
+            merged.barcode = merged.barcode or result.barcode
+            merged.barems.extend(result.barems)
+        merged.partial = merged.success and bool(errors)
+        if not merged.success:
+            merged.error = "; ".join(errors)
+        return merged
+
+    def stats(self) -> Dict[str, dict]:
+        return {adapter.name: adapter.stats() for adapter in self.adapters}